@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark of the full and the streaming mode of ConfigParser.
+
+A synthetic .vbox file is generated for each snapshot count: a chain of
+snapshots that each carry a copy of the hardware section, and a media registry
+with one differencing disk per snapshot, like the golden images of a long-lived
+VM. The same accessors are called in both modes, and the peak memory traced by
+tracemalloc and the wall time are reported.
+
+Usage:
+    python benchmarks/config_parser_memory.py [--snapshots 1000 5000] [--json results.json]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vboxwrapper.VirtualMachine.info.vm_config import ConfigParser  # noqa: E402
+
+HARDWARE = (
+    '<Hardware><CPU count="2"/><Memory RAMSize="4096"/>'
+    '<Network><Adapter slot="0" enabled="true" MACAddress="080027000000" type="82540EM"><NAT/></Adapter></Network>'
+    '<AudioAdapter driver="Pulse" enabled="true"/>'
+    '<StorageControllers><StorageController name="SATA" type="AHCI" PortCount="2">'
+    '<AttachedDevice type="HardDisk" port="0" device="0"><Image uuid="{{{disk}}}"/></AttachedDevice>'
+    '<AttachedDevice passthrough="false" type="DVD" port="1" device="0"/>'
+    '</StorageController></StorageControllers></Hardware>'
+)
+
+ACCESSORS = {
+    'get_dvd_images': lambda parser: parser.get_dvd_images(),
+    'get_current_snapshot_info': lambda parser: parser.get_current_snapshot_info(),
+    'get_cpus': lambda parser: parser.get_cpus(),
+}
+
+
+def disk_uuid(index: int) -> str:
+    return f'00000000-0000-0000-0000-{index:012d}'
+
+
+def write_vbox(path: Path, snapshots: int) -> None:
+    """
+    Write a synthetic .vbox file with a chain of snapshots.
+    :param path: Output file.
+    :param snapshots: Number of snapshots.
+    """
+    with path.open('w', encoding='utf-8') as file:
+        file.write('<?xml version="1.0"?>\n<VirtualBox xmlns="http://www.virtualbox.org/" version="1.19-linux">\n')
+        file.write(
+            f'<Machine uuid="{{aaaaaaaa-0000-0000-0000-000000000000}}" name="golden" OSType="Ubuntu_64" '
+            f'currentSnapshot="{{{disk_uuid(snapshots - 1)}}}">\n'
+        )
+        file.write('<MediaRegistry><HardDisks>\n')
+        file.write(f'<HardDisk uuid="{{{disk_uuid(0)}}}" location="golden.vdi" format="VDI" type="Normal">\n')
+        for index in range(1, snapshots + 1):
+            file.write(f'<HardDisk uuid="{{{disk_uuid(index)}}}" location="Snapshots/{{{disk_uuid(index)}}}.vdi"/>\n')
+        file.write('</HardDisk></HardDisks>\n<DVDImages><Image uuid="{dddddddd-0000-0000-0000-000000000000}" '
+                   'location="/iso/ubuntu.iso"/></DVDImages></MediaRegistry>\n')
+
+        for index in range(snapshots):
+            file.write(
+                f'<Snapshot uuid="{{{disk_uuid(index)}}}" name="snapshot-{index}" '
+                f'timeStamp="2024-01-01T00:00:00Z" description="Nightly build {index}">\n'
+            )
+            file.write(HARDWARE.format(disk=disk_uuid(index)))
+            file.write('\n<Snapshots>\n' if index < snapshots - 1 else '\n')
+        for index in range(snapshots):
+            file.write('</Snapshot>\n' if index == 0 else '</Snapshots></Snapshot>\n')
+
+        file.write(HARDWARE.format(disk=disk_uuid(snapshots)))
+        file.write('\n<Groups><Group name="/golden"/></Groups>\n</Machine>\n</VirtualBox>\n')
+
+
+def measure(path: Path, streaming: bool, accessor: Callable) -> dict:
+    """
+    Call an accessor on a fresh ConfigParser and collect its peak memory and wall time.
+    :return: Dictionary with the measurements and the returned value.
+    """
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    value = accessor(ConfigParser(path, streaming=streaming))
+    wall_time = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'peak_mb': peak / 1024 / 1024, 'wall': wall_time, 'value': value}
+
+
+def run_suite(snapshots: int) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix='vboxwrapper-config-') as directory:
+        path = Path(directory) / 'golden.vbox'
+        write_vbox(path, snapshots)
+        size_mb = path.stat().st_size / 1024 / 1024
+        for name, accessor in ACCESSORS.items():
+            full = measure(path, False, accessor)
+            streaming = measure(path, True, accessor)
+            if full.pop('value') != streaming.pop('value'):
+                raise AssertionError(f'{name} returned different values in full and streaming mode')
+            results.append({
+                'snapshots': snapshots,
+                'file_mb': size_mb,
+                'accessor': name,
+                'full': full,
+                'streaming': streaming,
+            })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--snapshots', type=int, nargs='+', default=[1000, 5000], help='Snapshot counts.')
+    parser.add_argument('--json', type=Path, help='Write the measurements to this JSON file.')
+    args = parser.parse_args()
+
+    results = []
+    for snapshots in args.snapshots:
+        results.extend(run_suite(snapshots))
+
+    header = (
+        f"{'snapshots':>9} {'file, MB':>8} {'accessor':<26} "
+        f"{'full MB':>8} {'stream MB':>9} {'full, s':>8} {'stream, s':>9}"
+    )
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        full, streaming = result['full'], result['streaming']
+        print(
+            f"{result['snapshots']:>9} {result['file_mb']:>8.1f} {result['accessor']:<26} "
+            f"{full['peak_mb']:>8.1f} {streaming['peak_mb']:>9.1f} {full['wall']:>8.3f} {streaming['wall']:>9.3f}"
+        )
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+Scripted stand-in for `vboxmanage` used by the benchmark suite.
+
+The fleet state lives in `$FAKE_VBOX_HOME/state.json`, every VM also gets a
+generated .vbox file. Every call sleeps `$FAKE_VBOX_LATENCY` seconds before
+answering to emulate the cost of a real vboxmanage invocation.
+With `FAKE_VBOX_GUEST_EXEC=1`, `guestcontrol run/copyto/copyfrom/mkdir`
+operate on the host, so guest-side helpers can be exercised end to end.
+
+Usage:
+    python fake_vboxmanage.py init <count>     create a fleet of <count> VMs
+    python fake_vboxmanage.py <vboxmanage args>
+"""
+import fcntl
+import fnmatch
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import uuid as uuid_lib
+from contextlib import contextmanager
+from pathlib import Path
+from xml.sax.saxutils import quoteattr
+
+HOME = Path(os.environ.get('FAKE_VBOX_HOME', Path.cwd() / '.fake_vbox'))
+STATE_FILE = HOME / 'state.json'
+LATENCY = float(os.environ.get('FAKE_VBOX_LATENCY', '0'))
+BOOT_DELAY = float(os.environ.get('FAKE_VBOX_BOOT_DELAY', '0.5'))
+SHUTDOWN_DELAY = float(os.environ.get('FAKE_VBOX_SHUTDOWN_DELAY', '0.5'))
+RUN_OUTPUT_LINES = int(os.environ.get('FAKE_VBOX_RUN_OUTPUT_LINES', '10'))
+GUEST_EXEC = os.environ.get('FAKE_VBOX_GUEST_EXEC') == '1'
+GUESTCONTROL_VALUE_OPTIONS = ('--username', '--password', '--domain', '--exe', '--timeout', '--target-directory')
+GROUPS = ('/dev', '/test', '/prod')
+GUEST_PROPERTIES = {
+    '/VirtualBox/GuestInfo/Net/0/V4/IP': '10.0.2.15',
+    '/VirtualBox/GuestInfo/OS/LoggedInUsersList': 'user',
+    '/VirtualBox/GuestInfo/OS/Product': 'Linux',
+}
+
+
+@contextmanager
+def locked_state(write: bool = False):
+    HOME.mkdir(parents=True, exist_ok=True)
+    with open(HOME / 'state.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+        state = json.loads(STATE_FILE.read_text()) if STATE_FILE.exists() else {'vms': []}
+        yield state
+        if write:
+            tmp = STATE_FILE.with_suffix('.tmp')
+            tmp.write_text(json.dumps(state))
+            os.replace(tmp, STATE_FILE)
+
+
+def new_uuid() -> str:
+    return str(uuid_lib.uuid4())
+
+
+def init(count: int) -> None:
+    vms = []
+    for index in range(count):
+        name = f'vm-{index:04d}'
+        vm = {
+            'uuid': new_uuid(),
+            'name': name,
+            'groups': [GROUPS[index % len(GROUPS)]],
+            'os_type': 'Ubuntu_64',
+            'state': 'poweroff',
+            'started_at': None,
+            'shutdown_at': None,
+            'cpus': 2,
+            'memory': 2048,
+            'settings': {},
+            'snapshots': [],
+            'current_snapshot': None,
+            'dvd_images': [{'uuid': new_uuid(), 'location': f'/iso/{name}.iso'}],
+            'cfg': str(HOME / 'machines' / name / f'{name}.vbox'),
+        }
+        parent = None
+        for snapshot_index in range(3):
+            snapshot = {'uuid': new_uuid(), 'name': f'snap-{snapshot_index}', 'parent': parent, 'created': '2024-01-01T00:00:00Z'}
+            vm['snapshots'].append(snapshot)
+            parent = snapshot['uuid']
+        vm['current_snapshot'] = parent
+        vms.append(vm)
+
+    with locked_state(write=True) as state:
+        state['vms'] = vms
+        for vm in vms:
+            write_vbox(vm)
+        write_global_xml(state)
+
+
+def write_global_xml(state: dict) -> None:
+    """
+    Write the VirtualBox.xml machine registry, so the fake home also works as `VBOX_USER_HOME`.
+    """
+    entries = ''.join(
+        f'      <MachineEntry uuid="{{{vm["uuid"]}}}" src={quoteattr(vm["cfg"])}/>\n' for vm in state['vms']
+    )
+    (HOME / 'VirtualBox.xml').write_text(
+        '<?xml version="1.0"?>\n'
+        '<VirtualBox xmlns="http://www.virtualbox.org/" version="1.12-linux">\n'
+        '  <Global>\n'
+        f'    <MachineRegistry>\n{entries}    </MachineRegistry>\n'
+        f'    <SystemProperties defaultMachineFolder={quoteattr(str(HOME / "machines"))}/>\n'
+        '  </Global>\n'
+        '</VirtualBox>\n'
+    )
+
+
+def write_vbox(vm: dict) -> None:
+    """
+    Write a minimal but structurally faithful .vbox file for the VM.
+    """
+    children = {}
+    for snapshot in vm['snapshots']:
+        children.setdefault(snapshot['parent'], []).append(snapshot)
+
+    def snapshot_xml(snapshot: dict, indent: str) -> str:
+        nested = ''.join(snapshot_xml(child, indent + '    ') for child in children.get(snapshot['uuid'], []))
+        nested = f'{indent}  <Snapshots>\n{nested}{indent}  </Snapshots>\n' if nested else ''
+        return (
+            f'{indent}<Snapshot uuid="{{{snapshot["uuid"]}}}" name={quoteattr(snapshot["name"])} '
+            f'timeStamp="{snapshot["created"]}">\n{nested}{indent}</Snapshot>\n'
+        )
+
+    current = f' currentSnapshot="{{{vm["current_snapshot"]}}}"' if vm['current_snapshot'] else ''
+    images = ''.join(
+        f'        <Image uuid="{{{image["uuid"]}}}" location={quoteattr(image["location"])}/>\n'
+        for image in vm['dvd_images']
+    )
+    groups = ''.join(f'      <Group name={quoteattr(group)}/>\n' for group in vm['groups'])
+    snapshots = ''.join(snapshot_xml(root, '    ') for root in children.get(None, []))
+    settings = vm['settings']
+    path = Path(vm['cfg'])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        '<?xml version="1.0"?>\n'
+        '<VirtualBox xmlns="http://www.virtualbox.org/" version="1.19-linux">\n'
+        f'  <Machine uuid="{{{vm["uuid"]}}}" name={quoteattr(vm["name"])} OSType="{vm["os_type"]}"{current}>\n'
+        '    <MediaRegistry>\n'
+        '      <DVDImages>\n'
+        f'{images}'
+        '      </DVDImages>\n'
+        '    </MediaRegistry>\n'
+        f'    <Groups>\n{groups}    </Groups>\n'
+        '    <Hardware>\n'
+        f'      <CPU count="{vm["cpus"]}">\n'
+        f'        <NestedHWVirt enabled="{str(settings.get("nested-hw-virt") == "on").lower()}"/>\n'
+        '      </CPU>\n'
+        f'      <Memory RAMSize="{vm["memory"]}"/>\n'
+        '      <Network>\n'
+        '        <Adapter slot="0" enabled="true" type="82540EM">\n'
+        '          <NAT/>\n'
+        '        </Adapter>\n'
+        '      </Network>\n'
+        f'      <AudioAdapter driver="{settings.get("audio-driver", "Pulse")}" enabled="true" enabledOut="true"/>\n'
+        '    </Hardware>\n'
+        f'{snapshots}'
+        '  </Machine>\n'
+        '</VirtualBox>\n'
+    )
+
+
+def find_vm(state: dict, vm_id: str) -> dict:
+    vm_id = vm_id.strip('{}')
+    for vm in state['vms']:
+        if vm_id in (vm['name'], vm['uuid']):
+            return vm
+    fail(f'Could not find a registered machine named \'{vm_id}\'')
+
+
+def fail(message: str, code: int = 1) -> None:
+    print(f'VBoxManage: error: {message}', file=sys.stderr)
+    sys.exit(code)
+
+
+def vm_state(vm: dict) -> str:
+    if vm['state'] == 'running' and vm['shutdown_at'] and time.time() >= vm['shutdown_at']:
+        return 'poweroff'
+    return vm['state']
+
+
+def guest_properties(vm: dict) -> dict:
+    if vm_state(vm) != 'running' or time.time() < vm['started_at'] + BOOT_DELAY:
+        return {}
+    return GUEST_PROPERTIES
+
+
+def cmd_list(state: dict, args: list) -> None:
+    if args[:2] == ['-l', 'vms']:
+        for vm in state['vms']:
+            print(f"Name:                        {vm['name']}")
+            print(f"Groups:                      {','.join(vm['groups'])}")
+            print("Guest OS:                    Ubuntu (64-bit)")
+            print(f"UUID:                        {vm['uuid']}")
+            print(f"Config file:                 {vm['cfg']}")
+            print(f"State:                       {'running' if vm_state(vm) == 'running' else 'powered off'} (since 2024-01-01T00:00:00.000000000)")
+            print()
+    elif args[:1] == ['vms']:
+        for vm in state['vms']:
+            print(f'"{vm["name"]}" {{{vm["uuid"]}}}')
+    elif args[:1] == ['runningvms']:
+        for vm in state['vms']:
+            if vm_state(vm) == 'running':
+                print(f'"{vm["name"]}" {{{vm["uuid"]}}}')
+    elif args[:1] == ['groups']:
+        for group in sorted({group for vm in state['vms'] for group in vm['groups']}):
+            print(f'"{group}"')
+    elif args[:1] == ['systemproperties']:
+        print(f"Default machine folder:          {HOME / 'machines'}")
+    elif args[:1] == ['bridgedifs']:
+        print('Name:            eth0\nStatus:          Up\n')
+
+
+def cmd_showvminfo(state: dict, args: list) -> None:
+    vm = find_vm(state, args[0])
+    print(f'name="{vm["name"]}"')
+    print(f'groups="{",".join(vm["groups"])}"')
+    print('ostype="Ubuntu (64-bit)"')
+    print(f'UUID="{vm["uuid"]}"')
+    print(f'CfgFile="{vm["cfg"]}"')
+    print(f'memory={vm["memory"]}')
+    print(f'cpus={vm["cpus"]}')
+    print(f'VMState="{vm_state(vm)}"')
+    print('VMStateChangeTime="2024-01-01T00:00:00.000000000"')
+    print('nic1="nat"')
+    print('nictype1="82540EM"')
+    print(f'audio="{vm["settings"].get("audio-driver", "pulse").lower()}"')
+    print('audio_out="on"')
+    for key, value in vm['settings'].items():
+        print(f'{key}="{value}"')
+
+
+def cmd_guestproperty(state: dict, args: list) -> None:
+    action, vm = args[0], find_vm(state, args[1])
+    properties = guest_properties(vm)
+    if action == 'get':
+        value = properties.get(args[2])
+        print(f'Value: {value}' if value else 'No value set!')
+    elif action == 'enumerate':
+        for name, value in properties.items():
+            print(f"Name: {name}, value: {value}, timestamp: 0, flags: ")
+    elif action == 'wait':
+        pattern = args[2]
+        timeout = int(args[args.index('--timeout') + 1]) / 1000 if '--timeout' in args else 3600
+        deadline = time.time() + timeout
+        events = []
+        if vm_state(vm) == 'running':
+            events.append((vm['started_at'] + BOOT_DELAY, GUEST_PROPERTIES))
+        if vm['shutdown_at']:
+            events.append((vm['shutdown_at'], {'/VirtualBox/GuestInfo/OS/LoggedInUsers': '0'}))
+        for event_time, changed in sorted(events, key=lambda event: event[0]):
+            if time.time() <= event_time <= deadline:
+                for name, value in changed.items():
+                    if fnmatch.fnmatch(name, pattern):
+                        time.sleep(max(0.0, event_time - time.time()))
+                        print(f'Name: {name}, value: {value}, flags: ')
+                        return
+        time.sleep(max(0.0, deadline - time.time()))
+        print('Time out or interruption while waiting for a notification.')
+        sys.exit(2)
+
+
+def cmd_startvm(state: dict, args: list) -> None:
+    vm = find_vm(state, args[0])
+    if vm_state(vm) == 'running':
+        fail(f'The machine \'{vm["name"]}\' is already locked by a session')
+    vm.update(state='running', started_at=time.time(), shutdown_at=None)
+    print(f'VM "{vm["name"]}" has been successfully started.')
+
+
+def cmd_controlvm(state: dict, args: list) -> None:
+    vm = find_vm(state, args[0])
+    if vm_state(vm) != 'running':
+        fail(f'Machine \'{vm["name"]}\' is not currently running')
+    if args[1] == 'poweroff':
+        vm.update(state='poweroff', shutdown_at=None)
+    elif args[1] == 'acpipowerbutton':
+        vm['shutdown_at'] = time.time() + SHUTDOWN_DELAY
+
+
+def cmd_modifyvm(state: dict, args: list) -> None:
+    vm = find_vm(state, args[0])
+    vm['state'] = vm_state(vm)
+    if vm['state'] == 'running':
+        fail(f'The machine \'{vm["name"]}\' is already locked for a session (or being unlocked)')
+    options = args[1:]
+    for flag, value in zip(options[::2], options[1::2]):
+        flag = flag.lstrip('-')
+        if flag in ('cpus', 'memory'):
+            vm[flag] = int(value)
+        elif flag == 'name':
+            vm['name'] = value
+        else:
+            vm['settings'][flag] = value
+    write_vbox(vm)
+
+
+def cmd_snapshot(state: dict, args: list) -> None:
+    vm, action = find_vm(state, args[0]), args[1]
+    by_name = {snapshot['name']: snapshot for snapshot in vm['snapshots']}
+    if action == 'take':
+        snapshot = {'uuid': new_uuid(), 'name': args[2], 'parent': vm['current_snapshot'], 'created': '2024-01-01T00:00:00Z'}
+        vm['snapshots'].append(snapshot)
+        vm['current_snapshot'] = snapshot['uuid']
+    elif action in ('restore', 'restorecurrent'):
+        if vm_state(vm) == 'running':
+            fail('Cannot restore a snapshot of a running machine')
+        if action == 'restore':
+            if args[2] not in by_name:
+                fail(f'Could not find a snapshot named \'{args[2]}\'')
+            vm['current_snapshot'] = by_name[args[2]]['uuid']
+    elif action == 'delete':
+        snapshot = by_name.get(args[2]) or fail(f'Could not find a snapshot named \'{args[2]}\'')
+        vm['snapshots'] = [item for item in vm['snapshots'] if item is not snapshot]
+        for child in vm['snapshots']:
+            if child['parent'] == snapshot['uuid']:
+                child['parent'] = snapshot['parent']
+        if vm['current_snapshot'] == snapshot['uuid']:
+            vm['current_snapshot'] = snapshot['parent']
+    elif action == 'edit':
+        by_name[args[2]]['name'] = args[args.index('--name') + 1]
+    elif action == 'list':
+        for snapshot in vm['snapshots']:
+            marker = ' *' if snapshot['uuid'] == vm['current_snapshot'] else ''
+            print(f'   Name: {snapshot["name"]} (UUID: {snapshot["uuid"]}){marker}')
+        return
+    write_vbox(vm)
+
+
+def cmd_guestcontrol(state: dict, args: list) -> None:
+    vm = find_vm(state, args[0])
+    if vm_state(vm) != 'running':
+        fail(f'Machine "{vm["name"]}" is not running (currently powered off)!')
+
+    options, operands = parse_guestcontrol_args(args[2:])
+    if args[1] == 'run':
+        if not GUEST_EXEC:
+            for line in range(RUN_OUTPUT_LINES):
+                print(f'output line {line}')
+            return
+        sys.stdout.flush()
+        sys.exit(subprocess.run(operands).returncode)
+
+    # With FAKE_VBOX_GUEST_EXEC=1 the host file system plays the guest one.
+    if args[1] == 'mkdir' and GUEST_EXEC:
+        for directory in operands:
+            Path(directory).mkdir(parents='--parents' in options, exist_ok=True)
+    elif args[1] in ('copyto', 'copyfrom') and GUEST_EXEC:
+        target = options.get('--target-directory') or operands.pop()
+        for source in operands:
+            shutil.copy(source, target)
+    elif args[1] == 'rm' and GUEST_EXEC:
+        for path in operands:
+            Path(path).unlink(missing_ok='--force' in options)
+
+
+def parse_guestcontrol_args(args: list) -> tuple[dict, list]:
+    """
+    Split guestcontrol arguments into options and operands. Everything after `--` is an operand.
+    """
+    options, operands = {}, []
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == '--':
+            operands.extend(args[index + 1:])
+            break
+        if arg.startswith('--'):
+            name, separator, value = arg.partition('=')
+            if not separator and name in GUESTCONTROL_VALUE_OPTIONS:
+                index += 1
+                value = args[index]
+            options[name] = value
+        else:
+            operands.append(arg)
+        index += 1
+    return options, operands
+
+
+MUTATING = {'startvm', 'controlvm', 'modifyvm', 'snapshot'}
+HANDLERS = {
+    'list': cmd_list,
+    'showvminfo': cmd_showvminfo,
+    'guestproperty': cmd_guestproperty,
+    'startvm': cmd_startvm,
+    'controlvm': cmd_controlvm,
+    'modifyvm': cmd_modifyvm,
+    'snapshot': cmd_snapshot,
+    'guestcontrol': cmd_guestcontrol,
+}
+
+
+def main(argv: list) -> None:
+    if argv[:1] == ['init']:
+        init(int(argv[1]))
+        return
+
+    time.sleep(LATENCY)
+    if not argv or argv[0] not in HANDLERS:
+        fail(f'Unknown command: {" ".join(argv)}')
+
+    subcommand = argv[0]
+    if subcommand == 'guestproperty' and argv[1:2] == ['wait']:
+        with locked_state() as state:
+            pass
+        cmd_guestproperty(state, argv[1:])
+        return
+
+    with locked_state(write=subcommand in MUTATING) as state:
+        HANDLERS[subcommand](state, argv[1:])
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Import-time benchmark for vboxwrapper.
+
+Each statement is run in a fresh interpreter with `python -X importtime`. The cost
+of a statement is the self time of all modules it imports on top of a bare
+interpreter, the median over several runs is reported.
+
+The script fails if `import vboxwrapper` or `from vboxwrapper import Vbox` exceeds
+its time budget or pulls in one of the heavy modules that are only needed on first
+use (rich, asyncio, the XML parser, thread pools).
+
+Usage:
+    python benchmarks/import_time.py [--budget 25] [--vbox-budget 60] [--repeat 5] [--json results.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+STATEMENTS = (
+    'import vboxwrapper',
+    'from vboxwrapper import Vbox',
+    'from vboxwrapper import VirtualMachine',
+    'from vboxwrapper import VMGroup',
+)
+
+DEFERRED_MODULES = ('rich', 'asyncio', 'xml.etree.ElementTree', 'concurrent.futures')
+
+
+def import_times(statement: str) -> dict[str, int]:
+    """
+    Run the statement in a fresh interpreter and collect the import times.
+    :param statement: Python statement to execute.
+    :return: Dictionary of module names and their self import time in microseconds.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, _, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(self_time)
+    return times
+
+
+def measure(statement: str, baseline: set[str], repeat: int) -> dict:
+    """
+    Measure the import cost of a statement.
+    :param statement: Python statement to execute.
+    :param baseline: Modules imported by a bare interpreter.
+    :param repeat: Number of runs.
+    :return: Dictionary with the median cost in milliseconds and the imported modules.
+    """
+    costs = []
+    modules = set()
+    for _ in range(repeat):
+        times = import_times(statement)
+        modules = set(times) - baseline
+        costs.append(sum(times[module] for module in modules) / 1000)
+
+    return {
+        'statement': statement,
+        'ms': statistics.median(costs),
+        'modules': len(modules),
+        'deferred_loaded': sorted(module for module in DEFERRED_MODULES if module in modules),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=float, default=25.0, help='Budget for `import vboxwrapper` in milliseconds.')
+    parser.add_argument(
+        '--vbox-budget', type=float, default=60.0, help='Budget for `from vboxwrapper import Vbox` in milliseconds.'
+    )
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs per statement.')
+    parser.add_argument('--json', type=Path, help='Write the measurements to this JSON file.')
+    args = parser.parse_args()
+
+    baseline = set(import_times('pass'))
+    results = [measure(statement, baseline, args.repeat) for statement in STATEMENTS]
+
+    header = f"{'statement':<40} {'ms':>8} {'modules':>8}  deferred modules loaded"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        deferred = ', '.join(result['deferred_loaded']) or '-'
+        print(f"{result['statement']:<40} {result['ms']:>8.1f} {result['modules']:>8}  {deferred}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+    errors = []
+    for result, budget in zip(results, (args.budget, args.vbox_budget)):
+        statement = result['statement']
+        if result['ms'] > budget:
+            errors.append(f"`{statement}` took {result['ms']:.1f} ms, budget is {budget:.1f} ms")
+        if result['deferred_loaded']:
+            errors.append(f"`{statement}` loaded {', '.join(result['deferred_loaded'])}")
+
+    for error in errors:
+        print(f"FAIL: {error}", file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
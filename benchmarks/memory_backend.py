@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Load test of the orchestration layer against the in-memory simulated backend.
+
+`MemoryBackend` answers the vboxmanage command lines in-process, so large fleets
+can be driven through Vbox, VMGroup and VirtualMachine without VirtualBox and
+without spawning processes. For each fleet size the script reports the number
+of commands and the wall time of the fleet-wide operations.
+
+Usage:
+    python benchmarks/memory_backend.py [--sizes 1000 5000] [--boot-delay 0.05] [--json results.json]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+from vboxwrapper import Vbox, VMGroup  # noqa: E402
+from vboxwrapper.backends import MemoryBackend  # noqa: E402
+from vboxwrapper.commands import Commands  # noqa: E402
+from run_benchmarks import measure, print_report  # noqa: E402
+
+
+def run_suite(count: int, boot_delay: float, workers: int) -> list[dict]:
+    """
+    Benchmark fleet-wide operations against a simulated fleet of the given size.
+    :param count: Number of virtual machines.
+    :param boot_delay: Simulated boot time of a guest in seconds.
+    :param workers: Number of parallel workers of the VMGroup.
+    :return: List of measurements.
+    """
+    backend = MemoryBackend(boot_delay=boot_delay, shutdown_delay=boot_delay)
+    backend.populate(count, snapshots=3)
+    Commands().set_backend(backend)
+    try:
+        group = VMGroup('dev', max_workers=workers)
+        results = [
+            measure('Vbox.vm_list()', lambda: Vbox().vm_list()),
+            measure('Vbox.get_group_list', lambda: Vbox().get_group_list()),
+            measure('VMGroup.set_cpus', lambda: group.set_cpus(2)),
+            measure('VMGroup.run', lambda: group.run(headless=True)),
+            measure('VMGroup.wait_network_up', lambda: group.wait_network_up(timeout=30)),
+            measure('VMGroup.stop', lambda: group.stop()),
+        ]
+    finally:
+        Commands().set_backend(None)
+
+    for result in results:
+        result['fleet'] = count
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000], help='Fleet sizes to benchmark.')
+    parser.add_argument('--boot-delay', type=float, default=0.0, help='Simulated boot time in seconds.')
+    parser.add_argument('--workers', type=int, default=32, help='Parallel workers of the VMGroup.')
+    parser.add_argument('--json', type=Path, help='Write the measurements to this JSON file.')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_suite(size, args.boot_delay, args.workers))
+
+    print_report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
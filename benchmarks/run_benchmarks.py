@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for vboxwrapper driven by a fake vboxmanage.
+
+A `vboxmanage` shim that runs fake_vboxmanage.py is put first on PATH, so the
+library spawns real processes exactly as it would against VirtualBox. For each
+fleet size the suite reports the number of spawns and the wall time of the
+high-level operations.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 10 100 1000] [--latency 0.01] [--json results.json]
+"""
+import argparse
+import io
+import json
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+FAKE_VBOXMANAGE = BENCHMARKS_DIR / 'fake_vboxmanage.py'
+sys.path.insert(0, str(BENCHMARKS_DIR.parent))
+
+from vboxwrapper import Vbox, VirtualMachine, FileUtils, Registry, MediaCleanup  # noqa: E402
+from vboxwrapper.commands import Commands  # noqa: E402
+
+
+def install_fake_vboxmanage(home: Path, count: int, latency: float) -> None:
+    """
+    Put a `vboxmanage` shim on PATH and create a synthetic fleet.
+    :param home: Directory for the fake fleet state.
+    :param count: Number of virtual machines.
+    :param latency: Injected latency of every fake vboxmanage call in seconds.
+    """
+    bin_dir = home / 'bin'
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    shim = bin_dir / 'vboxmanage'
+    shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_VBOXMANAGE}" "$@"\n')
+    shim.chmod(shim.stat().st_mode | stat.S_IEXEC)
+
+    os.environ['PATH'] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    os.environ['FAKE_VBOX_HOME'] = str(home)
+    os.environ['VBOX_USER_HOME'] = str(home)
+    os.environ['FAKE_VBOX_LATENCY'] = str(latency)
+    subprocess.run([sys.executable, str(FAKE_VBOXMANAGE), 'init', str(count)], check=True)
+
+
+def measure(operation: str, func: Callable[[], object]) -> dict:
+    """
+    Run the operation and collect its spawn count and wall time.
+    :param operation: Operation name for the report.
+    :param func: Callable to benchmark.
+    :return: Dictionary with the measurements.
+    """
+    with Commands().trace() as trace, redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        func()
+        wall_time = time.perf_counter() - start_time
+
+    return {
+        'operation': operation,
+        'spawns': len(trace),
+        'wall': wall_time,
+        'by_subcommand': dict(trace.by_subcommand()),
+    }
+
+
+def run_suite(count: int, latency: float) -> list[dict]:
+    """
+    Benchmark the library against a fake fleet of the given size.
+    :param count: Number of virtual machines.
+    :param latency: Injected latency of every fake vboxmanage call in seconds.
+    :return: List of measurements.
+    """
+    with tempfile.TemporaryDirectory(prefix='vboxwrapper-bench-') as home:
+        old_path = os.environ.get('PATH', '')
+        old_vbox_home = os.environ.get('VBOX_USER_HOME')
+        install_fake_vboxmanage(Path(home), count, latency)
+        try:
+            vm = VirtualMachine('vm-0000', cache_ttl=0)
+            file_utils = FileUtils(vm, username='user', password='password', os_type='Linux')
+            results = [
+                measure('Vbox.vm_list()', lambda: Vbox().vm_list()),
+                measure('Vbox.vm_list(group)', lambda: Vbox().vm_list('dev')),
+                measure('Vbox.is_vm_registered', lambda: Vbox().is_vm_registered('vm-0001')),
+                measure('Vbox(Registry).vm_list(group)', lambda: Vbox(inventory=Registry()).vm_list('dev')),
+                measure('Vbox(Registry).is_vm_registered', lambda: Vbox(inventory=Registry()).is_vm_registered('vm-0001')),
+                measure('MediaCleanup.plan', lambda: MediaCleanup().plan()),
+                measure('VirtualMachine.run', lambda: vm.run(headless=True)),
+                measure('Network.wait_up', lambda: vm.network.wait_up(timeout=30)),
+                measure('FileUtils.copy_to', lambda: file_utils.copy_to(str(FAKE_VBOXMANAGE), '/tmp/fake.py')),
+                measure('FileUtils.run_cmd', lambda: file_utils.run_cmd('echo test', stdout=False)),
+                measure('shutdown + wait_until_shutdown', lambda: (vm.shutdown(), vm.wait_until_shutdown(timeout=30))),
+                measure('Snapshot.restore', lambda: vm.snapshot.restore('snap-1')),
+            ]
+        finally:
+            os.environ['PATH'] = old_path
+            if old_vbox_home is None:
+                os.environ.pop('VBOX_USER_HOME', None)
+            else:
+                os.environ['VBOX_USER_HOME'] = old_vbox_home
+
+    for result in results:
+        result['fleet'] = count
+    return results
+
+
+def print_report(results: list[dict]) -> None:
+    header = f"{'fleet':>6} {'operation':<34} {'spawns':>6} {'wall, s':>9}  by subcommand"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        subcommands = ', '.join(f'{name}={count}' for name, count in sorted(result['by_subcommand'].items()))
+        print(f"{result['fleet']:>6} {result['operation']:<34} {result['spawns']:>6} {result['wall']:>9.3f}  {subcommands}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='Fleet sizes to benchmark.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Injected latency per vboxmanage call in seconds.')
+    parser.add_argument('--json', type=Path, help='Write the measurements to this JSON file.')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_suite(size, args.latency))
+
+    print_report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 from os.path import basename
 
-from . import VirtualMachine
 from .VMExceptions import VboxException
-from .commands import Commands as cmd
-from subprocess import getoutput
+from .commands import Commands
+from .identity import IdentityCache
+from .inventory import Inventory, VMRecord
+from .registry import Registry
 
 
 class Vbox:
@@ -12,19 +13,27 @@ class Vbox:
     Class for interacting with VirtualBox and managing virtual machines.
     """
 
+    def __init__(self, inventory_ttl: float = 1.0, inventory: Inventory = None):
+        """
+        :param inventory_ttl: Time in seconds for which the parsed VM inventory is reused. 0 disables caching.
+        :param inventory: Inventory to use instead of the default vboxmanage-based one,
+        e.g. `Registry()` to list and resolve virtual machines without spawning vboxmanage.
+        """
+        self.inventory = inventory if inventory is not None else Inventory(ttl=inventory_ttl)
+
     def vm_list(self, group_name: str = None) -> list[list[str]]:
         """
         Get a list of virtual machines along with their UUIDs.
         :param group_name: Filter virtual machines by group name.
         :return: List of virtual machine names and UUIDs. [[name, uuid]]
         """
-        vm_list = [
-            [vm[0].replace('"', ''), vm[1].translate(str.maketrans('', '', '{}'))]
-            for vm in [vm.split() for vm in getoutput(cmd.list).split('\n')]
-        ]
         if isinstance(group_name, str):
-            return [vm for vm in vm_list if VirtualMachine(vm[1]).get_group_name() == self.check_group_name(group_name)]
-        return vm_list
+            records = self.get_group_records(group_name)
+        elif self._inventory_is_cheap():
+            records = self.inventory.records
+        else:
+            return [list(pair) for pair in self._list_vms()]
+        return [[record.name, record.uuid] for record in records]
 
     def check_vm_names(self, vm_names: list | str) -> list | str:
         """
@@ -54,26 +63,40 @@ class Vbox:
         """
         return [vm[1] for vm in self.vm_list(group_name)]
 
-    @staticmethod
-    def get_group_list() -> list:
+    def get_group_list(self) -> list:
         """
         Get a list of available groups.
         :return: List of group names.
         """
-        return [basename(group) for group in getoutput(cmd.group_list).replace('"', '').split('\n')]
+        if isinstance(self.inventory, Registry):
+            return sorted({basename(group) for record in self.inventory.records for group in record.groups})
+        _cmd = Commands()
+        return [basename(group) for group in _cmd.get_output(_cmd.group_list).replace('"', '').split('\n')]
+
+    def get_group_records(self, group_name: str) -> list[VMRecord]:
+        """
+        Get the inventory records of the virtual machines in a group.
+        The group is validated against the same records, so this costs at most one inventory refresh.
+        :param group_name: Group name.
+        :return: List of virtual machine records in inventory order.
+        """
+        records = self.inventory.records
+        members = [record for record in records if record.in_group(group_name)]
+        if not members:
+            self._raise_unknown_group(group_name, {basename(group) for record in records for group in record.groups})
+        return members
 
     def check_group_name(self, group_name: str) -> str:
         """
         Checks if the group exists in the Vbox
+        Uses the inventory if it is loaded and the cheap `list groups` call otherwise.
         :param group_name: Group name to check.
         :return: Group name if exists.
         """
-        existing_names = self.get_group_list()
-        if group_name in existing_names:
-            return group_name
-        raise VboxException(
-            f"[red]|ERROR| The group name {group_name} does not exist. Existing groups:\n{existing_names}"
-        )
+        existing_names = self.inventory.group_names() if self._inventory_is_cheap() else set(self.get_group_list())
+        if group_name not in existing_names:
+            self._raise_unknown_group(group_name, existing_names)
+        return group_name
 
     def is_vm_registered(self, vm_name_or_uuid: str) -> bool:
         """
@@ -81,8 +104,30 @@ class Vbox:
         :param vm_name_or_uuid: Virtual machine name or UUID.
         :return: True if the virtual machine is registered, False otherwise.
         """
-        vm_list = self.vm_list()
-        for vm_name, vm_uuid in vm_list:
-            if vm_name_or_uuid in (vm_name, vm_uuid):
-                return True
-        return False
+        if self._inventory_is_cheap():
+            return self.inventory.get(vm_name_or_uuid) is not None
+        return any(vm_name_or_uuid in pair for pair in self._list_vms())
+
+    @staticmethod
+    def _raise_unknown_group(group_name: str, existing_names: set[str]) -> None:
+        raise VboxException(
+            f"[red]|ERROR| The group name {group_name} does not exist. Existing groups:\n{existing_names}"
+        )
+
+    def _inventory_is_cheap(self) -> bool:
+        """
+        Check whether the inventory answers without a `list -l vms` call, which is much slower than `list vms`
+        because it queries every virtual machine.
+        """
+        return isinstance(self.inventory, Registry) or self.inventory.is_fresh
+
+    @staticmethod
+    def _list_vms() -> list[tuple[str, str]]:
+        """
+        Get the names and UUIDs of all registered virtual machines with a single `list vms` call.
+        :return: List of (name, uuid) tuples including inaccessible virtual machines.
+        """
+        _cmd = Commands()
+        pairs = IdentityCache().parse(_cmd.get_output(_cmd.list), include_inaccessible=True)
+        IdentityCache().update(((name, uuid) for name, uuid in pairs if name != '<inaccessible>'), complete=True)
+        return pairs
@@ -1,8 +1,17 @@
 # -*- coding: utf-8 -*-
+import base64
+import shlex
+from pathlib import Path, PurePosixPath, PureWindowsPath
 from subprocess import CompletedProcess
+from tempfile import TemporaryDirectory
+from uuid import uuid4
 
-from ..commands import Commands
+from ..commands import Commands, CommandStream
+from ..console import print
 from ..VirtualMachine import VirtualMachine
+from ..VMExceptions import VirtualMachinException
+from . import file_sync, guest_batch
+from .file_sync import SyncResult
 
 class FileUtils:
     """
@@ -23,24 +32,28 @@ class FileUtils:
         self._auth_cmd = f"--username {username} --password {password}"
         self.os_type = os_type
 
-    def copy_to(self, local_path: str, remote_path: str) -> CompletedProcess:
+    def copy_to(self, local_path: str, remote_path: str, timeout: float = None) -> CompletedProcess:
         """
         Copy files from source to destination on the virtual machine.
         :param local_path: Source path.
         :param remote_path: Destination path.
+        :param timeout: Timeout in seconds. Raises subprocess.TimeoutExpired when exceeded.
         """
         return self._cmd.run(
-            f"{self._cmd.guestcontrol} {self.name} copyto {local_path} {remote_path} {self._auth_cmd}"
+            f"{self._cmd.guestcontrol} {self.name} copyto {local_path} {remote_path} {self._auth_cmd}",
+            timeout=timeout
         )
 
-    def copy_from(self, remote_path: str, local_path: str) -> CompletedProcess:
+    def copy_from(self, remote_path: str, local_path: str, timeout: float = None) -> CompletedProcess:
         """
         Copy files from source to destination on the virtual machine.
         :param local_path: Source path.
         :param remote_path: Destination path.
+        :param timeout: Timeout in seconds. Raises subprocess.TimeoutExpired when exceeded.
         """
         return self._cmd.run(
-            f"{self._cmd.guestcontrol} {self.name} copyfrom {remote_path} {local_path} {self._auth_cmd}"
+            f"{self._cmd.guestcontrol} {self.name} copyfrom {remote_path} {local_path} {self._auth_cmd}",
+            timeout=timeout
         )
 
     def run_cmd(
@@ -51,7 +64,9 @@ class FileUtils:
             stderr: bool = True,
             wait_stdout: bool = True,
             status_bar: bool = False,
-            max_stdout_lines: int = 20
+            max_stdout_lines: int = 20,
+            capture_limit: int = None,
+            timeout: float = None
     ) -> CompletedProcess:
         """
         Run a command on the virtual machine.
@@ -64,6 +79,9 @@ class FileUtils:
         :param stderr: If True, captures and optionally prints the standard error. Defaults to True.
         :param status_bar: If True, displays a status bar for output updates. Defaults to False.
         :param max_stdout_lines: The maximum number of lines to retain and display in the status bar. Defaults to 20.
+        :param capture_limit: Memory cap in bytes per output stream. Output above it spills to a temporary file
+        and stdout/stderr are returned as `CapturedOutput` objects. Defaults to None (capture to strings).
+        :param timeout: Timeout in seconds. Raises subprocess.TimeoutExpired when exceeded.
         :param command: The command to run on the virtual machine.
         :param shell: Optional shell to use for running the command. If not provided,
         the default shell for the operating system is used.
@@ -75,10 +93,327 @@ class FileUtils:
             stderr=stderr,
             stdout_color='cyan' if status_bar else None,
             status_bar=status_bar,
-            max_stdout_lines=max_stdout_lines
+            max_stdout_lines=max_stdout_lines,
+            capture_limit=capture_limit,
+            timeout=timeout
         )
 
-    def _get_run_cmd(self, shell: str, wait_stdout: bool = True):
+    def run_cmd_stream(
+            self,
+            command: str,
+            shell: str = None,
+            encoding: str = 'utf-8',
+            errors: str = 'replace',
+            timeout: float = None
+    ) -> CommandStream:
+        """
+        Run a command on the virtual machine and iterate over its output lines as the guest produces them.
+        Usage: `with file_utils.run_cmd_stream('pytest -v') as output: for stream, line in output: ...`.
+        When the iteration is finished, `output.returncode` holds the exit code reported by
+        `guestcontrol run`, which is the exit code of the guest command.
+        Leaving the `with` block early terminates the command.
+
+        :param command: The command to run on the virtual machine.
+        :param shell: Optional shell to use for running the command. If not provided,
+        the default shell for the operating system is used.
+        :param encoding: Encoding for the command output. Defaults to 'utf-8'.
+        :param errors: Error handling for encoding issues. Defaults to 'replace'.
+        :param timeout: Timeout in seconds. The iteration raises subprocess.TimeoutExpired when exceeded.
+        :return: CommandStream yielding tuples of ('stdout' or 'stderr', line).
+        """
+        return self._cmd.stream(
+            f'{self._cmd.guestcontrol} {self.name} {self._get_run_cmd(shell, wait_stdout=True, wait_stderr=True)} "{command}"',
+            encoding=encoding,
+            errors=errors,
+            timeout=timeout
+        )
+
+    def run_batch(
+            self,
+            commands: list[str],
+            shell: str = None,
+            stdout: bool = True,
+            stderr: bool = True,
+            timeout: float = None
+    ) -> list[CompletedProcess]:
+        """
+        Run several commands in one guest session, paying for a single guestcontrol spawn and guest login.
+        The commands run in order in one bash, PowerShell or cmd script, so `cd` and variables carry over.
+        The output of each command is framed with unique markers and split back into separate results.
+        With cmd, commands must not contain double quotes.
+
+        :param commands: Commands to run on the virtual machine.
+        :param shell: Optional shell to use for running the commands. If not provided,
+        the default shell for the operating system is used.
+        :param stdout: If True, prints the standard output. Defaults to True.
+        :param stderr: If True, prints the standard error. Defaults to True.
+        :param timeout: Timeout in seconds for the whole batch. Raises subprocess.TimeoutExpired when exceeded.
+        :return: List of `CompletedProcess` objects, one per command in order. A command that did not finish,
+        e.g. because an earlier command called `exit`, gets the return code of the whole batch.
+        """
+        if not commands:
+            return []
+
+        _shell = self._get_shell(shell) if shell else self._get_default_shell()
+        marker = guest_batch.new_marker()
+        demux = guest_batch.BatchDemux(commands, marker)
+        script = guest_batch.build_script(commands, marker, guest_batch.shell_kind(_shell))
+
+        with self._cmd.stream(self._script_command(script, _shell), timeout=timeout) as output:
+            for stream, line in output:
+                if demux.feed(stream, line) is None:
+                    continue
+                if stream == CommandStream.STDOUT and stdout:
+                    print(line)
+                elif stream == CommandStream.STDERR and stderr:
+                    print(f"[red]{line}")
+
+        return demux.results(output.returncode)
+
+    def sync_to(
+            self,
+            local_dir: str,
+            remote_dir: str,
+            pack: bool = None,
+            pack_threshold: int = 20,
+            timeout: float = None
+    ) -> SyncResult:
+        """
+        Copy a local directory tree to the virtual machine, transferring only files whose sha256 differs
+        from the guest copy. The guest manifest is computed with sha256sum (Linux) or Get-FileHash (Windows).
+        Files missing locally are not deleted in the guest.
+        :param local_dir: Local source directory.
+        :param remote_dir: Guest destination directory.
+        :param pack: Whether to upload the changed files as one archive that is unpacked in the guest.
+        If None, files are packed when more than `pack_threshold` of them changed.
+        :param pack_threshold: Number of changed files above which files are packed automatically.
+        :param timeout: Timeout in seconds for each guest command. Raises subprocess.TimeoutExpired when exceeded.
+        :return: SyncResult with the transferred, unchanged and failed paths.
+        Raises VirtualMachinException if the guest manifest cannot be read.
+        """
+        changed, unchanged = file_sync.diff_manifests(
+            file_sync.local_manifest(local_dir),
+            self._remote_manifest(remote_dir, timeout)
+        )
+        result = SyncResult(unchanged=unchanged, packed=bool(changed) and self._should_pack(pack, changed, pack_threshold))
+        if result.packed:
+            self._upload_archive(local_dir, remote_dir, changed, result, timeout)
+        elif changed:
+            self._upload_files(local_dir, remote_dir, changed, result, timeout)
+
+        print(
+            f"[green]|INFO|{self.name}| Synced [cyan]{len(result.transferred)}[/] files to {remote_dir}, "
+            f"{len(result.unchanged)} unchanged, {len(result.errors)} failed"
+        )
+        return result
+
+    def sync_from(
+            self,
+            remote_dir: str,
+            local_dir: str,
+            pack: bool = None,
+            pack_threshold: int = 20,
+            timeout: float = None
+    ) -> SyncResult:
+        """
+        Copy a guest directory tree to the host, transferring only files whose sha256 differs from the local copy.
+        Files missing in the guest are not deleted locally.
+        :param remote_dir: Guest source directory.
+        :param local_dir: Local destination directory.
+        :param pack: Whether to pack the changed files into one archive in the guest and download it.
+        If None, files are packed when more than `pack_threshold` of them changed.
+        :param pack_threshold: Number of changed files above which files are packed automatically.
+        :param timeout: Timeout in seconds for each guest command. Raises subprocess.TimeoutExpired when exceeded.
+        :return: SyncResult with the transferred, unchanged and failed paths.
+        Raises VirtualMachinException if the guest manifest cannot be read.
+        """
+        changed, unchanged = file_sync.diff_manifests(
+            self._remote_manifest(remote_dir, timeout),
+            file_sync.local_manifest(local_dir)
+        )
+        result = SyncResult(unchanged=unchanged, packed=bool(changed) and self._should_pack(pack, changed, pack_threshold))
+        if result.packed:
+            self._download_archive(remote_dir, local_dir, changed, result, timeout)
+        elif changed:
+            self._download_files(remote_dir, local_dir, changed, result, timeout)
+
+        print(
+            f"[green]|INFO|{self.name}| Synced [cyan]{len(result.transferred)}[/] files from {remote_dir}, "
+            f"{len(result.unchanged)} unchanged, {len(result.errors)} failed"
+        )
+        return result
+
+    def _remote_manifest(self, remote_dir: str, timeout: float = None) -> dict[str, str]:
+        output = self._run_script(file_sync.manifest_script(remote_dir, self._is_windows()), timeout)
+        if output.returncode != 0:
+            raise VirtualMachinException(
+                f"[red]|ERROR|{self.name}| Failed to read the manifest of {remote_dir}: "
+                f"{output.stderr or f'exit code {output.returncode}'}"
+            )
+        return file_sync.parse_manifest(output.stdout)
+
+    def _upload_files(
+            self,
+            local_dir: str, remote_dir: str,
+            files: list[str],
+            result: SyncResult,
+            timeout: float = None
+    ) -> None:
+        by_directory = self._group_by_parent(files)
+        remote_dirs = {parent: self._remote_path(remote_dir, parent) for parent in by_directory}
+        self._make_remote_dirs(remote_dirs.values(), timeout)
+        for parent, names in by_directory.items():
+            sources = ' '.join(shlex.quote(str(Path(local_dir, path))) for path in names)
+            output = self._cmd.run(
+                f"{self._cmd.guestcontrol} {self.name} copyto "
+                f"--target-directory={shlex.quote(remote_dirs[parent])} {sources} {self._auth_cmd}",
+                stdout=False,
+                stderr=False,
+                timeout=timeout
+            )
+            (result.transferred if output.returncode == 0 else result.errors).extend(names)
+
+    def _download_files(
+            self,
+            remote_dir: str, local_dir: str,
+            files: list[str],
+            result: SyncResult,
+            timeout: float = None
+    ) -> None:
+        for parent, names in self._group_by_parent(files).items():
+            target = Path(local_dir, parent)
+            target.mkdir(parents=True, exist_ok=True)
+            sources = ' '.join(shlex.quote(self._remote_path(remote_dir, path)) for path in names)
+            output = self._cmd.run(
+                f"{self._cmd.guestcontrol} {self.name} copyfrom "
+                f"--target-directory={shlex.quote(str(target))} {sources} {self._auth_cmd}",
+                stdout=False,
+                stderr=False,
+                timeout=timeout
+            )
+            (result.transferred if output.returncode == 0 else result.errors).extend(names)
+
+    def _upload_archive(
+            self,
+            local_dir: str, remote_dir: str,
+            files: list[str],
+            result: SyncResult,
+            timeout: float = None
+    ) -> None:
+        windows = self._is_windows()
+        archive_name = f"{file_sync.ARCHIVE_PREFIX}{uuid4().hex}{'.zip' if windows else '.tar.gz'}"
+        remote_archive = self._remote_path(remote_dir, archive_name)
+        self._make_remote_dirs([remote_dir], timeout)
+
+        with TemporaryDirectory(prefix='vboxwrapper-sync-') as tmp_dir:
+            archive = Path(tmp_dir, archive_name)
+            file_sync.pack_local(local_dir, files, archive, windows)
+            copied = self._cmd.run(
+                f"{self._cmd.guestcontrol} {self.name} copyto "
+                f"{shlex.quote(str(archive))} {shlex.quote(remote_archive)} {self._auth_cmd}",
+                stdout=False,
+                stderr=False,
+                timeout=timeout
+            )
+
+        unpacked = copied.returncode == 0 and self._run_script(
+            file_sync.unpack_script(remote_archive, remote_dir, windows), timeout
+        ).returncode == 0
+        (result.transferred if unpacked else result.errors).extend(files)
+
+    def _download_archive(
+            self,
+            remote_dir: str, local_dir: str,
+            files: list[str],
+            result: SyncResult,
+            timeout: float = None
+    ) -> None:
+        windows = self._is_windows()
+        archive_name = f"{file_sync.ARCHIVE_PREFIX}{uuid4().hex}{'.zip' if windows else '.tar.gz'}"
+        remote_archive = self._remote_path(remote_dir, archive_name)
+        packed = self._run_script(file_sync.pack_script(remote_dir, files, remote_archive, windows), timeout)
+        if packed.returncode != 0:
+            result.errors.extend(files)
+            return
+
+        with TemporaryDirectory(prefix='vboxwrapper-sync-') as tmp_dir:
+            copied = self._cmd.run(
+                f"{self._cmd.guestcontrol} {self.name} copyfrom "
+                f"--target-directory={shlex.quote(tmp_dir)} {shlex.quote(remote_archive)} {self._auth_cmd}",
+                stdout=False,
+                stderr=False,
+                timeout=timeout
+            )
+            self._cmd.run(
+                f"{self._cmd.guestcontrol} {self.name} rm --force {shlex.quote(remote_archive)} {self._auth_cmd}",
+                stdout=False,
+                stderr=False,
+                timeout=timeout
+            )
+            if copied.returncode != 0:
+                result.errors.extend(files)
+                return
+            Path(local_dir).mkdir(parents=True, exist_ok=True)
+            file_sync.unpack_local(Path(tmp_dir, archive_name), local_dir)
+        result.transferred.extend(files)
+
+    def _make_remote_dirs(self, directories, timeout: float = None) -> None:
+        paths = ' '.join(shlex.quote(directory) for directory in dict.fromkeys(directories))
+        self._cmd.run(
+            f"{self._cmd.guestcontrol} {self.name} mkdir --parents {paths} {self._auth_cmd}",
+            stdout=False,
+            stderr=False,
+            timeout=timeout
+        )
+
+    def _run_script(self, script: str, timeout: float = None) -> CompletedProcess:
+        """
+        Run a multi-line helper script in the default guest shell and capture its output.
+        :param script: Script text in the dialect of the default shell.
+        :param timeout: Timeout in seconds. Raises subprocess.TimeoutExpired when exceeded.
+        :return: A `CompletedProcess` object with the captured output.
+        """
+        return self._cmd.run(self._script_command(script), stdout=False, stderr=False, timeout=timeout)
+
+    def _script_command(self, script: str, shell: str = None) -> str:
+        """
+        Build the guestcontrol command line that runs a script without host or guest quoting issues:
+        bash gets the script as one shell-quoted argument, PowerShell gets it with -EncodedCommand,
+        cmd runs it with delayed expansion (/v:on).
+        :param script: Script text.
+        :param shell: Optional shell. If not provided, the default shell for the operating system is used.
+        :return: Command line string.
+        """
+        _shell = self._get_shell(shell) if shell else self._get_default_shell()
+        kind = guest_batch.shell_kind(_shell)
+        if kind == guest_batch.POWERSHELL:
+            encoded = base64.b64encode(script.encode('utf-16-le')).decode()
+            command = f"{self._get_run_cmd(_shell, wait_stderr=True)} -NoProfile -NonInteractive -EncodedCommand {encoded}"
+        elif kind == guest_batch.CMD:
+            command = (
+                f"run{self._get_default_shell_path(_shell)} {self._auth_cmd} --wait-stdout --wait-stderr "
+                f"-- cmd.exe /v:on /q /c {shlex.quote(script)}"
+            )
+        else:
+            command = f"{self._get_run_cmd(_shell, wait_stderr=True)} {shlex.quote(script)}"
+        return f"{self._cmd.guestcontrol} {self.name} {command}"
+
+    def _remote_path(self, remote_dir: str, relative_path: str) -> str:
+        path_type = PureWindowsPath if self._is_windows() else PurePosixPath
+        return str(path_type(remote_dir, *relative_path.split('/')))
+
+    @staticmethod
+    def _group_by_parent(files: list[str]) -> dict[str, list[str]]:
+        groups = {}
+        for path in files:
+            groups.setdefault(str(PurePosixPath(path).parent), []).append(path)
+        return groups
+
+    @staticmethod
+    def _should_pack(pack: bool, files: list[str], pack_threshold: int) -> bool:
+        return pack if pack is not None else len(files) > pack_threshold
+
+    def _get_run_cmd(self, shell: str, wait_stdout: bool = True, wait_stderr: bool = False):
         """
         Construct the command to execute on the virtual machine.
 
@@ -86,11 +421,14 @@ class FileUtils:
         the operating system of the virtual machine.
 
         :param shell: The shell to use for running the command.
+        :param wait_stdout: Whether to wait for and forward the stdout of the guest process.
+        :param wait_stderr: Whether to wait for and forward the stderr of the guest process.
         :return: A formatted command string for execution.
         """
         _shell = self._get_shell(shell) if shell else self._get_default_shell()
         _wait_stdout = " --wait-stdout" if wait_stdout else ""
-        return f'run{self._get_default_shell_path(_shell)} {self._auth_cmd}{_wait_stdout} -- {_shell}'
+        _wait_stderr = " --wait-stderr" if wait_stderr else ""
+        return f'run{self._get_default_shell_path(_shell)} {self._auth_cmd}{_wait_stdout}{_wait_stderr} -- {_shell}'
 
     @staticmethod
     def _get_default_shell_path(shell: str) -> str:
@@ -125,7 +463,11 @@ class FileUtils:
 
         :return: The default shell path as a string.
         """
-        os_type = self.os_type or self.vm.get_os_type()
-        if os_type and 'windows' in os_type.lower():
+        if self._is_windows():
             return 'powershell.exe'
         return '/usr/bin/bash -c'
+
+    def _is_windows(self) -> bool:
+        if not self.os_type:
+            self.os_type = self.vm.get_os_type()
+        return bool(self.os_type and 'windows' in self.os_type.lower())
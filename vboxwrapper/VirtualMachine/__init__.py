@@ -1,3 +1,21 @@
 # -*- coding: utf-8 -*-
-from .virtualmachine import VirtualMachine
-from .FileUtils import FileUtils
+from importlib import import_module
+
+_LAZY_ATTRIBUTES = {
+    'VirtualMachine': '.virtualmachine',
+    'FileUtils': '.FileUtils',
+}
+
+__all__ = ['VirtualMachine', 'FileUtils']
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import re
+import shlex
+import tarfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+
+ARCHIVE_PREFIX = '.vboxwrapper-sync-'
+_ESCAPE = re.compile(r'\\(.)')
+_ESCAPES = {'n': '\n', 'r': '\r'}
+
+_digest_cache: dict[tuple[str, int, int], str] = {}
+_digest_cache_lock = Lock()
+
+
+@dataclass
+class SyncResult:
+    """
+    Result of a manifest-based directory sync.
+    Paths are relative to the synced directories and use forward slashes.
+    """
+    transferred: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    packed: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def returncode(self) -> int:
+        return 0 if self.ok else 1
+
+
+def file_digest(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the sha256 of a local file.
+    Digests are cached by path, size and modification time, so syncing an unchanged bundle
+    to many virtual machines hashes it only once.
+    :param path: Path to the file.
+    :param chunk_size: Read size in bytes.
+    :return: Hex digest.
+    """
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    with _digest_cache_lock:
+        if key in _digest_cache:
+            return _digest_cache[key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+
+    with _digest_cache_lock:
+        _digest_cache[key] = digest.hexdigest()
+    return digest.hexdigest()
+
+
+def local_manifest(directory: str) -> dict[str, str]:
+    """
+    Compute the content manifest of a local directory tree.
+    :param directory: Local directory. A missing directory has an empty manifest.
+    :return: Dictionary of relative paths and sha256 digests.
+    """
+    root = Path(directory)
+    if not root.is_dir():
+        return {}
+    return {path.relative_to(root).as_posix(): file_digest(path) for path in sorted(root.rglob('*')) if path.is_file()}
+
+
+def parse_manifest(output: str) -> dict[str, str]:
+    """
+    Parse a guest manifest printed in `sha256sum` format: `<digest>  <relative path>` per line.
+    sha256sum escapes paths containing a backslash, newline or carriage return and marks their line
+    with a leading backslash, such paths are unescaped.
+    :param output: Output of the manifest script.
+    :return: Dictionary of relative paths and sha256 digests.
+    """
+    manifest = {}
+    for line in output.split('\n'):
+        escaped = line.startswith('\\')
+        digest, separator, path = line.removeprefix('\\').rstrip('\r').partition('  ')
+        if not separator or len(digest) != 64:
+            continue
+        path = path.removeprefix('*')
+        if escaped:
+            path = _ESCAPE.sub(lambda match: _ESCAPES.get(match.group(1), match.group(1)), path)
+        path = path.removeprefix('./')
+        if not path.startswith(ARCHIVE_PREFIX):
+            manifest[path] = digest.lower()
+    return manifest
+
+
+def diff_manifests(source: dict[str, str], target: dict[str, str]) -> tuple[list[str], list[str]]:
+    """
+    Compare two manifests.
+    :param source: Manifest of the side files are copied from.
+    :param target: Manifest of the side files are copied to.
+    :return: Tuple of (changed or missing paths, unchanged paths).
+    """
+    changed = [path for path, digest in source.items() if target.get(path) != digest]
+    unchanged = [path for path, digest in source.items() if target.get(path) == digest]
+    return changed, unchanged
+
+
+def powershell_quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def manifest_script(directory: str, windows: bool) -> str:
+    """
+    Build the guest script that prints the manifest of a guest directory in `sha256sum` format.
+    :param directory: Guest directory.
+    :param windows: Build a PowerShell script instead of a bash script.
+    :return: Script text.
+    """
+    if windows:
+        return (
+            f"$root = {powershell_quote(directory)}\n"
+            "if (Test-Path -LiteralPath $root -PathType Container) {\n"
+            "  $base = (Resolve-Path -LiteralPath $root).ProviderPath.TrimEnd('\\') + '\\'\n"
+            "  Get-ChildItem -LiteralPath $root -Recurse -File | ForEach-Object {\n"
+            "    (Get-FileHash -Algorithm SHA256 -LiteralPath $_.FullName).Hash.ToLower() + '  ' + "
+            "$_.FullName.Substring($base.Length).Replace('\\', '/')\n"
+            "  }\n"
+            "}"
+        )
+    return f"cd -- {shlex.quote(directory)} 2>/dev/null || exit 0\nfind . -type f -exec sha256sum -- {{}} +"
+
+
+def unpack_script(archive: str, directory: str, windows: bool) -> str:
+    """
+    Build the guest script that extracts an uploaded archive into a directory and removes the archive.
+    :param archive: Guest path of the archive.
+    :param directory: Guest destination directory.
+    :param windows: Build a PowerShell script for a zip archive instead of a bash script for a tar.gz archive.
+    :return: Script text.
+    """
+    if windows:
+        return (
+            f"Expand-Archive -Force -LiteralPath {powershell_quote(archive)} "
+            f"-DestinationPath {powershell_quote(directory)}\n"
+            f"$status = [int](-not $?)\n"
+            f"Remove-Item -Force -LiteralPath {powershell_quote(archive)}\n"
+            "exit $status"
+        )
+    return (
+        f"tar -xzf {shlex.quote(archive)} -C {shlex.quote(directory)}\n"
+        "status=$?\n"
+        f"rm -f -- {shlex.quote(archive)}\n"
+        "exit $status"
+    )
+
+
+def pack_script(directory: str, files: list[str], archive: str, windows: bool) -> str:
+    """
+    Build the guest script that packs files of a guest directory into one archive.
+    :param directory: Guest directory the file paths are relative to.
+    :param files: Relative paths with forward slashes.
+    :param archive: Guest path of the archive to create.
+    :param windows: Build a PowerShell script for a zip archive instead of a bash script for a tar.gz archive.
+    :return: Script text.
+    """
+    if windows:
+        entries = '\n'.join(f"  {powershell_quote(path)}" for path in files)
+        return (
+            "Add-Type -AssemblyName System.IO.Compression.FileSystem\n"
+            f"$root = {powershell_quote(directory)}\n"
+            f"$zip = [IO.Compression.ZipFile]::Open({powershell_quote(archive)}, 'Create')\n"
+            "try {\n"
+            f"  foreach ($entry in @(\n{entries}\n  )) {{\n"
+            "    $path = Join-Path $root $entry.Replace('/', '\\')\n"
+            "    [void][IO.Compression.ZipFileExtensions]::CreateEntryFromFile($zip, $path, $entry)\n"
+            "  }\n"
+            "} finally { $zip.Dispose() }"
+        )
+    terminator = 'VBOXWRAPPER_SYNC_FILES'
+    file_list = '\n'.join(f"./{path}" for path in files)
+    return f"cd -- {shlex.quote(directory)} && tar -czf {shlex.quote(archive)} -T - <<'{terminator}'\n{file_list}\n{terminator}"
+
+
+def pack_local(directory: str, files: list[str], archive: Path, windows: bool) -> None:
+    """
+    Pack files of a local directory into an archive for the guest: zip for Windows guests, tar.gz otherwise.
+    :param directory: Local directory the file paths are relative to.
+    :param files: Relative paths with forward slashes.
+    :param archive: Path of the archive to create.
+    :param windows: Whether the archive is unpacked by a Windows guest.
+    """
+    root = Path(directory)
+    if windows:
+        with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+            for path in files:
+                zip_file.write(root / path, path)
+        return
+
+    with tarfile.open(archive, 'w:gz') as tar_file:
+        for path in files:
+            tar_file.add(root / path, arcname=path)
+
+
+def unpack_local(archive: Path, directory: str) -> None:
+    """
+    Extract an archive downloaded from the guest into a local directory.
+    :param archive: Path of a zip or tar.gz archive.
+    :param directory: Local destination directory.
+    """
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zip_file:
+            zip_file.extractall(directory)
+        return
+
+    with tarfile.open(archive, 'r:gz') as tar_file:
+        tar_file.extractall(directory, filter='data')
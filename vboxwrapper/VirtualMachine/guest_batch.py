@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import shlex
+from subprocess import CompletedProcess
+from typing import Optional
+from uuid import uuid4
+
+BASH = 'bash'
+POWERSHELL = 'powershell'
+CMD = 'cmd'
+
+
+def new_marker() -> str:
+    return f"VBOXWRAPPER-{uuid4().hex}"
+
+
+def shell_kind(shell: str) -> str:
+    """
+    Map a guest shell command line to the script dialect used for batches.
+    :param shell: Shell as returned by FileUtils._get_shell or FileUtils._get_default_shell.
+    :return: BASH, POWERSHELL or CMD.
+    """
+    _shell = shell.lower()
+    if 'powershell' in _shell:
+        return POWERSHELL
+    if 'cmd' in _shell:
+        return CMD
+    return BASH
+
+
+def build_script(commands: list[str], marker: str, kind: str) -> str:
+    """
+    Build one guest script that runs the commands in order and frames the stdout, stderr and exit code
+    of each command with `<marker>:BEGIN:<index>` and `<marker>:END:<index>:<exit code>` lines on both streams.
+    Commands share the shell session, so `cd` and variables carry over to the next command.
+    :param commands: Commands to run.
+    :param marker: Unique marker, see new_marker().
+    :param kind: Script dialect: BASH, POWERSHELL or CMD.
+    :return: Script text.
+    """
+    if kind == POWERSHELL:
+        return '\n'.join(_powershell_step(index, command, marker) for index, command in enumerate(commands))
+    if kind == CMD:
+        return ' & '.join(_cmd_step(index, command, marker) for index, command in enumerate(commands))
+    return '\n'.join(_bash_step(index, command, marker) for index, command in enumerate(commands))
+
+
+def _bash_step(index: int, command: str, marker: str) -> str:
+    return (
+        f"echo '{marker}:BEGIN:{index}'; echo '{marker}:BEGIN:{index}' >&2\n"
+        f"eval {shlex.quote(command)}\n"
+        f"rc=$?; echo \"{marker}:END:{index}:$rc\"; echo \"{marker}:END:{index}:$rc\" >&2"
+    )
+
+
+def _powershell_step(index: int, command: str, marker: str) -> str:
+    return (
+        f"Write-Output '{marker}:BEGIN:{index}'; [Console]::Error.WriteLine('{marker}:BEGIN:{index}')\n"
+        "$global:LASTEXITCODE = 0; $errorCount = $Error.Count; $ok = $true\n"
+        f"try {{ . {{\n{command}\n}} | Out-Default }} catch {{ $ok = $false; [Console]::Error.WriteLine($_) }}\n"
+        "$rc = if ($global:LASTEXITCODE) { $global:LASTEXITCODE } "
+        "elseif ($ok -and $Error.Count -eq $errorCount) { 0 } else { 1 }\n"
+        f"Write-Output \"{marker}:END:{index}:$rc\"; [Console]::Error.WriteLine(\"{marker}:END:{index}:$rc\")"
+    )
+
+
+def _cmd_step(index: int, command: str, marker: str) -> str:
+    # Requires `cmd.exe /v:on`, so !errorlevel! is expanded after the command has run.
+    return (
+        f"echo {marker}:BEGIN:{index}& (echo {marker}:BEGIN:{index}) 1>&2& ({command})"
+        f"& echo {marker}:END:{index}:!errorlevel!& (echo {marker}:END:{index}:!errorlevel!) 1>&2"
+    )
+
+
+class BatchDemux:
+    """
+    Splits the framed output of a batch script back into per-command stdout, stderr and exit codes.
+    Lines outside the markers, e.g. a login banner, are dropped.
+    """
+
+    def __init__(self, commands: list[str], marker: str):
+        self.commands = commands
+        self.marker = f"{marker}:"
+        self._output = {stream: [[] for _ in commands] for stream in ('stdout', 'stderr')}
+        self._current: dict[str, Optional[int]] = {'stdout': None, 'stderr': None}
+        self._returncodes: list[Optional[int]] = [None] * len(commands)
+
+    def feed(self, stream: str, line: str) -> Optional[int]:
+        """
+        Process one output line.
+        :param stream: 'stdout' or 'stderr'.
+        :param line: Output line without the trailing newline.
+        :return: Index of the command the line belongs to, or None for marker and unframed lines.
+        """
+        if line.strip().startswith(self.marker):
+            self._handle_marker(stream, line.strip()[len(self.marker):])
+            return None
+
+        index = self._current[stream]
+        if index is not None:
+            self._output[stream][index].append(line.strip())
+        return index
+
+    def results(self, batch_returncode: int) -> list[CompletedProcess]:
+        """
+        Build the per-command results.
+        :param batch_returncode: Return code of the whole batch. It is used for commands without an END marker,
+        e.g. after `exit` or when the batch was interrupted; -1 if the batch itself returned 0.
+        :return: List of `CompletedProcess` objects in command order.
+        """
+        missing_returncode = batch_returncode if batch_returncode else -1
+        return [
+            CompletedProcess(
+                command,
+                returncode=missing_returncode if returncode is None else returncode,
+                stdout="\n".join(stdout).strip(),
+                stderr="\n".join(stderr).strip()
+            )
+            for command, returncode, stdout, stderr in zip(
+                self.commands, self._returncodes, self._output['stdout'], self._output['stderr']
+            )
+        ]
+
+    def _handle_marker(self, stream: str, marker: str) -> None:
+        kind, _, rest = marker.partition(':')
+        index, _, returncode = rest.partition(':')
+        if not index.isdigit() or int(index) >= len(self.commands):
+            return
+
+        if kind == 'BEGIN':
+            self._current[stream] = int(index)
+        elif kind == 'END':
+            self._current[stream] = None
+            if returncode.strip().lstrip('-').isdigit():
+                self._returncodes[int(index)] = int(returncode)
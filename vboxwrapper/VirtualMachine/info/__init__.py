@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
 from .info import Info
-from .vm_config import ConfigEditor, ConfigParser
+from .vm_config import ConfigEditor, ConfigParser, NetworkAdapter
+from .machine_readable import parse_machine_readable
@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 import re
+import time
 from os.path import isfile, dirname
-from typing import Optional
+from threading import Lock
+from typing import Callable, Optional
+from weakref import WeakSet
 
-from .vm_config import ConfigParser, ConfigEditor
+from .machine_readable import parse_machine_readable
+from .vm_config import ConfigParser, ConfigEditor, NetworkAdapter
 from ...commands import Commands
+from ...identity import IdentityCache
+from ...inventory import Inventory, VMRecord
 
 
 class Info:
@@ -12,11 +18,25 @@ class Info:
     Class to get information about the virtual machine.
     """
     _cmd = Commands()
+    _identity = IdentityCache()
     _UUID_PATTERN = re.compile(
         r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'
     )
+    _GUEST_PROPERTY_EVENT = re.compile(r'^Name:\s*(?P<name>.*?),\s*value:\s*(?P<value>.*?),\s*flags:', re.MULTILINE)
+    _instances = WeakSet()
+    _instances_lock = Lock()
+    _MAX_NETWORK_ADAPTERS = 8
+    WAIT_SLICE = 30.0
+    _EARLY_RETURN_DELAY = 1.0
 
-    def __init__(self, vm_id: str, config_path: str = None):
+    def __init__(self, vm_id: str, config_path: str = None, cache_ttl: float = 1.0, inventory: Inventory = None):
+        """
+        :param vm_id: Virtual machine ID (name or uuid).
+        :param config_path: Path to the virtual machine configuration file.
+        :param cache_ttl: Time in seconds for which the parsed showvminfo output is reused. 0 disables caching.
+        :param inventory: Inventory or Registry used to resolve the name, UUID and config path without a
+        showvminfo call. Settings of virtual machines that it reports as powered off are read from the .vbox file.
+        """
         self.__vm_id = vm_id
         self.__vm_id_is_uuid = self._is_uuid(vm_id)
         self.__name = None
@@ -25,7 +45,24 @@ class Info:
         self.__config_path = None
         self.__config_editor = None
         self.__default_vm_dir = None
+        self.__vm_info = None
+        self.__vm_info_lower = {}
+        self.__vm_info_time = 0.0
+        self.cache_ttl = cache_ttl
+        self.inventory = inventory
         self.config_path = config_path
+        with self._instances_lock:
+            self._instances.add(self)
+
+    @property
+    def vm_id(self) -> str:
+        """
+        Get the name or UUID the virtual machine was created with.
+        Commands target it rather than the resolved name, so a virtual machine created from its UUID stays
+        unambiguous when several machines share a name.
+        :return: Virtual machine ID.
+        """
+        return self.__vm_id
 
     @property
     def name(self) -> Optional[str]:
@@ -112,11 +149,17 @@ class Info:
     def update_config_path(self) -> None:
         """
         Get the path to the virtual machine configuration .vbox file.
-        This method attempts to get the path from showvminfo first, and if that fails
-        (e.g., for inaccessible VMs), it tries to extract it from the list command.
+        This method takes the path from the inventory if one is set. Otherwise it attempts to get the path
+        from showvminfo first, and if that fails (e.g., for inaccessible VMs), it tries to extract it
+        from the list command.
         """
+        record = self._inventory_record(self.__vm_id)
+        if record and record.config_file:
+            self.__config_path = record.config_file
+            return
+
         # Try to get the path from showvminfo (works for accessible VMs)
-        cfg_path = self.get_parameter('CfgFile')
+        cfg_path = self.get_parameters(['CfgFile'])['CfgFile']
 
         if cfg_path is None:
             # If showvminfo fails, try to get path for inaccessible VM
@@ -141,7 +184,7 @@ class Info:
         Check if the virtual machine is inaccessible.
         :return: True if the VM is inaccessible, False otherwise.
         """
-        vm_state = self.get_parameter('VMState')
+        vm_state = self.get_parameters(['VMState'])['VMState']
         return vm_state is None or 'inaccessible' in vm_state.lower()
 
 
@@ -152,34 +195,182 @@ class Info:
         :return: Information about the virtual machine.
         """
         if machine_readable:
-            return self._cmd.get_output(f"{self._cmd.showvminfo} {self.name} --machinereadable")
-        return self._cmd.get_output(f'{self._cmd.enumerate} {self.name}')
+            return self._cmd.get_output(f"{self._cmd.showvminfo} {self._target} --machinereadable")
+        return self._cmd.get_output(f'{self._cmd.enumerate} {self._target}')
+
+    def get_machine_readable(self, refresh: bool = False) -> dict[str, str]:
+        """
+        Get the parsed `showvminfo --machinereadable` output of the virtual machine.
+        The result is cached for `cache_ttl` seconds and dropped as soon as a mutating
+        vboxmanage command runs against this virtual machine.
+        :param refresh: If True, ignore the cached value and query vboxmanage again.
+        :return: Dictionary of machine-readable parameters.
+        """
+        if refresh or not self._is_vm_info_fresh():
+            self._store_vm_info(self._cmd.get_output(self._machine_readable_cmd()))
+        return self.__vm_info
+
+    async def get_machine_readable_async(self, refresh: bool = False) -> dict[str, str]:
+        """
+        Asynchronous counterpart of `get_machine_readable` sharing the same cache.
+        :param refresh: If True, ignore the cached value and query vboxmanage again.
+        :return: Dictionary of machine-readable parameters.
+        """
+        if refresh or not self._is_vm_info_fresh():
+            self._store_vm_info(await self._cmd.get_output_async(self._machine_readable_cmd()))
+        return self.__vm_info
+
+    def invalidate(self) -> None:
+        """
+        Drop the cached showvminfo output so that the next query spawns vboxmanage again.
+        """
+        self.__vm_info = None
 
     def get_parameter(self, parameter: str, machine_readable_info: bool = True) -> Optional[str]:
         """
         Get a specific parameter of the virtual machine.
+        Machine-readable parameters are matched by exact key, falling back to a case-insensitive exact match.
         :param parameter: Parameter to retrieve.
         :param machine_readable_info: If True, retrieves detailed information in machine-readable format. False otherwise.
         :return: Value of the parameter.
         """
+        if machine_readable_info:
+            return self.get_parameters([parameter])[parameter]
+
         param_lower = parameter.lower()
-        for line in self.get(machine_readable=machine_readable_info).splitlines():
+        for line in self.get(machine_readable=False).splitlines():
             if line.lower().startswith(param_lower):
                 _, _, value = line.partition('=')
                 return value.replace('"', '').replace("'", '').strip()
         return None
 
+    def get_parameters(self, parameters: list[str]) -> dict[str, Optional[str]]:
+        """
+        Get several machine-readable parameters of the virtual machine from a single showvminfo call.
+        :param parameters: Keys to retrieve, e.g. ['VMState', 'CfgFile', 'nic1', 'SATA-0-0'].
+        :return: Dictionary of requested keys and their values. Missing keys map to None.
+        """
+        return self._select(self.get_machine_readable(), parameters)
+
+    async def get_parameter_async(self, parameter: str) -> Optional[str]:
+        """
+        Asynchronous counterpart of `get_parameter` for machine-readable parameters.
+        :param parameter: Parameter to retrieve.
+        :return: Value of the parameter.
+        """
+        return self._select(await self.get_machine_readable_async(), [parameter])[parameter]
+
+    async def get_parameters_async(self, parameters: list[str]) -> dict[str, Optional[str]]:
+        """
+        Asynchronous counterpart of `get_parameters`.
+        :param parameters: Keys to retrieve.
+        :return: Dictionary of requested keys and their values. Missing keys map to None.
+        """
+        return self._select(await self.get_machine_readable_async(), parameters)
+
     def get_guest_property(self, parameter: str) -> str:
         """
         Get a specific guest property of the virtual machine.
         :param parameter: Parameter to retrieve. for look all parameters use 'VBoxManage guestproperty enumerate {vm_name}' command.
         :return: Value of the guest property.
         """
-        output = self._cmd.get_output(f'{self._cmd.guestproperty} {self.name} "{parameter}"')
-        if output and output != 'No value set!':
-            value = output.split(':', maxsplit=1)
-            return value[1].strip() if value and len(value) == 2 else ''
-        return ''
+        return self._parse_guest_property(
+            self._cmd.get_output(f'{self._cmd.guestproperty} {self._target} "{parameter}"')
+        )
+
+    async def get_guest_property_async(self, parameter: str) -> str:
+        """
+        Asynchronous counterpart of `get_guest_property`.
+        :param parameter: Parameter to retrieve.
+        :return: Value of the guest property.
+        """
+        return self._parse_guest_property(
+            await self._cmd.get_output_async(f'{self._cmd.guestproperty} {self._target} "{parameter}"')
+        )
+
+    def wait_guest_property(self, pattern: str, timeout: float) -> Optional[tuple[str, str]]:
+        """
+        Block until a guest property matching the pattern changes, using `guestproperty wait`.
+        If vboxmanage returns early without an event, e.g. while the machine is not running,
+        up to one second of the remaining time is slept, so callers that retry do not spin.
+        :param pattern: Guest property name pattern, e.g. '/VirtualBox/GuestInfo/Net/*'.
+        :param timeout: Timeout in seconds.
+        :return: Tuple of (name, value) of the changed property, or None on timeout.
+        """
+        start_time = time.monotonic()
+        event = self._parse_guest_property_event(self._cmd.get_output(self._wait_guest_property_cmd(pattern, timeout)))
+        if event is None:
+            time.sleep(max(0.0, min(self._EARLY_RETURN_DELAY, timeout - (time.monotonic() - start_time))))
+        return event
+
+    async def wait_guest_property_async(self, pattern: str, timeout: float) -> Optional[tuple[str, str]]:
+        """
+        Asynchronous counterpart of `wait_guest_property`.
+        :param pattern: Guest property name pattern.
+        :param timeout: Timeout in seconds.
+        :return: Tuple of (name, value) of the changed property, or None on timeout.
+        """
+        import asyncio  # already loaded whenever a coroutine runs; not imported eagerly to keep the package import cheap
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        output = await self._cmd.get_output_async(self._wait_guest_property_cmd(pattern, timeout), timeout=timeout + 5)
+        event = self._parse_guest_property_event(output)
+        if event is None:
+            await asyncio.sleep(max(0.0, min(self._EARLY_RETURN_DELAY, timeout - (loop.time() - start_time))))
+        return event
+
+    def wait_for_guest_property(
+            self,
+            name: str,
+            timeout: float,
+            wait_slice: float = None,
+            progress: Callable[[float], None] = None
+    ) -> Optional[str]:
+        """
+        Wait until the guest property has a non-empty value.
+        The current value is checked first, then the method blocks on property changes.
+        Waits are split into slices of `wait_slice` seconds, so a change that lands between
+        the check and the wait is picked up by the next check.
+        :param name: Guest property name.
+        :param timeout: Timeout in seconds.
+        :param wait_slice: Maximum duration of a single blocking wait in seconds (default: WAIT_SLICE).
+        :param progress: Optional callback receiving the elapsed time before every check.
+        :return: Value of the guest property or None on timeout.
+        """
+        start_time = time.monotonic()
+        while True:
+            elapsed = time.monotonic() - start_time
+            progress(elapsed) if progress else None
+            value = self.get_guest_property(name)
+            if value:
+                return value
+            if elapsed >= timeout:
+                return None
+            event = self.wait_guest_property(name, min(timeout - elapsed, wait_slice or self.WAIT_SLICE))
+            if event and event[1]:
+                return event[1]
+
+    async def wait_for_guest_property_async(self, name: str, timeout: float, wait_slice: float = None) -> Optional[str]:
+        """
+        Asynchronous counterpart of `wait_for_guest_property`.
+        :param name: Guest property name.
+        :param timeout: Timeout in seconds.
+        :param wait_slice: Maximum duration of a single blocking wait in seconds (default: WAIT_SLICE).
+        :return: Value of the guest property or None on timeout.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        while True:
+            elapsed = loop.time() - start_time
+            value = await self.get_guest_property_async(name)
+            if value:
+                return value
+            if elapsed >= timeout:
+                return None
+            event = await self.wait_guest_property_async(name, min(timeout - elapsed, wait_slice or self.WAIT_SLICE))
+            if event and event[1]:
+                return event[1]
 
     def get_os_type(self) -> str:
         """
@@ -199,11 +390,14 @@ class Info:
         Check the power status of the virtual machine.
         :return: True if the virtual machine is running, False otherwise.
         """
-        vm_state = self.get_parameter('VMState')
-        if vm_state:
-            return vm_state.lower() == "running"
-        print(f"[red]|INFO|{self.name}| Unable to determine virtual machine status")
-        return False
+        return self._is_running(self.get_parameters(['VMState'])['VMState'])
+
+    async def power_status_async(self) -> bool:
+        """
+        Asynchronous counterpart of `power_status`.
+        :return: True if the virtual machine is running, False otherwise.
+        """
+        return self._is_running(await self.get_parameter_async('VMState'))
 
     def get_logged_user(self) -> Optional[str]:
         """
@@ -211,7 +405,7 @@ class Info:
         :return: Logged-in user.
         """
         output = self._cmd.get_output(
-            f'{self._cmd.guestproperty} {self.name} "/VirtualBox/GuestInfo/OS/LoggedInUsersList"'
+            f'{self._cmd.guestproperty} {self._target} "/VirtualBox/GuestInfo/OS/LoggedInUsersList"'
         )
         if output:
             return output.split(':')[1].strip() if ':' in output else None
@@ -222,8 +416,110 @@ class Info:
         Get the group name of the virtual machine.
         :return: Group name of the virtual machine.
         """
-        group_name = self.get_parameter('groups')
-        return group_name.strip().replace('/', '') if group_name else None
+        groups = self.get_groups()
+        return ','.join(groups).replace('/', '') if groups else None
+
+    def get_groups(self) -> list[str]:
+        """
+        Get the VirtualBox groups of the virtual machine.
+        Like the other settings getters below, the value is read from the .vbox file without spawning
+        vboxmanage when the virtual machine is known to be powered off, and from showvminfo otherwise.
+        :return: List of group paths, e.g. ['/dev'].
+        """
+        config = self._offline_config()
+        if config is not None:
+            return config.get_groups()
+        groups = self.get_parameter('groups')
+        return [group.strip() for group in groups.split(',') if group.strip()] if groups else []
+
+    def get_cpus(self) -> Optional[int]:
+        """
+        Get the number of virtual CPUs.
+        :return: Number of virtual CPUs.
+        """
+        config = self._offline_config()
+        if config is not None:
+            return config.get_cpus()
+        return self._to_int(self.get_parameter('cpus'))
+
+    def get_memory(self) -> Optional[int]:
+        """
+        Get the amount of RAM.
+        :return: RAM size in megabytes.
+        """
+        config = self._offline_config()
+        if config is not None:
+            return config.get_memory()
+        return self._to_int(self.get_parameter('memory'))
+
+    def get_nested_virtualization(self) -> bool:
+        """
+        Check whether nested VT-x/AMD-V is enabled.
+        :return: True if nested virtualization is enabled.
+        """
+        config = self._offline_config()
+        if config is not None:
+            return config.get_nested_virtualization()
+        return self.get_parameter('nested-hw-virt') == 'on'
+
+    def get_audio(self) -> bool:
+        """
+        Check whether audio is enabled: the adapter has a host driver and audio output is on.
+        :return: True if audio is enabled.
+        """
+        config = self._offline_config()
+        if config is not None:
+            return config.get_audio()
+        audio = self.get_parameters(['audio', 'audio_out'])
+        return audio['audio'] not in (None, 'none', 'null') and audio['audio_out'] != 'off'
+
+    def get_usb_controllers(self) -> list[str]:
+        """
+        Get the types of the enabled USB controllers.
+        :return: List of controller types, e.g. ['OHCI', 'EHCI'].
+        """
+        config = self._offline_config()
+        if config is not None:
+            return config.get_usb_controllers()
+        controllers = self.get_parameters(['usb', 'ehci', 'xhci'])
+        return [
+            controller_type
+            for key, controller_type in (('usb', 'OHCI'), ('ehci', 'EHCI'), ('xhci', 'XHCI'))
+            if controllers[key] == 'on'
+        ]
+
+    def get_network_adapters(self) -> list[NetworkAdapter]:
+        """
+        Get the settings of the network adapters.
+        :return: List of NetworkAdapter objects ordered by adapter number.
+        """
+        config = self._offline_config()
+        if config is not None:
+            return config.get_network_adapters()
+
+        vm_info = self.get_machine_readable()
+        adapters = []
+        for number in range(1, self._MAX_NETWORK_ADAPTERS + 1):
+            attachment = vm_info.get(f'nic{number}')
+            if attachment is None:
+                continue
+            host_adapter = next(
+                (
+                    vm_info[key] for key in (
+                        f'bridgeadapter{number}', f'hostonlyadapter{number}', f'intnet{number}', f'nat-network{number}'
+                    ) if key in vm_info
+                ),
+                None
+            )
+            adapters.append(NetworkAdapter(
+                adapter_number=number,
+                attachment=attachment,
+                adapter_type=vm_info.get(f'nictype{number}'),
+                mac_address=vm_info.get(f'macaddress{number}'),
+                host_adapter=host_adapter,
+                cable_connected=vm_info.get(f'cableconnected{number}', 'on') == 'on'
+            ))
+        return adapters
 
     @classmethod
     def get_default_machine_folder(cls) -> Optional[str]:
@@ -246,12 +542,16 @@ class Info:
         :param uuid: UUID of the virtual machine.
         :return: Name of the virtual machine or None if not found.
         """
+        record = self._inventory_record(uuid)
+        if record:
+            return record.name
+        name = self._identity.get_name(uuid)
+        if name:
+            return name
+        if uuid == self.__vm_id:
+            return self.get_machine_readable().get('name')
         output = self._cmd.get_output(f'{self._cmd.showvminfo} {uuid} --machinereadable')
-        for line in output.splitlines():
-            if line.lower().startswith('name='):
-                _, _, value = line.partition('=')
-                return value.replace('"', '').replace("'", '').strip()
-        return None
+        return self._parse_machine_readable(output).get('name')
 
     def _get_uuid_by_name(self, name: str) -> Optional[str]:
         """
@@ -259,12 +559,134 @@ class Info:
         :param name: Name of the virtual machine.
         :return: UUID of the virtual machine or None if not found.
         """
+        record = self._inventory_record(name)
+        if record:
+            return record.uuid
+        uuid = self._identity.get_uuid(name)
+        if uuid:
+            return uuid
+        if name == self.__vm_id:
+            return self.get_machine_readable().get('UUID')
         output = self._cmd.get_output(f'{self._cmd.showvminfo} "{name}" --machinereadable')
-        for line in output.splitlines():
-            if line.lower().startswith('uuid='):
-                _, _, value = line.partition('=')
-                return value.replace('"', '').replace("'", '').strip()
-        return None
+        return self._parse_machine_readable(output).get('UUID')
+
+    def _inventory_record(self, vm_id: str) -> Optional[VMRecord]:
+        return self.inventory.get(vm_id) if self.inventory is not None else None
+
+    def _offline_config(self) -> Optional[ConfigParser]:
+        """
+        Get the config parser if the settings can be read from the .vbox file without spawning vboxmanage.
+        This is the case when the showvminfo cache is not fresh and the inventory reports the virtual machine
+        as powered off, aborted or saved: in these states the .vbox file holds the current settings.
+        :return: Config parser or None if the settings have to be read with showvminfo.
+        """
+        if self.inventory is None or self._is_vm_info_fresh():
+            return None
+
+        record = self._inventory_record(self.__vm_id)
+        if record is None or not record.is_powered_off or not record.config_file or not isfile(record.config_file):
+            return None
+
+        if self.__config_path != record.config_file:
+            self.__config_path = record.config_file
+            self.__config_parser = None
+        return self.config_parser
+
+    def _select(self, vm_info: dict[str, str], parameters: list[str]) -> dict[str, Optional[str]]:
+        """
+        Pick parameters from parsed showvminfo output by exact key, falling back to a case-insensitive match.
+        """
+        vm_info_lower = self.__vm_info_lower if vm_info is self.__vm_info else None
+        result = {}
+        for parameter in parameters:
+            value = vm_info.get(parameter)
+            if value is None:
+                if vm_info_lower is None:
+                    vm_info_lower = {key.lower(): item for key, item in reversed(vm_info.items())}
+                value = vm_info_lower.get(parameter.lower())
+            result[parameter] = value
+        return result
+
+    def _is_running(self, vm_state: Optional[str]) -> bool:
+        if vm_state:
+            return vm_state.lower() == "running"
+        print(f"[red]|INFO|{self.name}| Unable to determine virtual machine status")
+        return False
+
+    @staticmethod
+    def _to_int(value: Optional[str]) -> Optional[int]:
+        return int(value) if value and value.isdigit() else None
+
+    @property
+    def _target(self) -> str:
+        return self._cmd.quote(self.__vm_id)
+
+    def _machine_readable_cmd(self) -> str:
+        return f'{self._cmd.showvminfo} {self._target} --machinereadable'
+
+    def _is_vm_info_fresh(self) -> bool:
+        return self.__vm_info is not None and time.monotonic() - self.__vm_info_time < self.cache_ttl
+
+    def _store_vm_info(self, output: str) -> None:
+        self.__vm_info = self._parse_machine_readable(output)
+        self.__vm_info_lower = {key.lower(): value for key, value in reversed(self.__vm_info.items())}
+        self.__vm_info_time = time.monotonic()
+        self._identity.add(self.__vm_info.get('name'), self.__vm_info.get('UUID'))
+
+    def _wait_guest_property_cmd(self, pattern: str, timeout: float) -> str:
+        return f'{self._cmd.wait} {self._target} "{pattern}" --timeout {max(1, int(timeout * 1000))}'
+
+    @classmethod
+    def _parse_guest_property_event(cls, output: str) -> Optional[tuple[str, str]]:
+        """
+        Parse `guestproperty wait` output.
+        :param output: Output of the guestproperty wait command.
+        :return: Tuple of (name, value) of the changed property, or None if no change was reported.
+        """
+        match = cls._GUEST_PROPERTY_EVENT.search(output)
+        return (match.group('name'), match.group('value')) if match else None
+
+    @staticmethod
+    def _parse_guest_property(output: str) -> str:
+        """
+        Parse `guestproperty get` output.
+        :param output: Output of the guestproperty get command.
+        :return: Value of the guest property or empty string if not set.
+        """
+        if output and output != 'No value set!':
+            value = output.split(':', maxsplit=1)
+            return value[1].strip() if value and len(value) == 2 else ''
+        return ''
+
+    @staticmethod
+    def _parse_machine_readable(output: str) -> dict[str, str]:
+        """
+        Parse `showvminfo --machinereadable` output into a dictionary with exact keys.
+        :param output: Output of the showvminfo command.
+        :return: Dictionary of parameter names and values.
+        """
+        return parse_machine_readable(output)
+
+    def _matches(self, vm_id: Optional[str]) -> bool:
+        """
+        Check whether the given ID refers to this virtual machine without resolving name or UUID.
+        :param vm_id: Virtual machine ID (name or uuid).
+        :return: True if the ID is one of the known identifiers of this virtual machine.
+        """
+        return vm_id is None or vm_id in (self.__vm_id, self.__name, self.__uuid)
+
+    @classmethod
+    def _on_mutation(cls, subcommand: str, vm_id: Optional[str]) -> None:
+        """
+        Invalidate the cached showvminfo output of every Info bound to the mutated virtual machine.
+        :param subcommand: The mutating vboxmanage subcommand.
+        :param vm_id: Virtual machine ID the command was run against.
+        """
+        with cls._instances_lock:
+            instances = list(cls._instances)
+        for info in instances:
+            if info._matches(vm_id):
+                info.invalidate()
 
     @classmethod
     def _is_uuid(cls, value: str) -> bool:
@@ -282,6 +704,10 @@ class Info:
         the config file path for inaccessible VMs.
         :return: Path to the config file or None if not found.
         """
+        record = self._inventory_record(self.name)
+        if record:
+            return record.config_file
+
         output = self._cmd.get_output(f'{self._cmd.vboxmanage} list -l vms')
 
         lines = output.splitlines()
@@ -308,3 +734,6 @@ class Info:
                 return path.strip()
 
         return None
+
+
+Info._cmd.add_mutation_listener(Info._on_mutation)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from typing import Optional
+
+_ESCAPES = {'"': '"', '\\': '\\', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def unquote(token: str) -> str:
+    """
+    Remove the surrounding double quotes of a machine-readable token and resolve its escape sequences.
+    Unquoted tokens (numbers, on/off) are returned stripped.
+    :param token: Key or value token from `--machinereadable` output.
+    :return: Unquoted string.
+    """
+    token = token.strip()
+    if len(token) < 2 or token[0] != '"' or token[-1] != '"':
+        return token
+
+    result = []
+    chars = iter(token[1:-1])
+    for char in chars:
+        if char == '\\':
+            escaped = next(chars, '')
+            result.append(_ESCAPES.get(escaped, f'\\{escaped}'))
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def split_line(line: str) -> Optional[tuple[str, str]]:
+    """
+    Split a `key=value` line. Quoted keys such as `"SATA-0-0"` may contain `=`.
+    :param line: Line of `--machinereadable` output.
+    :return: Tuple of (key, value) or None if the line is not a key-value pair.
+    """
+    if line.startswith('"'):
+        index = 1
+        while index < len(line):
+            if line[index] == '\\':
+                index += 2
+                continue
+            if line[index] == '"':
+                break
+            index += 1
+        key, rest = line[:index + 1], line[index + 1:]
+        if not rest.startswith('='):
+            return None
+        return unquote(key), unquote(rest[1:])
+
+    key, separator, value = line.partition('=')
+    if not separator or not key.strip():
+        return None
+    return key.strip(), unquote(value)
+
+
+def parse_machine_readable(output: str) -> dict[str, str]:
+    """
+    Parse `vboxmanage ... --machinereadable` output into a dictionary with exact keys.
+    Indexed keys are kept as printed, e.g. `nic1`, `SATA-0-0`, `SnapshotName-1-2`.
+    The first occurrence of a key wins.
+    :param output: Output of a machine-readable vboxmanage command.
+    :return: Dictionary of keys and unquoted values.
+    """
+    parsed = {}
+    for line in output.splitlines():
+        pair = split_line(line)
+        if pair and pair[0] not in parsed:
+            parsed[pair[0]] = pair[1]
+    return parsed
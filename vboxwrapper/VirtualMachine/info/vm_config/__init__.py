@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
-from .config_parser import ConfigParser
+from .config_parser import ConfigParser, NetworkAdapter
 from .config_editor import ConfigEditor
+from .snapshot_tree import SnapshotNode, SnapshotTree
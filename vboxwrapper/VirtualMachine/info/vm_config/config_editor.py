@@ -1,12 +1,53 @@
 # -*- coding: utf-8 -*-
+import fnmatch
+import os
 import re
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Optional
+from xml.sax.saxutils import escape
+
+
+@dataclass
+class _Element:
+    """
+    Position of an element in the raw bytes of the file.
+    """
+    path: str
+    attributes: dict[str, str]
+    start: int
+    tag_end: int
+    end: int = 0
+
+
+@dataclass
+class _Edit:
+    pattern: str
+    where: Optional[Callable[[dict[str, str]], bool]]
+    action: str
+    name: Optional[str] = None
+    value: Optional[str] = None
+
+    def matches(self, element: _Element) -> bool:
+        if not fnmatch.fnmatchcase(element.path, self.pattern):
+            return False
+        return self.where is None or self.where(element.attributes)
 
 
 class ConfigEditor:
     """
     Class to edit the virtual machine configuration.
+    Edits are queued and applied together by `apply` in one read, transform and write pass.
+    Only the bytes of the edited elements change, the rest of the file keeps its formatting and comments.
+    The file is replaced atomically: the new content is written to a temporary file, synced and renamed
+    over the original, so a crash never leaves a truncated file behind.
+
+    Elements are selected by their path of tag names below the root element without namespace prefixes,
+    e.g. 'Machine/MediaRegistry/DVDImages/Image'. Paths are shell-style patterns, `*` also matches `/`.
     """
+    _START_TAG = re.compile(rb'<[^"\'>]*(?:(?:"[^"]*"|\'[^\']*\')[^"\'>]*)*>')
+    _MEDIA_ELEMENTS = {'HardDisks': 'HardDisk', 'DVDImages': 'Image', 'FloppyImages': 'Image'}
 
     def __init__(self, config_path: Path | str):
         """
@@ -14,6 +55,109 @@ class ConfigEditor:
         :param config_path: Path to the .vbox configuration file.
         """
         self.config_path = config_path if isinstance(config_path, Path) else Path(config_path)
+        self._edits: list[_Edit] = []
+
+    @property
+    def backup_path(self) -> Path:
+        return self.config_path.with_suffix(self.config_path.suffix + '.bak')
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of queued edits.
+        """
+        return len(self._edits)
+
+    def remove(self, path: str, where: dict[str, str] | Callable[[dict[str, str]], bool] = None) -> 'ConfigEditor':
+        """
+        Queue the removal of elements. A removed element that fills whole lines takes its lines with it.
+        :param path: Path pattern of the elements.
+        :param where: Attribute values the elements must have, or a callable receiving the attributes.
+        :return: The editor, for chaining.
+        """
+        return self._queue(path, where, 'remove')
+
+    def replace(
+            self,
+            path: str,
+            xml: str,
+            where: dict[str, str] | Callable[[dict[str, str]], bool] = None
+    ) -> 'ConfigEditor':
+        """
+        Queue the replacement of elements with an XML fragment.
+        :param path: Path pattern of the elements.
+        :param xml: Replacement XML, inserted as is.
+        :param where: Attribute values the elements must have, or a callable receiving the attributes.
+        :return: The editor, for chaining.
+        """
+        return self._queue(path, where, 'replace', value=xml)
+
+    def set_attribute(
+            self,
+            path: str,
+            name: str,
+            value: Optional[str],
+            where: dict[str, str] | Callable[[dict[str, str]], bool] = None
+    ) -> 'ConfigEditor':
+        """
+        Queue setting an attribute of elements.
+        :param path: Path pattern of the elements.
+        :param name: Attribute name.
+        :param value: New value. None removes the attribute.
+        :param where: Attribute values the elements must have, or a callable receiving the attributes.
+        :return: The editor, for chaining.
+        """
+        return self._queue(path, where, 'attribute', name=name, value=value)
+
+    def remove_media(self, kind: str = 'DVDImages', uuid: str = None, location: str = None) -> 'ConfigEditor':
+        """
+        Queue the removal of media registry entries.
+        :param kind: Media registry section: 'DVDImages', 'FloppyImages' or 'HardDisks'.
+        :param uuid: UUID of the medium to remove, with or without braces. None matches all media.
+        :param location: Location of the medium to remove. None matches all media.
+        :return: The editor, for chaining.
+        """
+        return self.remove(self._media_path(kind), self._media_filter(uuid, location))
+
+    def set_medium_location(self, uuid: str, location: str, kind: str = 'DVDImages') -> 'ConfigEditor':
+        """
+        Queue changing the location of a media registry entry, e.g. after an ISO was moved.
+        :param uuid: UUID of the medium, with or without braces.
+        :param location: New location.
+        :param kind: Media registry section: 'DVDImages', 'FloppyImages' or 'HardDisks'.
+        :return: The editor, for chaining.
+        """
+        return self.set_attribute(self._media_path(kind), 'location', location, self._media_filter(uuid, None))
+
+    def discard(self) -> None:
+        """
+        Drop the queued edits.
+        """
+        self._edits.clear()
+
+    def apply(self, backup: bool = True) -> int:
+        """
+        Apply the queued edits in one pass and atomically replace the file if anything changed.
+        :param backup: Whether to keep the original file as .bak. The backup is a hard link to the original
+        file where possible, so its content is not copied.
+        :return: Number of changed elements.
+        """
+        edits, self._edits = self._edits, []
+        if not edits:
+            return 0
+
+        content = self.config_path.read_bytes()
+        changes = self._changes(content, edits)
+        if not changes:
+            return 0
+
+        parts, position = [], 0
+        for start, end, replacement in changes:
+            parts.extend((content[position:start], replacement))
+            position = end
+        parts.append(content[position:])
+        self._write(b''.join(parts), backup)
+        return len(changes)
 
     def remove_dvd_images(self, backup: bool = True) -> None:
         """
@@ -21,26 +165,194 @@ class ConfigEditor:
         Preserves original XML formatting, comments, and structure.
         :param backup: Whether to create a backup of the original file.
         """
-        # Create backup if requested
-        if backup:
-            backup_path = self.config_path.with_suffix(self.config_path.suffix + '.bak')
-            backup_path.write_text(self.config_path.read_text(encoding='utf-8'), encoding='utf-8')
-
-        # Read the XML file content
-        content = self.config_path.read_text(encoding='utf-8')
-
-        # Pattern to match DVDImages section and remove Image elements within it
-        # Matches: <DVDImages>...Image elements...</DVDImages>
-        def remove_images_from_dvd_section(match):
-            dvd_section = match.group(0)
-            # Remove all Image elements from this section
-            # Pattern matches Image tags with any attributes
-            dvd_section = re.sub(r'[ \t]*<(?:\w+:)?Image\s+[^>]*/>[ \t]*\r?\n?', '', dvd_section)
-            return dvd_section
-
-        # Find DVDImages section and process it
-        pattern = r'(<(?:\w+:)?DVDImages>)(.*?)(</(?:\w+:)?DVDImages>)'
-        content = re.sub(pattern, remove_images_from_dvd_section, content, flags=re.DOTALL)
-
-        # Write back the modified content
-        self.config_path.write_text(content, encoding='utf-8')
+        self.remove_media('DVDImages').apply(backup=backup)
+
+    def _queue(self, path: str, where, action: str, name: str = None, value: str = None) -> 'ConfigEditor':
+        if isinstance(where, dict):
+            expected = dict(where)
+
+            def where(attributes: dict[str, str]) -> bool:
+                return all(attributes.get(key) == item for key, item in expected.items())
+
+        self._edits.append(_Edit(path.strip('/'), where, action, name, value))
+        return self
+
+    def _changes(self, content: bytes, edits: list[_Edit]) -> list[tuple[int, int, bytes]]:
+        """
+        Turn the edits into byte range replacements. Edits inside removed or replaced elements are dropped.
+        :return: Sorted list of (start, end, replacement) tuples that do not overlap.
+        """
+        changes = []
+        for element in self._index(content):
+            matching = [edit for edit in edits if edit.matches(element)]
+            if not matching:
+                continue
+            structural = next((edit for edit in matching if edit.action in ('remove', 'replace')), None)
+            if structural is None:
+                tag = content[element.start:element.tag_end]
+                new_tag = tag
+                for edit in matching:
+                    new_tag = self._set_attribute(new_tag, edit.name, edit.value)
+                if new_tag != tag:
+                    changes.append((element.start, element.tag_end, new_tag))
+            elif structural.action == 'replace':
+                changes.append((element.start, element.end, structural.value.encode('utf-8')))
+            else:
+                changes.append((*self._line_span(content, element.start, element.end), b''))
+
+        changes.sort(key=lambda change: change[0])
+        result, covered = [], 0
+        for change in changes:
+            if change[0] >= covered:
+                result.append(change)
+                covered = change[1]
+        return result
+
+    @classmethod
+    def _index(cls, content: bytes) -> list[_Element]:
+        """
+        Find the byte ranges of all elements with the expat parser.
+        :return: List of elements in document order.
+        """
+        from xml.parsers import expat
+
+        parser = expat.ParserCreate()
+        elements, stack, names = [], [], []
+
+        def start_element(name: str, attributes: dict[str, str]) -> None:
+            start = parser.CurrentByteIndex
+            match = cls._START_TAG.match(content, start)
+            names.append(name.rpartition(':')[2])
+            element = _Element('/'.join(names[1:]), attributes, start, match.end() if match else start)
+            stack.append(element)
+            elements.append(element)
+
+        def end_element(name: str) -> None:
+            element = stack.pop()
+            names.pop()
+            index = parser.CurrentByteIndex
+            if content[element.tag_end - 2:element.tag_end] == b'/>':
+                element.end = element.tag_end
+            else:
+                element.end = content.index(b'>', index) + 1
+
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.Parse(content, True)
+        return elements
+
+    @staticmethod
+    def _line_span(content: bytes, start: int, end: int) -> tuple[int, int]:
+        """
+        Extend the range of an element to its whole lines if nothing else is on them.
+        """
+        line_start = start
+        while line_start > 0 and content[line_start - 1] in b' \t':
+            line_start -= 1
+        line_end = end
+        while line_end < len(content) and content[line_end] in b' \t':
+            line_end += 1
+        at_line_start = line_start == 0 or content[line_start - 1] in b'\r\n'
+        at_line_end = line_end == len(content) or content[line_end] in b'\r\n'
+        if not at_line_start or not at_line_end:
+            return start, end
+        if content[line_end:line_end + 2] == b'\r\n':
+            return line_start, line_end + 2
+        return line_start, line_end + 1 if line_end < len(content) else line_end
+
+    @staticmethod
+    def _set_attribute(tag: bytes, name: str, value: Optional[str]) -> bytes:
+        """
+        Set or remove an attribute in a start tag.
+        :param tag: Start tag, e.g. b'<Image uuid="{...}" location="a.iso"/>'.
+        :return: Changed start tag.
+        """
+        pattern = re.compile(rb'(\s+)' + re.escape(name.encode('utf-8')) + rb'\s*=\s*("[^"]*"|\'[^\']*\')')
+        match = pattern.search(tag)
+        if value is None:
+            return tag[:match.start()] + tag[match.end():] if match else tag
+
+        escaped = escape(value, {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#9;'})
+        quoted = b'"' + escaped.encode('utf-8') + b'"'
+        if match:
+            return tag[:match.start(2)] + quoted + tag[match.end(2):]
+        insert_at = len(tag) - (2 if tag.endswith(b'/>') else 1)
+        while insert_at > 0 and tag[insert_at - 1:insert_at] in (b' ', b'\t', b'\n', b'\r'):
+            insert_at -= 1
+        return tag[:insert_at] + b' ' + name.encode('utf-8') + b'=' + quoted + tag[insert_at:]
+
+    def _write(self, content: bytes, backup: bool) -> None:
+        """
+        Atomically replace the file: write a temporary file next to it, fsync it and rename it over the original.
+        A symlinked file is resolved first, so the link is kept and its target is replaced. The temporary file
+        gets the mode and, where permitted, the owner of the original.
+        The backup is made by hard linking the original file before the rename.
+        """
+        target = self.config_path.resolve()
+        directory = target.parent
+        file_descriptor, tmp_name = tempfile.mkstemp(dir=directory, prefix=f'.{target.name}.', suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                file.write(content)
+                file.flush()
+                os.fsync(file.fileno())
+            self._copy_metadata(target, tmp_name)
+            if backup:
+                self._backup(target)
+            os.replace(tmp_name, target)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        self._sync_directory(directory)
+
+    @staticmethod
+    def _copy_metadata(source: Path, destination: str) -> None:
+        stat = source.stat()
+        os.chmod(destination, stat.st_mode & 0o7777)
+        if hasattr(os, 'chown'):
+            try:
+                os.chown(destination, stat.st_uid, stat.st_gid)
+            except OSError:
+                pass  # not permitted, e.g. an unprivileged user editing a file owned by someone else
+
+    def _backup(self, target: Path) -> None:
+        backup_path = self.backup_path
+        backup_path.unlink(missing_ok=True)
+        try:
+            os.link(target, backup_path)
+        except OSError:
+            import shutil
+            shutil.copy2(target, backup_path)
+
+    @staticmethod
+    def _sync_directory(directory: Path) -> None:
+        """
+        Make the rename durable. Not supported on Windows, where it is skipped.
+        """
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        file_descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(file_descriptor)
+        except OSError:
+            pass
+        finally:
+            os.close(file_descriptor)
+
+    @classmethod
+    def _media_path(cls, kind: str) -> str:
+        if kind not in cls._MEDIA_ELEMENTS:
+            raise ValueError(f"Unknown media registry section: {kind}")
+        return f'*{kind}/*{cls._MEDIA_ELEMENTS[kind]}'
+
+    @staticmethod
+    def _media_filter(uuid: Optional[str], location: Optional[str]) -> Callable[[dict[str, str]], bool]:
+        uuid = uuid.strip('{}').lower() if uuid else None
+
+        def matches(attributes: dict[str, str]) -> bool:
+            if uuid is not None and attributes.get('uuid', '').strip('{}').lower() != uuid:
+                return False
+            return location is None or attributes.get('location') == location
+
+        return matches
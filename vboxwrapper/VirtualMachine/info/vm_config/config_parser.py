@@ -1,52 +1,297 @@
 # -*- coding: utf-8 -*-
 import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass
+from functools import wraps
 from pathlib import Path
+from typing import Callable, Optional
+
+from .snapshot_tree import SnapshotNode, SnapshotTree
+from ....config_cache import ConfigCache
+
+
+def cached(section: str, encode: Callable = None, decode: Callable = None):
+    """
+    Keep the result of a ConfigParser accessor in the persistent ConfigCache, if it is enabled.
+    :param section: Name of the value in the cache.
+    :param encode: Converts the result to a JSON serializable value.
+    :param decode: Converts the cached value back to the result.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self):
+            return self._cached_value(section, lambda: method(self), encode, decode)
+        return wrapper
+    return decorator
+
+
+@dataclass(frozen=True)
+class NetworkAdapter:
+    """
+    Network adapter settings from the .vbox file.
+    `attachment` uses the `showvminfo` nicN values: none, null, nat, bridged, intnet, hostonly, natnetwork, generic.
+    """
+    adapter_number: int
+    attachment: str
+    adapter_type: Optional[str] = None
+    mac_address: Optional[str] = None
+    host_adapter: Optional[str] = None
+    cable_connected: bool = True
+
+    @property
+    def enabled(self) -> bool:
+        return self.attachment != 'none'
 
 
 class ConfigParser:
     """
     Class to parse the virtual machine configuration.
+    Small files are parsed into a full element tree. Files larger than `STREAMING_THRESHOLD` are read in
+    streaming mode: every accessor makes an `iterparse` pass that keeps only the section it needs
+    (e.g. Hardware or MediaRegistry) and clears and detaches all other elements as it goes, so memory
+    does not grow with the snapshot history. Results are cached until the file changes.
     """
+    STREAMING_THRESHOLD = 1024 * 1024
+    _AUDIO_OUT_VERSION = (1, 16)
 
-    def __init__(self, config_path: Path | str):
+    def __init__(self, config_path: Path | str, streaming: bool = None):
+        """
+        :param config_path: Path to the .vbox configuration file.
+        :param streaming: True to always use streaming mode, False to always parse the full tree,
+        None to stream files larger than STREAMING_THRESHOLD bytes.
+        """
         self.config_path = config_path if isinstance(config_path, Path) else Path(config_path)
+        self.streaming = streaming
         self._root = None
         self._namespace = None
+        self._version = None
+        self._snapshot_tree = None
+        self._machine = None
+        self._sections: dict[str, Optional[ET.Element]] = {}
         self._last_mtime = None
+        self._size = 0
 
     @property
     def root(self) -> ET.Element:
         """
         Parse and cache the virtual machine configuration.
-        Cache is invalidated if file modification time changes.
+        Cache is invalidated if file modification time or size changes.
         :return: Root element of the parsed XML.
         """
-        current_mtime = self.config_path.stat().st_mtime
-        if self._root is None or self._last_mtime != current_mtime:
+        if self._check_file() or self._root is None:
             self._root = ET.parse(str(self.config_path)).getroot()
             self._namespace = None
-            self._last_mtime = current_mtime
+            self._snapshot_tree = None
 
         return self._root
 
+    @property
+    def is_streaming(self) -> bool:
+        """
+        Check whether the accessors read the file in streaming mode.
+        """
+        self._check_file()
+        return self.streaming if self.streaming is not None else self._size > self.STREAMING_THRESHOLD
+
     @property
     def namespace(self) -> str:
         """
         Extract and cache the namespace from root element.
+        It is read once per parse of the file and dropped with the other cached results when the file changes,
+        so repeated lookups do not stat the file.
         :return: Namespace string or empty string if not present.
         """
         if self._namespace is None:
-            self._namespace = ''
-            if self.root.tag.startswith('{'):
-                self._namespace = self.root.tag.split('}')[0] + '}'
+            if self.is_streaming:
+                self._stream()
+            else:
+                root = self.root
+                self._namespace = root.tag[:root.tag.index('}') + 1] if root.tag.startswith('{') else ''
         return self._namespace
 
+    @property
+    def settings_version(self) -> tuple[int, ...]:
+        """
+        Get the settings format version of the file, e.g. (1, 19) for version="1.19-linux".
+        :return: Version tuple, empty if the root element has no valid version attribute.
+        """
+        if self.is_streaming:
+            if self._version is None:
+                self._stream()
+            version = self._version
+        else:
+            version = self.root.get('version', '')
+        number = version.partition('-')[0]
+        try:
+            return tuple(int(part) for part in number.split('.')) if number else ()
+        except ValueError:
+            return ()
+
+    @property
+    def machine(self) -> Optional[ET.Element]:
+        """
+        Get the Machine element of the configuration.
+        In streaming mode the element has the attributes of the machine but no children.
+        :return: Machine element or None if not present.
+        """
+        if not self.is_streaming:
+            return self.root.find(self.get_tag('Machine'))
+        if self._machine is None:
+            self._stream()
+        return self._machine if self._machine is not False else None
+
+    @property
+    def hardware(self) -> Optional[ET.Element]:
+        """
+        Get the current Hardware element of the machine. Hardware sections of snapshots are not included.
+        :return: Hardware element or None if not present.
+        """
+        return self.get_section('Hardware')
+
+    def get_section(self, tag_name: str) -> Optional[ET.Element]:
+        """
+        Get a child element of the Machine element, e.g. 'Hardware' or 'MediaRegistry'.
+        In streaming mode only this section is kept in memory while the file is read.
+        :param tag_name: Base tag name without namespace.
+        :return: Element or None if not present.
+        """
+        if not self.is_streaming:
+            machine = self.machine
+            return machine.find(self.get_tag(tag_name)) if machine is not None else None
+        if tag_name not in self._sections:
+            self._stream(tag_name)
+        return self._sections.get(tag_name)
+
+    @property
+    def snapshot_tree(self) -> SnapshotTree:
+        """
+        Get the snapshot tree of the machine. It is built once per version of the file.
+        :return: Snapshot tree with UUID and name indexes.
+        """
+        self._check_file()
+        if self._snapshot_tree is None:
+            self._snapshot_tree = self._cached_value(
+                'snapshot_tree', self._parse_snapshot_tree, SnapshotTree.dump, SnapshotTree.load
+            )
+        return self._snapshot_tree
+
+    @cached('name')
+    def get_name(self) -> Optional[str]:
+        return self.machine.get('name') if self.machine is not None else None
+
+    @cached('uuid')
+    def get_uuid(self) -> Optional[str]:
+        if self.machine is None:
+            return None
+        return self.machine.get('uuid', '').strip('{}') or None
+
+    @cached('os_type')
+    def get_os_type(self) -> Optional[str]:
+        """
+        Get the guest OS type identifier, e.g. 'Ubuntu_64' or 'Windows10_64'.
+        :return: OS type identifier or None if not present.
+        """
+        return self.machine.get('OSType') if self.machine is not None else None
+
+    @cached('groups')
+    def get_groups(self) -> list[str]:
+        """
+        Get the VirtualBox groups of the virtual machine.
+        :return: List of group paths, e.g. ['/dev']. Empty list if the machine is not in a group.
+        """
+        groups = self.get_section('Groups')
+        if groups is None:
+            return []
+        return [group.get('name', '') for group in groups.findall(self.get_tag('Group'))]
+
+    @cached('cpus')
+    def get_cpus(self) -> int:
+        """
+        Get the number of virtual CPUs.
+        :return: Number of virtual CPUs.
+        """
+        cpu = self._find_hardware_child('CPU')
+        return int(cpu.get('count', 1)) if cpu is not None else 1
+
+    @cached('memory')
+    def get_memory(self) -> Optional[int]:
+        """
+        Get the amount of RAM.
+        :return: RAM size in megabytes or None if not present.
+        """
+        memory = self._find_hardware_child('Memory')
+        return int(memory.get('RAMSize')) if memory is not None and memory.get('RAMSize') else None
+
+    @cached('nested_virtualization')
+    def get_nested_virtualization(self) -> bool:
+        """
+        Check whether nested VT-x/AMD-V is enabled.
+        :return: True if nested virtualization is enabled.
+        """
+        nested = self._find_hardware_child('NestedHWVirt')
+        return nested is not None and self._is_true(nested.get('enabled'))
+
+    @cached('audio')
+    def get_audio(self) -> bool:
+        """
+        Check whether the audio adapter is enabled with a host driver and audio output, the same rule as
+        showvminfo's `audio` and `audio_out`. Files older than settings version 1.16 have no enabledOut
+        attribute and always had output enabled; newer files only write it when output is enabled.
+        :return: True if audio is enabled.
+        """
+        audio = self._find_hardware_child('AudioAdapter')
+        if audio is None:
+            return False
+        if not self._is_true(audio.get('enabled', 'true')) or audio.get('driver', '').lower() in ('null', 'none'):
+            return False
+        default_out = 'true' if self.settings_version < self._AUDIO_OUT_VERSION else 'false'
+        return self._is_true(audio.get('enabledOut', default_out))
+
+    @cached('usb_controllers')
+    def get_usb_controllers(self) -> list[str]:
+        """
+        Get the types of the enabled USB controllers.
+        :return: List of controller types in upper case, e.g. ['OHCI', 'EHCI'].
+        """
+        usb = self._find_hardware_child('USB')
+        if usb is None:
+            return []
+        return [controller.get('type', '').upper() for controller in usb.iter(self.get_tag('Controller'))]
+
+    @cached(
+        'network_adapters',
+        encode=lambda adapters: [asdict(adapter) for adapter in adapters],
+        decode=lambda adapters: [NetworkAdapter(**adapter) for adapter in adapters]
+    )
+    def get_network_adapters(self) -> list[NetworkAdapter]:
+        """
+        Get the settings of the network adapters configured in the .vbox file.
+        :return: List of NetworkAdapter objects ordered by adapter number.
+        """
+        network = self._find_hardware_child('Network')
+        if network is None:
+            return []
+
+        adapters = []
+        for adapter in network.findall(self.get_tag('Adapter')):
+            attachment, host_adapter = self._parse_attachment(adapter)
+            adapters.append(NetworkAdapter(
+                adapter_number=int(adapter.get('slot', 0)) + 1,
+                attachment=attachment if self._is_true(adapter.get('enabled')) else 'none',
+                adapter_type=adapter.get('type'),
+                mac_address=adapter.get('MACAddress'),
+                host_adapter=host_adapter,
+                cable_connected=self._is_true(adapter.get('cable', 'true'))
+            ))
+        return sorted(adapters, key=lambda nic: nic.adapter_number)
+
+    @cached('dvd_images')
     def get_dvd_images(self) -> list[dict]:
         """
         Get the DVD images from the virtual machine configuration .vbox file.
         :return: List of dictionaries with uuid and location of DVD images.
         """
-        dvd_images_section = self.root.find(f'.//{self.get_tag("DVDImages")}')
+        media_registry = self.get_section('MediaRegistry')
+        dvd_images_section = media_registry.find(self.get_tag('DVDImages')) if media_registry is not None else None
         if dvd_images_section is None:
             return []
 
@@ -63,50 +308,156 @@ class ConfigParser:
         Get the snapshot dates from the virtual machine configuration .vbox file.
         :return: List of snapshot information.
         """
-        snapshots_info = []
-        for snapshot in self.root.iter(self.get_tag('Snapshot')):
-            snapshots_info.append(self._parse_snapshot(snapshot))
-        return snapshots_info
+        return [snapshot.to_dict() for snapshot in self.snapshot_tree]
 
     def get_current_snapshot_info(self) -> dict:
         """
         Get information about the current snapshot from the .vbox file.
         :return: Dictionary with current snapshot information or empty dict if no current snapshot.
         """
-        machine = self.root.find(f'.//{self.get_tag("Machine")}')
+        current = self.snapshot_tree.current
+        return current.to_dict() if current is not None else {}
 
-        if machine is None:
-            return {}
+    def get_tag(self, tag_name: str) -> str:
+        """
+        Get tag name with namespace if present.
+        :param tag_name: Base tag name without namespace.
+        :return: Tag name with namespace prefix if present.
+        """
+        return f'{self.namespace}{tag_name}'
 
-        current_snapshot_uuid = machine.get('currentSnapshot', '').strip('{}')
+    _ATTACHMENTS = {
+        'NAT': ('nat', None),
+        'BridgedInterface': ('bridged', 'name'),
+        'InternalNetwork': ('intnet', 'name'),
+        'HostOnlyInterface': ('hostonly', 'name'),
+        'NATNetwork': ('natnetwork', 'name'),
+        'GenericInterface': ('generic', 'driver'),
+    }
+
+    def _parse_attachment(self, adapter: ET.Element) -> tuple[str, Optional[str]]:
+        """
+        Get the active attachment of a network adapter. Settings of inactive modes are kept under DisabledModes.
+        :param adapter: Adapter XML element.
+        :return: Tuple of (attachment type, host adapter or network name). 'null' if the adapter is not attached.
+        """
+        for child in adapter:
+            attachment = self._ATTACHMENTS.get(child.tag.removeprefix(self.namespace))
+            if attachment:
+                attachment_type, name_attribute = attachment
+                return attachment_type, child.get(name_attribute) if name_attribute else None
+        return 'null', None
 
-        if not current_snapshot_uuid:
-            return {}
+    def _parse_snapshot_tree(self) -> SnapshotTree:
+        if self.is_streaming:
+            self._stream('Snapshot')
+            return self._snapshot_tree
+        machine = self.root.find(self.get_tag('Machine'))
+        return SnapshotTree.from_machine(machine, self.namespace)
 
-        # Search for the snapshot with matching UUID
-        for snapshot in self.root.iter(self.get_tag('Snapshot')):
-            if snapshot.get('uuid', '').strip('{}') == current_snapshot_uuid:
-                return self._parse_snapshot(snapshot)
+    def _cached_value(self, section: str, parse: Callable, encode: Callable = None, decode: Callable = None):
+        """
+        Get a value from the persistent cache or parse it and store it there.
+        :param section: Name of the value in the cache.
+        :param parse: Callable that reads the value from the file.
+        :param encode: Converts the value to a JSON serializable value.
+        :param decode: Converts the cached value back.
+        :return: Value for the current version of the file.
+        """
+        cache = ConfigCache()
+        if not cache.enabled:
+            return parse()
 
-        return {}
+        self._check_file()
+        key = self._last_mtime
+        try:
+            value = cache.get(self.config_path, section, key)
+            return decode(value) if decode else value
+        except KeyError:
+            pass
+        value = parse()
+        cache.put(self.config_path, section, key, encode(value) if encode else value)
+        return value
 
-    def get_tag(self, tag_name: str) -> str:
+    def _check_file(self) -> bool:
         """
-        Get tag name with namespace if present.
-        :param tag_name: Base tag name without namespace.
-        :return: Tag name with namespace prefix if present.
+        Drop the cached results if the file modification time or size changed.
+        :return: True if the file changed since the last check.
         """
-        return f'{self.namespace}{tag_name}' if self.namespace else tag_name
+        stat = self.config_path.stat()
+        current_mtime = stat.st_mtime_ns, stat.st_size
+        if self._last_mtime == current_mtime:
+            return False
 
-    def _parse_snapshot(self, snapshot: ET.Element) -> dict:
+        self._root = None
+        self._namespace = None
+        self._version = None
+        self._snapshot_tree = None
+        self._machine = None
+        self._sections = {}
+        self._last_mtime, self._size = current_mtime, stat.st_size
+        return True
+
+    def _stream(self, section: str = None) -> None:
         """
-        Parse snapshot element and extract information.
-        :param snapshot: Snapshot XML element.
-        :return: Dictionary with snapshot information.
+        Read the file with iterparse. Finished elements are cleared and removed from their parent,
+        so only the open elements and the requested section are held in memory.
+        The namespace, the settings version and the Machine attributes are read on every pass.
+        :param section: Base tag name of the Machine child to keep, 'Snapshot' to build the snapshot tree
+        or None to read only the Machine attributes.
         """
-        return {
-            'uuid': snapshot.get('uuid', '').strip('{}'),
-            'name': snapshot.get('name', ''),
-            'created': snapshot.get('timeStamp', None),
-            'description': snapshot.get('description', '')
-        }
+        stack, kept, snapshots, parents = [], None, [], []
+        machine = None
+        for event, element in ET.iterparse(self.config_path, events=('start', 'end')):
+            tag = element.tag.rpartition('}')[2]
+            if event == 'start':
+                stack.append(element)
+                if len(stack) == 1:
+                    self._namespace = element.tag[:element.tag.index('}') + 1] if element.tag.startswith('{') else ''
+                    self._version = element.get('version', '')
+                elif len(stack) == 2 and tag == 'Machine':
+                    machine = element
+                    self._machine = ET.Element(element.tag, element.attrib)
+                    if section is None:
+                        break
+                elif section == 'Snapshot' and tag == 'Snapshot' and machine is not None:
+                    snapshot = SnapshotNode.from_element(element, parents[-1] if parents else None)
+                    snapshots.append(snapshot)
+                    parents.append(snapshot)
+                elif len(stack) == 3 and tag == section and stack[1] is machine:
+                    kept = element
+                continue
+
+            stack.pop()
+            if section == 'Snapshot' and tag == 'Snapshot' and parents:
+                parents.pop()
+            if element is kept:
+                if stack:
+                    del stack[-1][-1]
+                break
+            if kept is None:
+                element.clear()
+                if stack:
+                    del stack[-1][-1]
+
+        if machine is None:
+            self._machine = False
+        if section == 'Snapshot':
+            current = self._machine.get('currentSnapshot', '').strip('{}') if self._machine is not False else None
+            self._snapshot_tree = SnapshotTree(snapshots, current)
+        elif section is not None:
+            self._sections[section] = kept
+
+    def _find_hardware_child(self, tag_name: str) -> Optional[ET.Element]:
+        """
+        Find the first descendant with the tag in the current hardware section.
+        Descendant search copes with settings that moved between .vbox format versions.
+        :param tag_name: Base tag name without namespace.
+        :return: Element or None if not found.
+        """
+        hardware = self.hardware
+        return hardware.find(f'.//{self.get_tag(tag_name)}') if hardware is not None else None
+
+    @staticmethod
+    def _is_true(value: Optional[str]) -> bool:
+        return str(value).lower() in ('true', '1', 'yes', 'on')
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterator, Optional
+
+
+@dataclass(eq=False)
+class SnapshotNode:
+    """
+    Snapshot of the .vbox snapshot tree with links to its parent and children.
+    `created` is the timeStamp attribute as stored in the file, e.g. '2024-01-01T10:00:00Z'.
+    """
+    uuid: str
+    name: str
+    created: Optional[str] = None
+    description: str = ''
+    depth: int = 0
+    parent: Optional['SnapshotNode'] = field(default=None, repr=False)
+    children: list['SnapshotNode'] = field(default_factory=list, repr=False)
+
+    @classmethod
+    def from_element(cls, element: ET.Element, parent: Optional['SnapshotNode'] = None) -> 'SnapshotNode':
+        """
+        Create a node from the attributes of a Snapshot element and link it to its parent.
+        :param element: Snapshot XML element, its children are not read.
+        :param parent: Parent snapshot node or None for a root snapshot.
+        :return: Snapshot node.
+        """
+        snapshot = cls(
+            uuid=element.get('uuid', '').strip('{}'),
+            name=element.get('name', ''),
+            created=element.get('timeStamp'),
+            description=element.get('description', ''),
+            depth=parent.depth + 1 if parent else 0,
+            parent=parent
+        )
+        if parent is not None:
+            parent.children.append(snapshot)
+        return snapshot
+
+    @property
+    def created_at(self) -> Optional[datetime]:
+        """
+        Get the creation time as an aware datetime.
+        :return: Creation time or None if the timestamp is missing or invalid.
+        """
+        if not self.created:
+            return None
+        try:
+            return datetime.fromisoformat(self.created.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+
+    @property
+    def is_leaf(self) -> bool:
+        return not self.children
+
+    def to_dict(self) -> dict:
+        """
+        :return: Dictionary with uuid, name, created and description.
+        """
+        return {'uuid': self.uuid, 'name': self.name, 'created': self.created, 'description': self.description}
+
+
+class SnapshotTree:
+    """
+    Snapshot tree of a virtual machine built once from the Machine element of the .vbox file.
+    Snapshots are indexed by UUID and name, so lookups do not rescan the tree.
+    Iteration yields the snapshots depth-first, parents before children, in file order.
+    """
+
+    def __init__(self, snapshots: list[SnapshotNode], current_uuid: Optional[str] = None):
+        """
+        :param snapshots: Linked snapshot nodes, parents before children.
+        :param current_uuid: UUID of the current snapshot.
+        """
+        self._snapshots = snapshots
+        self.roots = [snapshot for snapshot in snapshots if snapshot.parent is None]
+        self.by_uuid: dict[str, SnapshotNode] = {snapshot.uuid: snapshot for snapshot in snapshots}
+        self.by_name: dict[str, list[SnapshotNode]] = {}
+        for snapshot in snapshots:
+            self.by_name.setdefault(snapshot.name, []).append(snapshot)
+        self.current = self.by_uuid.get(current_uuid) if current_uuid else None
+
+    @classmethod
+    def from_machine(cls, machine: Optional[ET.Element], namespace: str = '') -> 'SnapshotTree':
+        """
+        Build the tree from a Machine element. Snapshots are nested as Snapshot > Snapshots > Snapshot.
+        :param machine: Machine element of the .vbox file or None.
+        :param namespace: Namespace prefix of the tags, e.g. '{http://www.virtualbox.org/}'.
+        :return: Snapshot tree, empty if the machine has no snapshots.
+        """
+        if machine is None:
+            return cls([])
+
+        snapshot_tag, children_tag = f'{namespace}Snapshot', f'{namespace}Snapshots'
+        snapshots = []
+        stack = [(element, None) for element in reversed(machine.findall(snapshot_tag))]
+        while stack:
+            element, parent = stack.pop()
+            snapshot = SnapshotNode.from_element(element, parent)
+            snapshots.append(snapshot)
+
+            children = element.find(children_tag)
+            if children is not None:
+                stack.extend((child, snapshot) for child in reversed(children.findall(snapshot_tag)))
+
+        return cls(snapshots, machine.get('currentSnapshot', '').strip('{}'))
+
+    @classmethod
+    def load(cls, data: dict) -> 'SnapshotTree':
+        """
+        Rebuild a tree from the output of `dump`.
+        :param data: Dictionary with the current snapshot UUID and the snapshot rows.
+        :return: Snapshot tree.
+        """
+        snapshots, by_uuid = [], {}
+        for uuid, name, created, description, parent_uuid in data['snapshots']:
+            parent = by_uuid.get(parent_uuid)
+            snapshot = SnapshotNode(
+                uuid=uuid,
+                name=name,
+                created=created,
+                description=description,
+                depth=parent.depth + 1 if parent else 0,
+                parent=parent
+            )
+            if parent is not None:
+                parent.children.append(snapshot)
+            snapshots.append(snapshot)
+            by_uuid[uuid] = snapshot
+        return cls(snapshots, data.get('current'))
+
+    def dump(self) -> dict:
+        """
+        Convert the tree to a JSON serializable dictionary.
+        :return: Dictionary with the current snapshot UUID and one row per snapshot, parents first.
+        """
+        return {
+            'current': self.current.uuid if self.current else None,
+            'snapshots': [
+                [snapshot.uuid, snapshot.name, snapshot.created, snapshot.description,
+                 snapshot.parent.uuid if snapshot.parent else None]
+                for snapshot in self._snapshots
+            ],
+        }
+
+    def __iter__(self) -> Iterator[SnapshotNode]:
+        return iter(self._snapshots)
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def __contains__(self, snapshot_id: str) -> bool:
+        return self.get(snapshot_id) is not None
+
+    def get(self, snapshot_id: str) -> Optional[SnapshotNode]:
+        """
+        Find a snapshot by UUID or name. Of several snapshots with the same name the first one in tree order is
+        returned, which is the one `vboxmanage snapshot` picks.
+        :param snapshot_id: UUID or name of the snapshot.
+        :return: Snapshot node or None if not found.
+        """
+        snapshot = self.by_uuid.get(snapshot_id.strip('{}'))
+        if snapshot is None:
+            snapshots = self.by_name.get(snapshot_id)
+            snapshot = snapshots[0] if snapshots else None
+        return snapshot
+
+    def ancestors(self, snapshot_id: str = None) -> list[SnapshotNode]:
+        """
+        Get the ancestors of a snapshot.
+        :param snapshot_id: UUID or name of the snapshot. None uses the current snapshot.
+        :return: List of snapshots from the parent up to the root. Empty if the snapshot is not found.
+        """
+        snapshot = self._resolve(snapshot_id)
+        ancestors = []
+        while snapshot is not None and snapshot.parent is not None:
+            snapshot = snapshot.parent
+            ancestors.append(snapshot)
+        return ancestors
+
+    def descendants(self, snapshot_id: str) -> list[SnapshotNode]:
+        """
+        Get all snapshots below a snapshot.
+        :param snapshot_id: UUID or name of the snapshot.
+        :return: List of snapshots depth-first. Empty if the snapshot is not found.
+        """
+        snapshot = self.get(snapshot_id)
+        descendants, stack = [], list(reversed(snapshot.children)) if snapshot else []
+        while stack:
+            child = stack.pop()
+            descendants.append(child)
+            stack.extend(reversed(child.children))
+        return descendants
+
+    def leaves(self) -> list[SnapshotNode]:
+        """
+        Get the snapshots without children, i.e. the tips of all branches.
+        """
+        return [snapshot for snapshot in self._snapshots if snapshot.is_leaf]
+
+    def path_to_current(self) -> list[SnapshotNode]:
+        """
+        Get the chain of snapshots the current state is based on.
+        :return: List of snapshots from the root down to the current snapshot. Empty if there is none.
+        """
+        if self.current is None:
+            return []
+        return [*reversed(self.ancestors(self.current.uuid)), self.current]
+
+    def _resolve(self, snapshot_id: Optional[str]) -> Optional[SnapshotNode]:
+        return self.current if snapshot_id is None else self.get(snapshot_id)
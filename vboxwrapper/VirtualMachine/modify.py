@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from ..VMExceptions import VirtualMachinException
+from ..commands import Commands
+from ..console import print
+from .info import Info
+
+
+class ModifyVM:
+    """
+    Class to collect virtual machine settings and apply them with a single `vboxmanage modifyvm` call.
+    Can be used as a builder (`vm.modify().cpus(2).memory(4096).apply()`)
+    or as a transaction (`with vm.modify() as m: ...`) that is applied on exit without an exception.
+    """
+    NIC_TYPES = ('nat', 'bridged', 'intnet', 'hostonly')
+
+    _cmd = Commands()
+
+    def __init__(self, info: Info):
+        self.info = info
+        self._flags: dict[str, str] = {}
+        self._summary: dict[str, str] = {}
+
+    @property
+    def name(self) -> str:
+        return self.info.name
+
+    def __enter__(self) -> 'ModifyVM':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.apply()
+
+    def __bool__(self) -> bool:
+        return bool(self._flags)
+
+    def set(self, flag: str, value: str | int, summary: str = None) -> 'ModifyVM':
+        """
+        Queue a raw modifyvm option. A later value for the same option replaces the earlier one.
+        :param flag: modifyvm option without leading dashes, e.g. 'cpus'.
+        :param value: Option value.
+        :param summary: Human-readable description for the log line. Defaults to 'flag=value'.
+        """
+        self._flags[flag] = str(value)
+        self._summary[flag] = summary or f"{flag}={value}"
+        return self
+
+    def cpus(self, num: int) -> 'ModifyVM':
+        return self.set('cpus', num)
+
+    def memory(self, num: int) -> 'ModifyVM':
+        return self.set('memory', num)
+
+    def audio(self, turn: bool) -> 'ModifyVM':
+        return self.set('audio-driver', 'default' if turn else 'none', f"audio={self._on_off(turn)}")
+
+    def nested_virtualization(self, turn: bool) -> 'ModifyVM':
+        return self.set('nested-hw-virt', self._on_off(turn))
+
+    def speculative_execution_control(self, turn_on: bool = True) -> 'ModifyVM':
+        return self.set('spec-ctrl', self._on_off(turn_on))
+
+    def usb_controller(self, turn: bool) -> 'ModifyVM':
+        return self.set('usb', self._on_off(turn))
+
+    def usb_ehci_controller(self, turn: bool) -> 'ModifyVM':
+        return self.set('usb-ehci', self._on_off(turn))
+
+    def usb_xhci_controller(self, turn: bool) -> 'ModifyVM':
+        return self.set('usb-xhci', self._on_off(turn))
+
+    def nic(
+            self,
+            turn: bool = True,
+            adapter_number: int | str = 1,
+            connect_type: str = 'nat',
+            adapter_name: str = None
+    ) -> 'ModifyVM':
+        """
+        Queue network adapter settings.
+        :param turn: Whether to turn on the adapter (default: True).
+        :param adapter_number: Adapter number (default: 1).
+        :param connect_type: Connection type nat, bridged, intnet, hostonly (default: 'nat').
+        :param adapter_name: Name of the host adapter for bridged and hostonly modes (default: None).
+        """
+        _connect_type = connect_type.lower()
+        if _connect_type not in self.NIC_TYPES:
+            raise VirtualMachinException(
+                "[red]|ERROR| Please enter correct connection type: nat, bridged, intnet, hostonly"
+            )
+
+        self.set(f'nic{adapter_number}', _connect_type if turn else 'none')
+        _adapter_name_flag = {'bridged': f'bridgeadapter{adapter_number}', 'hostonly': f'hostonlyadapter{adapter_number}'}
+        if adapter_name and turn and _connect_type in _adapter_name_flag:
+            self.set(_adapter_name_flag[_connect_type], adapter_name)
+        return self
+
+    @property
+    def command(self) -> str:
+        """
+        Get the modifyvm command line for the queued settings.
+        :return: Command line string.
+        """
+        options = ' '.join(f"--{flag} {self._cmd.quote(value)}" for flag, value in self._flags.items())
+        return f"{self._cmd.modifyvm} {self._cmd.quote(self.info.vm_id)} {options}"
+
+    def apply(self, log: bool = True) -> int:
+        """
+        Apply all queued settings with one modifyvm call and clear the queue.
+        :param log: If True, print a single line summarising the applied settings.
+        :return: Return code of the modifyvm call. 0 if nothing was queued.
+        """
+        if not self._flags:
+            return 0
+
+        returncode = self._cmd.call(self.command)
+        summary = ', '.join(self._summary.values())
+        self._flags.clear()
+        self._summary.clear()
+
+        if returncode != 0:
+            print(f"[red]|ERROR|{self.name}| Failed to apply settings: {summary}")
+        elif log:
+            print(f"[green]|INFO|{self.name}| Applied settings: [cyan]{summary}[/]")
+        return returncode
+
+    @staticmethod
+    def _on_off(turn: bool) -> str:
+        return 'on' if turn else 'off'
@@ -1,14 +1,11 @@
 # -*- coding: utf-8 -*-
-import time
 from contextlib import nullcontext
 
 from ..VMExceptions import VirtualMachinException
 from .info import Info
+from .modify import ModifyVM
 from ..commands import Commands
-from rich.console import Console
-
-console = Console()
-print = console.print
+from ..console import console, print
 
 
 class Network:
@@ -19,6 +16,7 @@ class Network:
     _BRIDGED = 'bridged'
     _INTNET = 'intnet'
     _HOSTONLY = 'hostonly'
+    _IP_PROPERTY = '/VirtualBox/GuestInfo/Net/0/V4/IP'
 
     _cmd = Commands()
 
@@ -43,23 +41,9 @@ class Network:
         :param connect_type: Connection type nat, bridged, intnet, hostonly (default: 'nat').
         :param adapter_name: Name of the adapter (default: None).
         """
-        _connect_type = connect_type.lower()
-        if _connect_type not in [self._NAT, self._BRIDGED, self._INTNET, self._HOSTONLY]:
-            raise VirtualMachinException(
-                f"[red]|ERROR| Please enter correct connection type: nat, bridged, intnet, hostonly"
-            )
-
-        _adapter_name_flag = {
-            self._BRIDGED: f'--bridgeadapter{adapter_number}',
-            self._HOSTONLY: f'--hostonlyadapter{adapter_number}',
-        }
-        _adapter_name = f"{_adapter_name_flag[_connect_type]} \"{adapter_name}\"" \
-            if adapter_name and turn and _connect_type in _adapter_name_flag else ''
-
-        self._cmd.call(
-            f"{self._cmd.modifyvm} {self.name} "
-            f"--nic{adapter_number} {connect_type.lower() if turn else 'none'} {_adapter_name}".strip()
-        )
+        if ModifyVM(self.info).nic(turn, adapter_number, connect_type, adapter_name).apply(log=False) != 0:
+            return
+        _adapter_name = adapter_name if adapter_name and turn and connect_type.lower() in (self._BRIDGED, self._HOSTONLY) else ''
 
         print(
             f'[green]|INFO| Network adapter [cyan]{adapter_number}[/] is turn [cyan]{"on" if turn else "off"}[/] '
@@ -105,35 +89,53 @@ class Network:
         """
         self._cmd.call(f"{self._cmd.vboxmanage} list bridgedifs")
 
-    def wait_up(self, timeout: int = 300, status_bar: bool = False, interval: int = 1) -> None:
+    def wait_up(self, timeout: int = 300, status_bar: bool = False, interval: float = None) -> None:
         """
         Wait for the network adapter to be up.
+        Blocks on changes of the IP guest property instead of polling it.
         :param timeout: Timeout in seconds (default: 300).
         :param status_bar: Whether to show a progress bar (default: False).
+        :param interval: Maximum time in seconds between two IP checks (default: Info.WAIT_SLICE).
         """
         msg = f"[cyan]|INFO|{self.name}| Waiting for network adapter up"
         print(msg) if status_bar else None
 
-        start_time = time.time()
         with console.status(msg) if status_bar else nullcontext() as status:
-            while time.time() - start_time < timeout:
-                status.update(f"{msg}: {(time.time() - start_time):.00f}/{timeout}") if status_bar else None
-                ip_address = self.get_ip()
-                if ip_address:
-                    print(f'[green]|INFO|{self.name}| The network adapter is running, ip: [cyan]{ip_address}[/]')
-                    break
-                time.sleep(interval)
-            else:
-                raise VirtualMachinException(
-                    f"[red]|ERROR|{self.name}| Waiting time for the virtual machine network adapter to start has expired"
-                )
+            ip_address = self.info.wait_for_guest_property(
+                self._IP_PROPERTY,
+                timeout=timeout,
+                wait_slice=interval,
+                progress=lambda elapsed: status.update(f"{msg}: {elapsed:.00f}/{timeout}") if status_bar else None
+            )
+
+        if not ip_address:
+            raise VirtualMachinException(
+                f"[red]|ERROR|{self.name}| Waiting time for the virtual machine network adapter to start has expired"
+            )
+        print(f'[green]|INFO|{self.name}| The network adapter is running, ip: [cyan]{ip_address}[/]')
+
+    async def wait_up_async(self, timeout: int = 300, interval: float = None) -> str:
+        """
+        Asynchronous counterpart of `wait_up`.
+        :param timeout: Timeout in seconds (default: 300).
+        :param interval: Maximum time in seconds between two IP checks (default: Info.WAIT_SLICE).
+        :return: IP address of the network adapter.
+        """
+        print(f"[cyan]|INFO|{self.name}| Waiting for network adapter up")
+        ip_address = await self.info.wait_for_guest_property_async(self._IP_PROPERTY, timeout=timeout, wait_slice=interval)
+        if not ip_address:
+            raise VirtualMachinException(
+                f"[red]|ERROR|{self.name}| Waiting time for the virtual machine network adapter to start has expired"
+            )
+        print(f'[green]|INFO|{self.name}| The network adapter is running, ip: [cyan]{ip_address}[/]')
+        return ip_address
 
     def get_ip(self) -> str | None:
         """
         Get the IP address of the network adapter.
         :return: IP address or None if not available.
         """
-        output = self._cmd.get_output(f'{self._cmd.guestproperty} {self.name} "/VirtualBox/GuestInfo/Net/0/V4/IP"')
-        if output and output != 'No value set!':
-            return output.split(':')[1].strip()
-        return None
+        return self.info.get_guest_property(self._IP_PROPERTY) or None
+
+    async def get_ip_async(self) -> str | None:
+        return await self.info.get_guest_property_async(self._IP_PROPERTY) or None
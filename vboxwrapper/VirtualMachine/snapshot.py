@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 import time
-from rich.console import Console
+from typing import Optional
 
 from ..commands import Commands
-from .info import Info
+from ..console import print
+from .info import Info, parse_machine_readable
+from .info.vm_config import SnapshotNode, SnapshotTree
 
-console = Console()
-print = console.print
 
 class Snapshot:
     """
@@ -22,45 +22,81 @@ class Snapshot:
     def name(self) -> str:
         return self.info.name
 
+    @property
+    def _target(self) -> str:
+        return self._cmd.quote(self.info.vm_id)
+
     def list(self) -> list:
         """
         Get a list of snapshots for the virtual machine.
         :return: List of snapshots.
         """
-        return self._cmd.get_output(f"{self._cmd.snapshot} {self.name} list").split('\n')
+        return self._cmd.get_output(f"{self._cmd.snapshot} {self._target} list").split('\n')
 
-    def delete(self, name: str) -> None:
+    def delete(self, name: str) -> int:
         """
         Delete a snapshot.
         :param name: Name of the snapshot to delete.
+        :return: Return code of the snapshot call.
         """
-        self._cmd.call(f"{self._cmd.snapshot} {self.name} delete {name}")
-        print(f"[green]|INFO| Snapshot [cyan]{name}[/] deleted.")
+        returncode = self._cmd.call(f"{self._cmd.snapshot} {self._target} delete {self._cmd.quote(name)}")
+        if returncode == 0:
+            print(f"[green]|INFO| Snapshot [cyan]{name}[/] deleted.")
+        return returncode
 
-    def restore(self, name: str = None) -> None:
+    def restore(self, name: str = None) -> int:
         """
         Restore a snapshot.
         :param name: Name of the snapshot to restore. If None, restore the most recent snapshot.
+        :return: Return code of the snapshot call.
         """
-        print(f"[green]|INFO|{self.name}| Restoring snapshot: {name if name else self.list()[-1].strip()}")
-        self._cmd.call(f"{self._cmd.snapshot} {self.name} {f'restore {name}' if name else 'restorecurrent'}")
+        print(f"[green]|INFO|{self.name}| Restoring snapshot: {name if name else self._current_snapshot_name()}")
+        returncode = self._cmd.call(self._restore_cmd(name))
         time.sleep(1)  # todo
+        return returncode
 
-    def rename(self, old_name: str, new_name: str) -> None:
+    def rename(self, old_name: str, new_name: str) -> int:
         """
         Rename a snapshot.
         :param old_name: Current name of the snapshot.
         :param new_name: New name for the snapshot.
+        :return: Return code of the snapshot call.
         """
-        self._cmd.call(f"{self._cmd.snapshot} {self.name} edit {old_name} --name {new_name}")
-        print(f"[green]|INFO| Snapshot [cyan]{old_name}[/] has been renamed to [cyan]{new_name}[/]")
+        returncode = self._cmd.call(
+            f"{self._cmd.snapshot} {self._target} edit {self._cmd.quote(old_name)} --name {self._cmd.quote(new_name)}"
+        )
+        if returncode == 0:
+            print(f"[green]|INFO| Snapshot [cyan]{old_name}[/] has been renamed to [cyan]{new_name}[/]")
+        return returncode
 
-    def take(self, name: str) -> None:
+    def take(self, name: str) -> int:
         """
         Take a snapshot.
         :param name: Name for the new snapshot.
+        :return: Return code of the snapshot call.
+        """
+        return self._cmd.call(f"{self._cmd.snapshot} {self._target} take {self._cmd.quote(name)}")
+
+    async def list_async(self) -> list:
+        return (await self._cmd.get_output_async(f"{self._cmd.snapshot} {self._target} list")).split('\n')
+
+    async def delete_async(self, name: str) -> int:
+        returncode = await self._cmd.call_async(f"{self._cmd.snapshot} {self._target} delete {self._cmd.quote(name)}")
+        if returncode == 0:
+            print(f"[green]|INFO| Snapshot [cyan]{name}[/] deleted.")
+        return returncode
+
+    async def restore_async(self, name: str = None) -> int:
+        """
+        Asynchronous counterpart of `restore`.
+        :param name: Name of the snapshot to restore. If None, restore the most recent snapshot.
+        :return: Return code of the snapshot call.
         """
-        self._cmd.call(f"{self._cmd.snapshot} {self.name} take {name}")
+        print(f"[green]|INFO|{self.name}| Restoring snapshot: {name if name else self._current_snapshot_name()}")
+        return await self._cmd.call_async(self._restore_cmd(name))
+
+    async def take_async(self, name: str) -> int:
+        return await self._cmd.call_async(f"{self._cmd.snapshot} {self._target} take {self._cmd.quote(name)}")
 
     def get_snapshots_info(self) -> list:
         """
@@ -76,29 +112,80 @@ class Snapshot:
         """
         return self.info.config_parser.get_current_snapshot_info()
 
+    def get_tree(self) -> SnapshotTree:
+        """
+        Get the snapshot tree from the .vbox file. The tree is rebuilt only when the file changes.
+        :return: Snapshot tree with parent/child links and UUID and name indexes.
+        """
+        return self.info.config_parser.snapshot_tree
+
+    def find(self, snapshot_id: str) -> Optional[SnapshotNode]:
+        """
+        Find a snapshot by name or UUID.
+        :param snapshot_id: Name or UUID of the snapshot.
+        :return: Snapshot node or None if not found.
+        """
+        return self.get_tree().get(snapshot_id)
+
+    def get_ancestors(self, snapshot_id: str = None) -> 'list[SnapshotNode]':
+        """
+        Get the ancestors of a snapshot.
+        :param snapshot_id: Name or UUID of the snapshot. If None, the current snapshot is used.
+        :return: List of snapshots from the parent up to the root.
+        """
+        return self.get_tree().ancestors(snapshot_id)
+
+    def get_descendants(self, snapshot_id: str) -> 'list[SnapshotNode]':
+        """
+        Get all snapshots taken on top of a snapshot.
+        :param snapshot_id: Name or UUID of the snapshot.
+        :return: List of snapshots, parents before children.
+        """
+        return self.get_tree().descendants(snapshot_id)
+
+    def get_leaves(self) -> 'list[SnapshotNode]':
+        """
+        Get the snapshots without children.
+        :return: List of snapshots at the tips of the tree.
+        """
+        return self.get_tree().leaves()
+
+    def get_path_to_current(self) -> 'list[SnapshotNode]':
+        """
+        Get the chain of snapshots from the root to the current snapshot.
+        :return: List of snapshots. Empty if the virtual machine has no snapshots.
+        """
+        return self.get_tree().path_to_current()
+
     def get_current_snapshot_info_by_command(self) -> dict:
         """
         Get information about the current snapshot.
         :return: Dictionary with snapshot information (name, uuid, description, timestamp).
         """
-        def parse_value(line: str) -> str:
-            """Extract value from key=value line and remove quotes."""
-            return line.split('=', 1)[1].strip('"')
-
-        output = self._cmd.get_output(f"{self._cmd.snapshot} {self.name} list --machinereadable")
+        output = self._cmd.get_output(f"{self._cmd.snapshot} {self._target} list --machinereadable")
+        parsed = parse_machine_readable(output)
         snapshot_info = {}
-        output_list = output.splitlines()
 
-        for line in output_list:
-            if line.startswith('CurrentSnapshotName='):
-                snapshot_info['name'] = parse_value(line)
-            elif line.startswith('CurrentSnapshotUUID='):
-                snapshot_info['uuid'] = parse_value(line)
-            elif line.startswith('CurrentSnapshotNode='):
-                snapshot_info['node'] = parse_value(line)
+        for key, info_key in (('CurrentSnapshotName', 'name'), ('CurrentSnapshotUUID', 'uuid'), ('CurrentSnapshotNode', 'node')):
+            if key in parsed:
+                snapshot_info[info_key] = parsed[key]
 
-        for line in output_list:
-            if line.startswith(snapshot_info['node'].replace('Name', 'Description')):
-                snapshot_info['description'] = parse_value(line)
+        description_key = snapshot_info.get('node', '').replace('Name', 'Description')
+        if description_key in parsed:
+            snapshot_info['description'] = parsed[description_key]
 
-        return snapshot_info if snapshot_info else {}
+        return snapshot_info
+
+    def _restore_cmd(self, name: Optional[str]) -> str:
+        return f"{self._cmd.snapshot} {self._target} {f'restore {self._cmd.quote(name)}' if name else 'restorecurrent'}"
+
+    def _current_snapshot_name(self) -> str:
+        """
+        Get the name of the current snapshot from the .vbox file for log messages.
+        :return: Snapshot name or 'current snapshot' if the file cannot be read.
+        """
+        try:
+            current = self.get_tree().current
+        except (OSError, SyntaxError, ValueError):
+            current = None
+        return current.name if current is not None else 'current snapshot'
@@ -1,10 +1,8 @@
 # -*- coding: utf-8 -*-
-from rich.console import Console
-
 from ..commands import Commands
+from ..console import print
 from .info import Info
-console = Console()
-print = console.print
+from .modify import ModifyVM
 
 
 class USB:
@@ -31,7 +29,8 @@ class USB:
         :param turn: True to enable, False to disable.
         """
         _turn = 'on' if turn else 'off'
-        self._cmd.call(f"{self._cmd.modifyvm} {self.name} --usb {_turn}")
+        if ModifyVM(self.info).usb_controller(turn).apply(log=False) != 0:
+            return
         print(f"[green]|INFO|{self.name}| USB controller is [cyan]{_turn}[/]")
 
     def ehci_controller(self, turn: bool) -> None:
@@ -40,7 +39,8 @@ class USB:
         :param turn: True to enable, False to disable.
         """
         _turn = 'on' if turn else 'off'
-        self._cmd.call(f"{self._cmd.modifyvm} {self.name} --usb-ehci {_turn}")
+        if ModifyVM(self.info).usb_ehci_controller(turn).apply(log=False) != 0:
+            return
         print(f"[green]|INFO|{self.name}| USB 2.0 (EHCI) controller is [cyan]{_turn}[/]")
 
     def xhci_controller(self, turn: bool) -> None:
@@ -49,5 +49,6 @@ class USB:
         :param turn: True to enable, False to disable.
         """
         _turn = 'on' if turn else 'off'
-        self._cmd.call(f"{self._cmd.modifyvm} {self.name} --usb-xhci {_turn}")
+        if ModifyVM(self.info).usb_xhci_controller(turn).apply(log=False) != 0:
+            return
         print(f"[green]|INFO|{self.name}| USB 3.0 (xHCI) controller is [cyan]{_turn}[/]")
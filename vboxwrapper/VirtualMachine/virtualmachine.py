@@ -3,21 +3,20 @@ import time
 import os
 import shutil
 from typing import Optional
-from rich.console import Console
 
 from .info import Info, ConfigEditor
 
 from ..commands import Commands
+from ..inventory import Inventory
 from ..VMExceptions import VirtualMachinException
+from ..console import console, print
 
+from .modify import ModifyVM
 from .network import Network
 from .snapshot import Snapshot
 from .usb import USB
 from .storage import Storage
 
-console = Console()
-print = console.print
-
 
 class VirtualMachine:
     """
@@ -25,15 +24,20 @@ class VirtualMachine:
     """
 
     _cmd = Commands()
+    _MIN_POLL_INTERVAL = 0.5
 
-    def __init__(self, vm_id: str, config_path: str = None):
+    def __init__(self, vm_id: str, config_path: str = None, cache_ttl: float = 1.0, inventory: Inventory = None):
         """
         Initialize VirtualMachine with the virtual machine ID.
         :param vm_id: Virtual machine ID (name or uuid).
         :param config_path: Path to the virtual machine configuration file.
+        :param cache_ttl: Time in seconds for which the parsed showvminfo output is reused. 0 disables caching.
+        :param inventory: Inventory or Registry used to resolve the virtual machine without spawning vboxmanage,
+        e.g. `Vbox().inventory`. With an Inventory, settings of powered off virtual machines are read
+        from the .vbox file.
         """
         self.name = vm_id
-        self.info = Info(self.name, config_path=config_path)
+        self.info = Info(self.name, config_path=config_path, cache_ttl=cache_ttl, inventory=inventory)
         self.snapshot = Snapshot(self.info)
         self.storage = Storage(self.info)
         self.network = Network(self.info)
@@ -47,22 +51,44 @@ class VirtualMachine:
     def vm_dir(self) -> str:
         return self.info.vm_dir
 
-    def shutdown(self) -> None:
-        self._cmd.call(f"{self._cmd.controlvm} {self.name} acpipowerbutton")
+    def modify(self) -> ModifyVM:
+        """
+        Start a batch of setting changes that is applied with a single modifyvm call.
+        Usage: `with vm.modify() as m: m.cpus(4).memory(8192).audio(False)`
+        :return: ModifyVM builder bound to this virtual machine.
+        """
+        return ModifyVM(self.info)
 
-    def wait_until_shutdown(self, timeout: int = 120) -> bool:
+    def shutdown(self) -> int:
+        """
+        Press the ACPI power button of the virtual machine.
+        :return: Return code of the controlvm call.
+        """
+        return self._cmd.call(f"{self._cmd.controlvm} {self.name} acpipowerbutton")
+
+    def wait_until_shutdown(self, timeout: int = 120, poll_interval: float = None) -> bool:
         """
         Wait until the virtual machine shuts down.
+        The power state is not exposed as a guest property, so the method blocks on guest property changes,
+        which the guest fires while it shuts down and VirtualBox fires when it drops the transient properties
+        at power off, and checks the power state each time a wait returns.
         :param timeout: Timeout duration in seconds.
+        :param poll_interval: Maximum time in seconds between two power state checks (default: Info.WAIT_SLICE).
         :return: True if the virtual machine shuts down within the timeout, False otherwise.
         """
         print(f"[green]|INFO|{self.name}| Waiting until shutdown.")
-        for _ in range(timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            checked_at = time.monotonic()
+            self.info.invalidate()
             if self.power_status() is False:
                 print(f"[green]|INFO|{self.name}| Is Power Off.")
                 return True
-            time.sleep(1)
-        return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.info.wait_guest_property('*', min(remaining, poll_interval or self.info.WAIT_SLICE))
+            time.sleep(max(0.0, self._MIN_POLL_INTERVAL - (time.monotonic() - checked_at)))
 
     def change_guest_password(self, new_password: str, username: str, password: str) -> None:
         """
@@ -86,7 +112,8 @@ class VirtualMachine:
         which can lead to potential data leaks.
         :param turn_on: True - включить, False - отключить
         """
-        self._cmd.call(f"{self._cmd.modifyvm} {self.name} --spec-ctrl {'on' if turn_on else 'off'}")
+        if self.modify().speculative_execution_control(turn_on).apply(log=False) != 0:
+            return
         print(f"[green]|INFO|{self.name}| Speculative Execution Control is [cyan]{'on' if turn_on else 'off'}[/]")
 
     def audio(self, turn: bool) -> None:
@@ -94,7 +121,8 @@ class VirtualMachine:
         Enable or disable audio interface.
         :param turn: True to enable, False to disable.
         """
-        self._cmd.call(f"{self._cmd.modifyvm} {self.name} --audio-driver {'default' if turn else 'none'}")
+        if self.modify().audio(turn).apply(log=False) != 0:
+            return
         print(f"[green]|INFO|{self.name}| Audio interface is [cyan]{'on' if turn else 'off'}[/]")
 
     def nested_virtualization(self, turn: bool) -> None:
@@ -103,24 +131,31 @@ class VirtualMachine:
         :param turn: True to enable, False to disable.
         """
         _turn = 'on' if turn else 'off'
-        self._cmd.call(f"{self._cmd.modifyvm} {self.name} --nested-hw-virt {_turn}")
+        if self.modify().nested_virtualization(turn).apply(log=False) != 0:
+            return
         print(f"[green]|INFO|{self.name}| Nested VT-x/AMD-V is [cyan]{_turn}[/]")
 
-    def set_cpus(self, num: int) -> None:
+    def set_cpus(self, num: int) -> int:
         """
         Set the number of CPU cores.
         :param num: Number of CPU cores.
+        :return: Return code of the modifyvm call.
         """
-        self._cmd.call(f"{self._cmd.modifyvm} {self.name} --cpus {num}")
-        print(f"[green]|INFO|{self.name}| The number of processor cores is set to [cyan]{num}[/]")
+        returncode = self.modify().cpus(num).apply(log=False)
+        if returncode == 0:
+            print(f"[green]|INFO|{self.name}| The number of processor cores is set to [cyan]{num}[/]")
+        return returncode
 
-    def set_memory(self, num: int) -> None:
+    def set_memory(self, num: int) -> int:
         """
         Set the amount of memory.
         :param num: Amount of memory.
+        :return: Return code of the modifyvm call.
         """
-        self._cmd.call(f"{self._cmd.modifyvm} {self.name} --memory {num}")
-        print(f"[green]|INFO|{self.name}| Installed RAM quantity: [cyan]{num}[/]")
+        returncode = self.modify().memory(num).apply(log=False)
+        if returncode == 0:
+            print(f"[green]|INFO|{self.name}| Installed RAM quantity: [cyan]{num}[/]")
+        return returncode
 
     def wait_logged_user(self, timeout: int = 300, status_bar: bool = False) -> None:
         """
@@ -128,61 +163,117 @@ class VirtualMachine:
         :param timeout: Timeout duration in seconds.
         :param status_bar: True to show progress as a status bar, False otherwise.
         """
-        start_time = time.time()
         status_msg = f"[cyan]|INFO|{self.name}| Waiting for Logged In Users List"
         status = console.status(status_msg)
         status.start() if status_bar else print(status_msg)
-        while time.time() - start_time < timeout:
-            status.update(f"{status_msg}: {(time.time() - start_time):.00f}/{timeout}") if status_bar else ...
-            user_name = self.get_logged_user()
-            if user_name:
-                print(f'[green]|INFO|{self.name}| List of logged-in user [cyan]{user_name}[/].')
-                break
-            time.sleep(1)
-        else:
+        try:
+            user_name = self.info.wait_for_guest_property(
+                '/VirtualBox/GuestInfo/OS/LoggedInUsersList',
+                timeout=timeout,
+                progress=lambda elapsed: status.update(f"{status_msg}: {elapsed:.00f}/{timeout}") if status_bar else ...
+            )
+        finally:
             status.stop() if status_bar else ...
+
+        if not user_name:
             raise VirtualMachinException(
                 f"[red]|ERROR|{self.name}| Waiting time for the virtual machine {self.name} "
                 f"Logged In Users List has expired"
             )
-        status.stop() if status_bar else ...
+        print(f'[green]|INFO|{self.name}| List of logged-in user [cyan]{user_name}[/].')
 
-    def run(self, headless: bool = False) -> None:
+    def run(self, headless: bool = False) -> int:
         """
         Start the virtual machine.
         :param headless: True to start in headless mode, False otherwise.
+        :return: Return code of the startvm call, 0 if the virtual machine is already running.
         """
         if self.power_status() is False:
             print(f"[green]|INFO|{self.name}| Starting VirtualMachine")
-            self._cmd.call(f'{self._cmd.startvm} {self.name}{" --type headless" if headless else ""}')
-        else:
-            print(f"[red]|INFO|{self.name}| VirtualMachine already is running")
+            return self._cmd.call(f'{self._cmd.startvm} {self.name}{" --type headless" if headless else ""}')
+        print(f"[red]|INFO|{self.name}| VirtualMachine already is running")
+        return 0
 
     def power_status(self) -> bool:
         """
         Check the power status of the virtual machine.
         :return: True if the virtual machine is running, False otherwise.
         """
-        vm_state = self.get_parameter('VMState')
+        vm_state = self.info.get_parameters(['VMState'])['VMState']
         if vm_state:
             return vm_state.lower() == "running"
         print(f"[red]|INFO|{self.name}| Unable to determine virtual machine status")
         return False
 
-    def stop(self, wait_until_shutdown: bool = True) -> None:
+    def stop(self, wait_until_shutdown: bool = True) -> int:
         """
         Shutdown the virtual machine.
         This method powers off the virtual machine by sending the poweroff command.
 
         :param wait_until_shutdown: If True, the method waits until the virtual machine
         has shut down completely before returning. If False, it returns immediately after sending the poweroff command.
-        :return: None
+        :return: Return code of the poweroff call, 1 if the virtual machine did not power off within the wait timeout.
         """
         print(f"[green]|INFO|{self.name}| Shutting down the virtual machine")
-        self._cmd.call(f'{self._cmd.controlvm} {self.name} poweroff')
+        returncode = self._cmd.call(f'{self._cmd.controlvm} {self.name} poweroff')
+
+        if returncode == 0 and wait_until_shutdown and not self.wait_until_shutdown():
+            return 1
+        return returncode
+
+    async def run_async(self, headless: bool = False) -> int:
+        """
+        Asynchronous counterpart of `run`.
+        :param headless: True to start in headless mode, False otherwise.
+        :return: Return code of the startvm call, 0 if the virtual machine is already running.
+        """
+        if await self.power_status_async() is False:
+            print(f"[green]|INFO|{self.name}| Starting VirtualMachine")
+            return await self._cmd.call_async(f'{self._cmd.startvm} {self.name}{" --type headless" if headless else ""}')
+        print(f"[red]|INFO|{self.name}| VirtualMachine already is running")
+        return 0
 
-        if wait_until_shutdown:
-            self.wait_until_shutdown()
+    async def shutdown_async(self) -> int:
+        return await self._cmd.call_async(f"{self._cmd.controlvm} {self.name} acpipowerbutton")
+
+    async def stop_async(self, wait_until_shutdown: bool = True) -> int:
+        """
+        Asynchronous counterpart of `stop`.
+        :param wait_until_shutdown: If True, waits until the virtual machine has shut down completely.
+        :return: Return code of the poweroff call, 1 if the virtual machine did not power off within the wait timeout.
+        """
+        print(f"[green]|INFO|{self.name}| Shutting down the virtual machine")
+        returncode = await self._cmd.call_async(f'{self._cmd.controlvm} {self.name} poweroff')
+
+        if returncode == 0 and wait_until_shutdown and not await self.wait_until_shutdown_async():
+            return 1
+        return returncode
+
+    async def wait_until_shutdown_async(self, timeout: int = 120, poll_interval: float = None) -> bool:
+        """
+        Asynchronous counterpart of `wait_until_shutdown`.
+        :param timeout: Timeout duration in seconds.
+        :param poll_interval: Maximum time in seconds between two power state checks (default: Info.WAIT_SLICE).
+        :return: True if the virtual machine shuts down within the timeout, False otherwise.
+        """
+        import asyncio
+        print(f"[green]|INFO|{self.name}| Waiting until shutdown.")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            checked_at = loop.time()
+            self.info.invalidate()
+            if await self.power_status_async() is False:
+                print(f"[green]|INFO|{self.name}| Is Power Off.")
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await self.info.wait_guest_property_async('*', min(remaining, poll_interval or self.info.WAIT_SLICE))
+            await asyncio.sleep(max(0.0, self._MIN_POLL_INTERVAL - (loop.time() - checked_at)))
+
+    async def power_status_async(self) -> bool:
+        return await self.info.power_status_async()
 
     def get_logged_user(self) -> Optional[str]:
         return self.info.get_logged_user()
@@ -193,6 +284,9 @@ class VirtualMachine:
     def get_parameter(self, *args, **kwargs) -> Optional[str]:
         return self.info.get_parameter(*args, **kwargs)
 
+    def get_parameters(self, parameters: list[str]) -> dict[str, Optional[str]]:
+        return self.info.get_parameters(parameters)
+
     def get_info(self, *args, **kwargs) -> str:
         return self.info.get(*args, **kwargs)
 
@@ -204,6 +298,9 @@ class VirtualMachine:
         Check if the current virtual machine is registered in VirtualBox.
         :return: True if the virtual machine is registered, False otherwise.
         """
+        if self.info.inventory is not None:
+            return self.info.inventory.get(self.name) is not None
+
         vm_list_output = self._cmd.get_output(self._cmd.list)
         for line in vm_list_output.split('\n'):
             if self.name in line:
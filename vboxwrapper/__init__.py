@@ -1,4 +1,41 @@
 # -*- coding: utf-8 -*-
-from .VirtualMachine import VirtualMachine, FileUtils
-from .VBox import Vbox
+from importlib import import_module
+
 from .VMExceptions import VboxException, VirtualMachinException
+
+# Public classes are imported on first access, so `import vboxwrapper` does not pay
+# for the virtual machine modules, the XML parser and rich until they are used.
+_LAZY_ATTRIBUTES = {
+    'VirtualMachine': '.VirtualMachine',
+    'FileUtils': '.VirtualMachine',
+    'Vbox': '.VBox',
+    'VMGroup': '.vm_group',
+    'VMResult': '.vm_group',
+    'GuestFleet': '.guest_fleet',
+    'Registry': '.registry',
+    'ConfigCache': '.config_cache',
+    'MediaCleanup': '.media_cleanup',
+}
+
+__all__ = [
+    'VirtualMachine', 'FileUtils', 'Vbox', 'VboxException', 'VirtualMachinException', 'VMGroup', 'VMResult',
+    'GuestFleet', 'Registry', 'ConfigCache', 'MediaCleanup'
+]
+
+# The subpackage shares its name with the VirtualMachine class. It is imported now (cheap, its own
+# attributes are lazy), so later submodule imports do not bind it over the class, and the binding
+# the import system adds to this namespace is dropped, so __getattr__ resolves the class.
+import_module('.VirtualMachine', __name__)
+globals().pop('VirtualMachine')
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
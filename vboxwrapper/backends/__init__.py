@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+from .base import Backend
+from .cli import CliBackend
+from .memory import MemoryBackend, SimulatedVM
+
+__all__ = ['Backend', 'CliBackend', 'MemoryBackend', 'SimulatedVM']
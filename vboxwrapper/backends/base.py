@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from abc import ABC, abstractmethod
+from subprocess import CompletedProcess
+
+
+class Backend(ABC):
+    """
+    Interface between vboxwrapper and VirtualBox.
+    Info, Snapshot, Network, USB and the other classes build vboxmanage command lines, which `Commands`
+    hands to `execute` of the active backend (see `Commands.set_backend`).
+    """
+    # True if the backend answers command lines itself instead of spawning vboxmanage.
+    in_process: bool = False
+
+    @abstractmethod
+    def execute(self, command: str) -> CompletedProcess:
+        """
+        Execute a vboxmanage command line.
+        :param command: Command line, e.g. 'vboxmanage showvminfo vm --machinereadable'.
+        :return: `CompletedProcess` with the return code, stdout and stderr.
+        """
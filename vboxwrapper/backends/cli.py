@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from subprocess import CompletedProcess
+
+from .base import Backend
+from ..commands import Commands
+
+
+class CliBackend(Backend):
+    """
+    Backend that runs `vboxmanage` for every command line. This is the default backend.
+    """
+    _cmd = Commands()
+
+    def execute(self, command: str) -> CompletedProcess:
+        return self._cmd.run(command, stdout=False, stderr=False)
@@ -0,0 +1,547 @@
+# -*- coding: utf-8 -*-
+import fnmatch
+import shlex
+import time
+import uuid as uuid_lib
+from collections import deque
+from dataclasses import dataclass, field
+from os.path import basename, dirname, join
+from subprocess import CompletedProcess
+from threading import Condition, RLock
+from typing import Callable, Optional
+
+from .base import Backend
+
+BOOT_PROPERTIES = {
+    '/VirtualBox/GuestInfo/Net/0/V4/IP': '10.0.2.15',
+    '/VirtualBox/GuestInfo/OS/LoggedInUsersList': 'user',
+    '/VirtualBox/GuestInfo/OS/LoggedInUsers': '1',
+    '/VirtualBox/GuestInfo/OS/Product': 'Linux',
+}
+
+# modifyvm options that showvminfo --machinereadable reports under another key.
+_SHOWVMINFO_KEYS = {'audio-driver': 'audio', 'usb-ohci': 'usb', 'usb-ehci': 'ehci', 'usb-xhci': 'xhci'}
+_LONG_STATES = {
+    'poweroff': 'powered off', 'running': 'running', 'saved': 'saved', 'aborted': 'aborted', 'paused': 'paused'
+}
+_SINCE = '(since 2024-01-01T00:00:00.000000000)'
+
+
+class _Failure(Exception):
+    def __init__(self, message: str, returncode: int = 1):
+        super().__init__(message)
+        self.returncode = returncode
+
+
+@dataclass
+class SimulatedVM:
+    """
+    State of a virtual machine of the MemoryBackend.
+    Snapshots are dictionaries with name, uuid and parent (uuid or None).
+    """
+    name: str
+    uuid: str
+    groups: list[str] = field(default_factory=lambda: ['/'])
+    os_type: str = 'Ubuntu_64'
+    state: str = 'poweroff'
+    cpus: int = 1
+    memory: int = 1024
+    settings: dict[str, str] = field(default_factory=dict)
+    guest_properties: dict[str, str] = field(default_factory=dict)
+    snapshots: list[dict] = field(default_factory=list)
+    current_snapshot: Optional[str] = None
+    config_file: Optional[str] = None
+    boot_at: Optional[float] = None
+    shutdown_at: Optional[float] = None
+    events: deque = field(default_factory=lambda: deque(maxlen=64))
+
+
+class MemoryBackend(Backend):
+    """
+    Simulated VirtualBox that keeps a fleet of virtual machines in memory and answers vboxmanage
+    command lines in-process. It lets orchestration code be load-tested and benchmarked with thousands
+    of virtual machines without VirtualBox and without spawning processes.
+    A started VM gets its guest properties (IP, logged-in users) after `boot_delay` seconds and powers off
+    `shutdown_delay` seconds after an ACPI shutdown; `guestproperty wait` blocks until such an event.
+    Guest commands succeed without output unless a `guest_exec` callable is given.
+    """
+    in_process = True
+
+    def __init__(
+            self,
+            boot_delay: float = 0.0,
+            shutdown_delay: float = 0.0,
+            machine_folder: str = '/vms',
+            guest_exec: Callable[[SimulatedVM, list[str]], CompletedProcess] = None
+    ):
+        """
+        :param boot_delay: Seconds from startvm until the guest properties of a booted guest appear.
+        :param shutdown_delay: Seconds from an ACPI shutdown until the VM is powered off.
+        :param machine_folder: Default machine folder reported by `list systemproperties`.
+        :param guest_exec: Callable receiving the VM and the `guestcontrol run` arguments after `--`,
+        returning a `CompletedProcess` with the guest command result.
+        """
+        self.boot_delay = boot_delay
+        self.shutdown_delay = shutdown_delay
+        self.machine_folder = machine_folder
+        self.guest_exec = guest_exec
+        self.boot_properties = dict(BOOT_PROPERTIES)
+        self._vms: dict[str, SimulatedVM] = {}
+        self._names: dict[str, str] = {}
+        self._lock = Condition(RLock())
+        self._sequence = 0
+
+    # Fleet management
+
+    def add_vm(self, name: str, groups: list[str] = None, snapshots: int = 0, **attributes) -> SimulatedVM:
+        """
+        Register a new virtual machine.
+        :param name: Name of the virtual machine.
+        :param groups: Group paths, e.g. ['/dev'].
+        :param snapshots: Number of snapshots to create as a chain.
+        :param attributes: Other SimulatedVM fields, e.g. cpus=2, state='running'.
+        :return: The new virtual machine.
+        """
+        vm_uuid = attributes.pop('uuid', None) or str(uuid_lib.uuid4())
+        vm = SimulatedVM(
+            name=name,
+            uuid=vm_uuid,
+            groups=list(groups or ['/']),
+            config_file=attributes.pop('config_file', None) or join(self.machine_folder, name, f'{name}.vbox'),
+            **attributes
+        )
+        for index in range(snapshots):
+            self._take_snapshot(vm, f'snapshot-{index}')
+        if vm.state == 'running':
+            vm.guest_properties.update(self.boot_properties)
+        with self._lock:
+            self._vms[vm.uuid] = vm
+            self._names[vm.name] = vm.uuid
+        return vm
+
+    def populate(
+            self,
+            count: int,
+            groups: tuple[str, ...] = ('/dev', '/test', '/prod'),
+            snapshots: int = 0,
+            prefix: str = 'vm'
+    ) -> list[SimulatedVM]:
+        """
+        Create a fleet of powered off virtual machines named `<prefix>-0000`, `<prefix>-0001`, ...
+        :param count: Number of virtual machines.
+        :param groups: Group paths assigned round-robin.
+        :param snapshots: Number of snapshots per virtual machine.
+        :param prefix: Name prefix.
+        :return: The new virtual machines.
+        """
+        return [
+            self.add_vm(
+                f'{prefix}-{index:04d}',
+                groups=[groups[index % len(groups)]] if groups else None,
+                snapshots=snapshots
+            )
+            for index in range(count)
+        ]
+
+    def get_vm(self, vm_id: str) -> Optional[SimulatedVM]:
+        """
+        Find a virtual machine by name or UUID.
+        :return: Virtual machine or None if not registered.
+        """
+        with self._lock:
+            try:
+                return self._find(vm_id)
+            except _Failure:
+                return None
+
+    @property
+    def vms(self) -> list[SimulatedVM]:
+        with self._lock:
+            return list(self._vms.values())
+
+    def set_guest_property(self, vm_id: str, name: str, value: Optional[str]) -> None:
+        """
+        Set or delete a guest property, e.g. to simulate the guest reporting a new IP.
+        Waiters on matching patterns are woken up.
+        """
+        with self._lock:
+            self._set_property(self._find(vm_id), name, value)
+
+    # Command lines
+
+    def execute(self, command: str) -> CompletedProcess:
+        try:
+            args = shlex.split(command)
+        except ValueError as error:
+            return CompletedProcess(command, 2, '', f'{error}\n')
+
+        if not args or not basename(args[0]).lower().startswith('vboxmanage'):
+            return CompletedProcess(command, 127, '', f'{args[0] if args else command}: command not found\n')
+
+        handler = getattr(self, f'_cmd_{args[1].lower()}', None) if len(args) > 1 else None
+        if handler is None:
+            return CompletedProcess(command, 1, '', f'VBoxManage: error: Unknown command: {" ".join(args[1:])}\n')
+
+        lines = []
+        try:
+            with self._lock:
+                result = handler(args[2:], lines)
+        except _Failure as failure:
+            return CompletedProcess(command, failure.returncode, self._join(lines), f'VBoxManage: error: {failure}\n')
+        except (IndexError, ValueError) as error:
+            # Missing or malformed arguments, e.g. `showvminfo` without a VM or `snapshot edit` without --name.
+            reason = 'missing argument' if isinstance(error, IndexError) else error
+            return CompletedProcess(command, 1, '', f'VBoxManage: error: Syntax error in {args[1]}: {reason}\n')
+        if isinstance(result, CompletedProcess):
+            return CompletedProcess(command, result.returncode, result.stdout or '', result.stderr or '')
+        return CompletedProcess(command, 0, self._join(lines), '')
+
+    @staticmethod
+    def _join(lines: list[str]) -> str:
+        return ''.join(f'{line}\n' for line in lines)
+
+    def _cmd_list(self, args: list[str], out: list[str]) -> None:
+        what = [arg for arg in args if not arg.startswith('-')][:1]
+        long = '-l' in args or '--long' in args
+        vms = [self._advance(vm) for vm in self._vms.values()]
+        if what == ['vms'] and long:
+            for vm in vms:
+                out.extend([
+                    f"Name:                        {vm.name}",
+                    f"Groups:                      {','.join(vm.groups)}",
+                    f"Guest OS:                    {vm.os_type}",
+                    f"UUID:                        {vm.uuid}",
+                    f"Config file:                 {vm.config_file}",
+                    f"State:                       {_LONG_STATES.get(vm.state, vm.state)} {_SINCE}",
+                    '',
+                ])
+        elif what == ['vms']:
+            out.extend(f'"{vm.name}" {{{vm.uuid}}}' for vm in vms)
+        elif what == ['runningvms']:
+            out.extend(f'"{vm.name}" {{{vm.uuid}}}' for vm in vms if vm.state == 'running')
+        elif what == ['groups']:
+            out.extend(f'"{group}"' for group in sorted({group for vm in vms for group in vm.groups}))
+        elif what == ['systemproperties']:
+            out.append(f"Default machine folder:          {self.machine_folder}")
+        elif what == ['bridgedifs']:
+            out.extend(['Name:            eth0', 'Status:          Up', ''])
+        elif what != ['hostonlyifs']:
+            raise _Failure(f'Unknown list subcommand: {" ".join(args)}')
+
+    def _cmd_showvminfo(self, args: list[str], out: list[str]) -> None:
+        vm = self._advance(self._find(args[0]))
+        info = self._machine_readable(vm)
+        if '--machinereadable' in args:
+            out.extend(f'{key}={value}' if value.isdigit() else f'{key}="{value}"' for key, value in info.items())
+            return
+        out.extend([
+            f"Name:                        {vm.name}",
+            f"Groups:                      {','.join(vm.groups)}",
+            f"Guest OS:                    {vm.os_type}",
+            f"UUID:                        {vm.uuid}",
+            f"Config file:                 {vm.config_file}",
+            f"Memory size:                 {vm.memory}MB",
+            f"Number of CPUs:              {vm.cpus}",
+            f"State:                       {_LONG_STATES.get(vm.state, vm.state)} {_SINCE}",
+        ])
+
+    def _cmd_startvm(self, args: list[str], out: list[str]) -> None:
+        vm = self._find(args[0])
+        self._start(vm)
+        out.append(f'VM "{vm.name}" has been successfully started.')
+
+    def _cmd_controlvm(self, args: list[str], out: list[str]) -> None:
+        self._control(self._find(args[0]), *args[1:])
+
+    def _cmd_modifyvm(self, args: list[str], out: list[str]) -> None:
+        options = args[1:]
+        self._modify(self._find(args[0]), {flag.lstrip('-'): value for flag, value in zip(options[::2], options[1::2])})
+
+    def _cmd_snapshot(self, args: list[str], out: list[str]) -> None:
+        vm, action = self._find(args[0]), args[1]
+        if action == 'take':
+            self._take_snapshot(vm, args[2])
+        elif action == 'restore':
+            self._restore_snapshot(vm, args[2])
+        elif action == 'restorecurrent':
+            self._restore_snapshot(vm, None)
+        elif action == 'delete':
+            self._delete_snapshot(vm, args[2])
+        elif action == 'edit':
+            self._snapshot_by_name(vm, args[2])['name'] = args[args.index('--name') + 1]
+        elif action == 'list' and '--machinereadable' in args:
+            out.extend(self._snapshot_machine_readable(vm))
+        elif action == 'list':
+            if not vm.snapshots:
+                out.append('This machine does not have any snapshots')
+            for snapshot in self._snapshot_order(vm):
+                marker = ' *' if snapshot['uuid'] == vm.current_snapshot else ''
+                out.append(f'   Name: {snapshot["name"]} (UUID: {snapshot["uuid"]}){marker}')
+        else:
+            raise _Failure(f'Invalid snapshot operation: {action}')
+
+    def _cmd_guestproperty(self, args: list[str], out: list[str]) -> Optional[CompletedProcess]:
+        action, vm = args[0], self._advance(self._find(args[1]))
+        if action == 'get':
+            value = vm.guest_properties.get(args[2])
+            out.append(f'Value: {value}' if value is not None else 'No value set!')
+        elif action == 'set':
+            self._set_property(vm, args[2], args[3] if len(args) > 3 else None)
+        elif action in ('delete', 'unset'):
+            self._set_property(vm, args[2], None)
+        elif action == 'enumerate':
+            out.extend(
+                f"Name: {name}, value: {value}, timestamp: 0, flags: " for name, value in vm.guest_properties.items()
+            )
+        elif action == 'wait':
+            timeout = int(args[args.index('--timeout') + 1]) / 1000 if '--timeout' in args else None
+            event = self._wait(vm, args[2], timeout)
+            if event is None:
+                return CompletedProcess(args, 2, 'Time out or interruption while waiting for a notification.\n', '')
+            out.append(f'Name: {event[0]}, value: {event[1] or ""}, flags: ')
+        else:
+            raise _Failure(f'Invalid guestproperty operation: {action}')
+
+    def _cmd_guestcontrol(self, args: list[str], out: list[str]) -> Optional[CompletedProcess]:
+        vm = self._advance(self._find(args[0]))
+        if vm.state != 'running':
+            raise _Failure(f'Machine "{vm.name}" is not running (currently {_LONG_STATES.get(vm.state, vm.state)})!')
+        if args[1] == 'run' and self.guest_exec:
+            operands = args[args.index('--') + 1:] if '--' in args else []
+            return self.guest_exec(vm, operands)
+
+    def _cmd_registervm(self, args: list[str], out: list[str]) -> None:
+        from ..VirtualMachine.info.vm_config import ConfigParser
+
+        try:
+            parser = ConfigParser(args[0])
+            name, vm_uuid = parser.get_name(), parser.get_uuid()
+        except (OSError, SyntaxError) as error:
+            raise _Failure(f'Could not load the settings file \'{args[0]}\': {error}')
+        if vm_uuid in self._vms:
+            raise _Failure(f'A machine with UUID {{{vm_uuid}}} is already registered')
+        self.add_vm(name, groups=parser.get_groups() or None, uuid=vm_uuid, config_file=args[0])
+
+    def _cmd_unregistervm(self, args: list[str], out: list[str]) -> None:
+        vm = self._find(args[0])
+        if vm.state == 'running':
+            raise _Failure(f'Cannot unregister the machine \'{vm.name}\' while it is locked')
+        del self._vms[vm.uuid]
+        if self._names.get(vm.name) == vm.uuid:
+            del self._names[vm.name]
+
+    def _cmd_movevm(self, args: list[str], out: list[str]) -> None:
+        vm = self._find(args[0])
+        folder = args[args.index('--folder') + 1] if '--folder' in args else self.machine_folder
+        vm.config_file = join(folder, vm.name, basename(vm.config_file))
+
+    # State changes, called with the lock held
+
+    def _find(self, vm_id: str) -> SimulatedVM:
+        vm_id = vm_id.strip('{}')
+        vm = self._vms.get(vm_id)
+        if vm is None:
+            vm = self._vms.get(self._names.get(vm_id))
+        if vm is None:
+            raise _Failure(f"Could not find a registered machine named '{vm_id}'")
+        return vm
+
+    def _advance(self, vm: SimulatedVM) -> SimulatedVM:
+        """
+        Apply the boot and shutdown events that are due.
+        """
+        now = time.monotonic()
+        if vm.boot_at is not None and now >= vm.boot_at:
+            vm.boot_at = None
+            for name, value in self.boot_properties.items():
+                self._set_property(vm, name, value)
+        if vm.shutdown_at is not None and now >= vm.shutdown_at:
+            vm.shutdown_at = None
+            self._power_off(vm)
+        return vm
+
+    def _start(self, vm: SimulatedVM) -> None:
+        self._advance(vm)
+        if vm.state == 'running':
+            raise _Failure(f"The machine '{vm.name}' is already locked by a session (or being locked or unlocked)")
+        vm.state = 'running'
+        vm.boot_at = time.monotonic() + self.boot_delay
+        self._advance(vm)
+        self._lock.notify_all()
+
+    def _control(self, vm: SimulatedVM, action: str, *args: str) -> None:
+        self._advance(vm)
+        if vm.state not in ('running', 'paused'):
+            raise _Failure(f"Machine '{vm.name}' is not currently running")
+        if action == 'poweroff':
+            self._power_off(vm)
+        elif action == 'acpipowerbutton':
+            self._set_property(vm, '/VirtualBox/GuestInfo/OS/LoggedInUsers', '0')
+            vm.shutdown_at = time.monotonic() + self.shutdown_delay
+            self._advance(vm)
+        elif action == 'savestate':
+            self._power_off(vm, state='saved')
+        elif action in ('pause', 'resume'):
+            vm.state = 'paused' if action == 'pause' else 'running'
+        elif action == 'reset':
+            vm.guest_properties.clear()
+            vm.boot_at = time.monotonic() + self.boot_delay
+            self._advance(vm)
+        else:
+            vm.settings[action] = ' '.join(args)
+
+    def _power_off(self, vm: SimulatedVM, state: str = 'poweroff') -> None:
+        vm.state, vm.boot_at, vm.shutdown_at = state, None, None
+        for name in list(vm.guest_properties):
+            self._set_property(vm, name, None)
+        self._lock.notify_all()
+
+    def _modify(self, vm: SimulatedVM, settings: dict[str, str]) -> None:
+        self._advance(vm)
+        if vm.state in ('running', 'paused'):
+            raise _Failure(f"The machine '{vm.name}' is already locked for a session (or being unlocked)")
+        for flag, value in settings.items():
+            if flag in ('cpus', 'memory'):
+                setattr(vm, flag, int(value))
+            elif flag == 'name':
+                if self._names.get(vm.name) == vm.uuid:
+                    del self._names[vm.name]
+                vm.name = value
+                self._names[value] = vm.uuid
+            elif flag == 'groups':
+                vm.groups = [group for group in value.split(',') if group] or ['/']
+            elif flag in ('ostype', 'os-type'):
+                vm.os_type = value
+            else:
+                vm.settings[flag] = value
+
+    def _set_property(self, vm: SimulatedVM, name: str, value: Optional[str]) -> None:
+        if value is None:
+            if vm.guest_properties.pop(name, None) is None:
+                return
+        elif vm.guest_properties.get(name) == value:
+            return
+        else:
+            vm.guest_properties[name] = value
+        self._sequence += 1
+        vm.events.append((self._sequence, name, value))
+        self._lock.notify_all()
+
+    def _wait(self, vm: SimulatedVM, pattern: str, timeout: Optional[float]) -> Optional[tuple[str, Optional[str]]]:
+        """
+        Block until a guest property matching the pattern changes after the call.
+        :return: Tuple of (name, value) or None on timeout.
+        """
+        start_sequence = self._sequence
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            self._advance(vm)
+            for sequence, name, value in vm.events:
+                if sequence > start_sequence and fnmatch.fnmatchcase(name, pattern):
+                    return name, value
+
+            now = time.monotonic()
+            wake_up = min(
+                (moment for moment in (deadline, vm.boot_at, vm.shutdown_at) if moment is not None),
+                default=None
+            )
+            if deadline is not None and now >= deadline:
+                return None
+            self._lock.wait(None if wake_up is None else max(0.0, wake_up - now))
+
+    def _take_snapshot(self, vm: SimulatedVM, name: str) -> None:
+        snapshot = {'name': name, 'uuid': str(uuid_lib.uuid4()), 'parent': vm.current_snapshot}
+        vm.snapshots.append(snapshot)
+        vm.current_snapshot = snapshot['uuid']
+
+    def _restore_snapshot(self, vm: SimulatedVM, name: Optional[str]) -> None:
+        self._advance(vm)
+        if vm.state in ('running', 'paused'):
+            raise _Failure('Cannot restore a snapshot of a running machine')
+        if name is not None:
+            vm.current_snapshot = self._snapshot_by_name(vm, name)['uuid']
+        elif vm.current_snapshot is None:
+            raise _Failure(f"Machine '{vm.name}' does not have any snapshots")
+        vm.state = 'saved' if vm.state == 'saved' else 'poweroff'
+
+    def _delete_snapshot(self, vm: SimulatedVM, name: str) -> None:
+        snapshot = self._snapshot_by_name(vm, name)
+        vm.snapshots.remove(snapshot)
+        for child in vm.snapshots:
+            if child['parent'] == snapshot['uuid']:
+                child['parent'] = snapshot['parent']
+        if vm.current_snapshot == snapshot['uuid']:
+            vm.current_snapshot = snapshot['parent']
+
+    @staticmethod
+    def _snapshot_by_name(vm: SimulatedVM, name: str) -> dict:
+        for snapshot in vm.snapshots:
+            if name in (snapshot['name'], snapshot['uuid']):
+                return snapshot
+        raise _Failure(f"Could not find a snapshot named '{name}'")
+
+    @staticmethod
+    def _snapshot_order(vm: SimulatedVM) -> list[dict]:
+        """
+        Get the snapshots depth-first, parents before children.
+        """
+        children = {}
+        for snapshot in vm.snapshots:
+            children.setdefault(snapshot['parent'], []).append(snapshot)
+        ordered, stack = [], list(reversed(children.get(None, [])))
+        while stack:
+            snapshot = stack.pop()
+            ordered.append(snapshot)
+            stack.extend(reversed(children.get(snapshot['uuid'], [])))
+        return ordered
+
+    def _snapshot_machine_readable(self, vm: SimulatedVM) -> list[str]:
+        children = {}
+        for snapshot in vm.snapshots:
+            children.setdefault(snapshot['parent'], []).append(snapshot)
+
+        lines, current_node = [], None
+        stack = [(snapshot, '' if index == 0 else f'-{index}') for index, snapshot in enumerate(children.get(None, []))]
+        stack.reverse()
+        while stack:
+            snapshot, node = stack.pop()
+            lines.append(f'SnapshotName{node}="{snapshot["name"]}"')
+            lines.append(f'SnapshotUUID{node}="{snapshot["uuid"]}"')
+            if snapshot['uuid'] == vm.current_snapshot:
+                current_node = node
+            stack.extend(reversed([
+                (child, f'{node}-{index}') for index, child in enumerate(children.get(snapshot['uuid'], []), start=1)
+            ]))
+
+        if current_node is not None:
+            current = self._snapshot_by_name(vm, vm.current_snapshot)
+            lines.append(f'CurrentSnapshotName="{current["name"]}"')
+            lines.append(f'CurrentSnapshotUUID="{current["uuid"]}"')
+            lines.append(f'CurrentSnapshotNode="SnapshotName{current_node}"')
+        return lines
+
+    @staticmethod
+    def _machine_readable(vm: SimulatedVM) -> dict[str, str]:
+        info = {
+            'name': vm.name,
+            'groups': ','.join(vm.groups),
+            'ostype': vm.os_type,
+            'UUID': vm.uuid,
+            'CfgFile': vm.config_file,
+            'CfgFolder': dirname(vm.config_file),
+            'memory': str(vm.memory),
+            'cpus': str(vm.cpus),
+            'VMState': vm.state,
+            'VMStateChangeTime': '2024-01-01T00:00:00.000000000',
+            'nic1': 'nat',
+            'nictype1': '82540EM',
+            'audio': 'pulse',
+            'audio_out': 'on',
+        }
+        if vm.current_snapshot:
+            current = next(snapshot for snapshot in vm.snapshots if snapshot['uuid'] == vm.current_snapshot)
+            info['CurrentSnapshotName'] = current['name']
+            info['CurrentSnapshotUUID'] = current['uuid']
+        for flag, value in vm.settings.items():
+            info[_SHOWVMINFO_KEYS.get(flag, flag)] = value
+        return info
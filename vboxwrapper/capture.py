@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import mmap
+from collections import deque
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO
+
+
+class CapturedOutput:
+    """
+    Bounded-memory capture of one output stream of a command.
+    Lines are collected into chunks of WRITE_CHUNK_SIZE bytes that are written to a SpooledTemporaryFile,
+    which stays in memory up to `memory_limit` bytes and spills to a temporary file on disk above it,
+    so peak memory does not depend on the output size.
+    The first and last `summary_lines` lines are kept in memory for a quick look at the output.
+    """
+    WRITE_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, memory_limit: int = 8 * 1024 * 1024, summary_lines: int = 20, encoding: str = 'utf-8'):
+        """
+        :param memory_limit: Maximum number of output bytes kept in memory before spilling to disk.
+        :param summary_lines: Number of lines kept for the head and for the tail summary.
+        :param encoding: Encoding used to store and read back the output.
+        """
+        self.memory_limit = memory_limit
+        self.encoding = encoding
+        self.head: list[str] = []
+        self.tail: deque[str] = deque(maxlen=summary_lines)
+        self.lines = 0
+        self.size = 0
+        self._summary_lines = summary_lines
+        self._file = SpooledTemporaryFile(max_size=memory_limit, mode='w+b')
+        self._pending = bytearray()
+        self._spilled = False
+
+    def __enter__(self) -> 'CapturedOutput':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __str__(self) -> str:
+        return self.summary()
+
+    @property
+    def spilled(self) -> bool:
+        """
+        Whether the output exceeded the memory limit and was moved to a temporary file.
+        """
+        return self._spilled
+
+    def append(self, line: str) -> None:
+        """
+        Add a line of output without the trailing newline.
+        :param line: Output line.
+        """
+        data = f"{line}\n".encode(self.encoding, errors='replace')
+        self._pending += data
+        if len(self._pending) >= self.WRITE_CHUNK_SIZE:
+            self._write_pending()
+        self.size += len(data)
+        self.lines += 1
+        self._spilled = self._spilled or self.size > self.memory_limit
+
+        if len(self.head) < self._summary_lines:
+            self.head.append(line)
+        else:
+            self.tail.append(line)
+
+    def file(self) -> BinaryIO:
+        """
+        Get the captured output as a binary file object positioned at the start.
+        :return: File object. It is closed together with the CapturedOutput.
+        """
+        self._write_pending()
+        self._file.flush()
+        self._file.seek(0)
+        return self._file
+
+    def mmap(self) -> mmap.mmap:
+        """
+        Map the captured output into memory read-only. Output kept in memory is spilled to disk first.
+        :return: mmap object. Raises ValueError if nothing was captured.
+        """
+        if not self.size:
+            raise ValueError("Cannot mmap an empty output")
+        self._write_pending()
+        self._file.rollover()
+        self._spilled = True
+        self._file.flush()
+        return mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self) -> str:
+        """
+        Read the whole captured output. This loads it into memory, prefer `file()` or `mmap()` for large outputs.
+        :return: Output text.
+        """
+        return self.file().read().decode(self.encoding, errors='replace')
+
+    def summary(self) -> str:
+        """
+        Get the first and last lines of the output with the number of omitted lines between them.
+        :return: Summary text.
+        """
+        omitted = self.lines - len(self.head) - len(self.tail)
+        separator = [f"... {omitted} lines omitted ..."] if omitted else []
+        return "\n".join([*self.head, *separator, *self.tail])
+
+    def close(self) -> None:
+        self._pending.clear()
+        self._file.close()
+
+    def _write_pending(self) -> None:
+        if self._pending:
+            self._file.seek(0, 2)
+            self._file.write(self._pending)
+            self._pending.clear()
@@ -1,10 +1,30 @@
 # -*- coding: utf-8 -*-
-from contextlib import nullcontext
+import codecs
+import re
+import shlex
+import sys
+import time
+from collections import deque
+from contextlib import nullcontext, asynccontextmanager
 from dataclasses import dataclass
-from subprocess import getoutput, call, CompletedProcess, Popen, PIPE
+from os.path import basename
+from queue import Queue, Full
+from subprocess import getstatusoutput, call, CompletedProcess, Popen, PIPE, STDOUT, TimeoutExpired
 from functools import wraps
-from rich import print
-from rich.console import Console
+from threading import Event, Thread, Timer
+from typing import Callable, Iterator, Optional
+from weakref import WeakKeyDictionary, WeakValueDictionary
+
+from .instrumentation import CommandMetrics, CommandRecord, CommandTrace, add_hook, emit, metrics, remove_hook
+from .console import console, print
+
+MUTATING_SUBCOMMANDS = ('modifyvm', 'controlvm', 'startvm', 'snapshot', 'movevm', 'registervm', 'unregistervm')
+
+_mutation_listeners: list[Callable[[str, Optional[str]], None]] = []
+
+# Active backend set with Commands.set_backend. None is the default CLI backend, which spawns vboxmanage.
+_backend = None
+
 
 def singleton(class_):
     __instances = {}
@@ -18,6 +38,371 @@ def singleton(class_):
     return getinstance
 
 
+def parse_command(command: str) -> tuple[Optional[str], Optional[str]]:
+    """
+    Extract the vboxmanage subcommand and the target virtual machine from a command line.
+    :param command: The vboxmanage command line.
+    :return: Tuple of (subcommand, vm_id). Both are None if the command is not a vboxmanage call.
+    """
+    try:
+        tokens = shlex.split(command)
+    except ValueError:
+        tokens = command.split()
+
+    if len(tokens) < 2 or not basename(tokens[0]).lower().startswith('vboxmanage'):
+        return None, None
+
+    subcommand = tokens[1].lower()
+    vm_index = 3 if subcommand == 'guestproperty' else 2
+    if subcommand in ('list', 'registervm') or len(tokens) <= vm_index:
+        return subcommand, None
+    return subcommand, tokens[vm_index]
+
+
+def notify_mutation(command: str) -> None:
+    """
+    Notify mutation listeners if the command changes the state of a virtual machine.
+    :param command: The executed vboxmanage command line.
+    """
+    _notify_mutation(*parse_command(command))
+
+
+def _notify_mutation(subcommand: Optional[str], vm_id: Optional[str]) -> None:
+    if subcommand in MUTATING_SUBCOMMANDS:
+        for callback in list(_mutation_listeners):
+            callback(subcommand, vm_id)
+
+
+def _finish_command(command: str, start_time: float, returncode: Optional[int], output_size: int) -> None:
+    """
+    Emit the instrumentation record of a finished command and notify mutation listeners.
+    :param command: The executed command line.
+    :param start_time: time.perf_counter() value taken before the command was spawned.
+    :param returncode: Return code of the command.
+    :param output_size: Number of captured output characters.
+    """
+    subcommand, vm_id = parse_command(command)
+    emit(CommandRecord(command, subcommand, vm_id, time.perf_counter() - start_time, returncode, output_size))
+    _notify_mutation(subcommand, vm_id)
+
+
+class CommandStream:
+    """
+    Iterator over the output lines of a running shell command.
+    stdout and stderr are drained by two reader threads in chunks of up to CHUNK_SIZE bytes, so a command that
+    writes a lot to one stream never stalls on a full pipe of the other, and lines are yielded as soon as they arrive.
+    The chunks go through a queue of at most QUEUE_SIZE entries, so a slow consumer holds back the readers
+    instead of buffering the whole output in memory.
+    Iteration yields tuples of (stream, line), where stream is 'stdout' or 'stderr' and the line has no trailing newline.
+    `returncode` is set when the iteration is finished. Leaving the `with` block early terminates the command.
+    If the timeout expires, the command is terminated and the iteration raises subprocess.TimeoutExpired
+    after the remaining output has been yielded.
+    """
+    STDOUT = 'stdout'
+    STDERR = 'stderr'
+    TERMINATE_TIMEOUT = 5.0
+    CHUNK_SIZE = 64 * 1024
+    QUEUE_SIZE = 64
+
+    def __init__(self, command: str, encoding: str = 'utf-8', errors: str = 'replace', timeout: float = None):
+        self.command = command
+        self.timeout = timeout
+        self.timed_out = False
+        self.returncode: Optional[int] = None
+        self.output_size = 0
+        self._finished = False
+        self._drained = False
+        self._start_time = time.perf_counter()
+        self._closed = Event()
+        self._queue = Queue(maxsize=self.QUEUE_SIZE)
+        self._process = Popen(command, stdout=PIPE, stderr=PIPE, shell=True)
+        self._readers = [
+            Thread(target=self._pump, args=(self.STDOUT, self._process.stdout, encoding, errors), daemon=True),
+            Thread(target=self._pump, args=(self.STDERR, self._process.stderr, encoding, errors), daemon=True),
+        ]
+        for reader in self._readers:
+            reader.start()
+        self._timer = Timer(timeout, self._expire) if timeout is not None else None
+        if self._timer:
+            self._timer.daemon = True
+            self._timer.start()
+        self._lines = self._read()
+
+    @property
+    def args(self) -> str:
+        return self._process.args
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        return self._lines
+
+    def __enter__(self) -> 'CommandStream':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stop the iteration. A command that is still running gets SIGTERM, so vboxmanage can stop the guest process,
+        and is killed if it does not exit within TERMINATE_TIMEOUT seconds.
+        """
+        self._lines.close()
+        self._finish()
+
+    def _pump(self, name: str, pipe, encoding: str, errors: str) -> None:
+        decoder = codecs.getincrementaldecoder(encoding)(errors)
+        try:
+            while not self._closed.is_set():
+                chunk = pipe.read1(self.CHUNK_SIZE)
+                text = decoder.decode(chunk, final=not chunk)
+                if text and not self._put((name, text)) or not chunk:
+                    break
+        finally:
+            self._put((name, None))
+
+    def _put(self, item: tuple) -> bool:
+        """
+        Put an item into the queue, waiting while it is full until the stream is closed.
+        :return: False if the stream was closed and the item was dropped.
+        """
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _read(self) -> Iterator[tuple[str, str]]:
+        open_streams = len(self._readers)
+        partial = {self.STDOUT: '', self.STDERR: ''}
+        try:
+            while open_streams:
+                name, text = self._queue.get()
+                if name is None:
+                    break
+                if text is None:
+                    open_streams -= 1
+                    continue
+                self.output_size += len(text)
+                *lines, partial[name] = (partial[name] + text).split('\n')
+                for line in lines:
+                    yield name, line.rstrip('\r')
+            self._drained = not open_streams
+            for name, line in partial.items():
+                if line:
+                    yield name, line.rstrip('\r')
+        finally:
+            self._finish()
+
+        if self.timed_out:
+            raise TimeoutExpired(self.command, self.timeout)
+
+    def _expire(self) -> None:
+        self.timed_out = True
+        self._stop_process()
+        # A grandchild may keep the pipes open after the command was stopped, so the iteration is ended
+        # explicitly once the readers had a moment to deliver the remaining output.
+        deadline = time.monotonic() + 1.0
+        for reader in self._readers:
+            reader.join(max(0.0, deadline - time.monotonic()))
+        self._put((None, None))
+
+    def _stop_process(self) -> None:
+        if self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(self.TERMINATE_TIMEOUT)
+            except TimeoutExpired:
+                self._process.kill()
+
+    def _finish(self) -> None:
+        if self._finished:
+            return
+        self._finished = True
+
+        # After both pipes reached EOF the command is only waited for, so its own exit status is kept.
+        # The timer keeps running meanwhile and still stops a command that closed its pipes but hangs.
+        if not self._drained:
+            self._stop_process()
+        self.returncode = self._process.wait()
+        if self._timer:
+            self._timer.cancel()
+        # Readers waiting on a full queue give up their output once the stream is closed.
+        self._closed.set()
+        if not any(reader.is_alive() for reader in self._readers):
+            self._process.stdout.close()
+            self._process.stderr.close()
+        _finish_command(self.command, self._start_time, self.returncode, self.output_size)
+
+
+class ReplayStream:
+    """
+    CommandStream counterpart for backends that answer command lines in-process:
+    the command has already finished and its output is replayed, stdout first.
+    """
+    STDOUT = CommandStream.STDOUT
+    STDERR = CommandStream.STDERR
+
+    def __init__(self, command: str, result: CompletedProcess, start_time: float):
+        self.command = command
+        self.timeout = None
+        self.timed_out = False
+        self.returncode: Optional[int] = None
+        self.output_size = len(result.stdout) + len(result.stderr)
+        self._result = result
+        self._start_time = start_time
+        self._finished = False
+        self._lines = self._read()
+
+    @property
+    def args(self) -> str:
+        return self.command
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        return self._lines
+
+    def __enter__(self) -> 'ReplayStream':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._lines.close()
+        self._finish()
+
+    def _read(self) -> Iterator[tuple[str, str]]:
+        try:
+            for stream, output in ((self.STDOUT, self._result.stdout), (self.STDERR, self._result.stderr)):
+                for line in output.splitlines():
+                    yield stream, line
+        finally:
+            self._finish()
+
+    def _finish(self) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        self.returncode = self._result.returncode
+        _finish_command(self.command, self._start_time, self.returncode, self.output_size)
+
+
+def _in_process_backend():
+    return _backend if _backend is not None and _backend.in_process else None
+
+
+def _open_stream(command: str, encoding: str, errors: str, timeout: Optional[float]) -> CommandStream | ReplayStream:
+    backend = _in_process_backend()
+    if backend is not None:
+        start_time = time.perf_counter()
+        return ReplayStream(command, backend.execute(command), start_time)
+    return CommandStream(command, encoding=encoding, errors=errors, timeout=timeout)
+
+
+class AsyncLimits:
+    """
+    Global and per-VM concurrency limits for asynchronous vboxmanage calls.
+    Semaphores are created lazily for every running event loop. Per-VM semaphores are keyed by the UUID,
+    so commands addressing a virtual machine by name and by UUID share a slot, and are dropped once
+    no command holds or waits for them.
+    """
+
+    def __init__(self, global_limit: int = 16, per_vm_limit: int = 1):
+        self.global_limit = global_limit
+        self.per_vm_limit = per_vm_limit
+        self._semaphores = WeakKeyDictionary()
+
+    def configure(self, global_limit: int = None, per_vm_limit: int = None) -> None:
+        self.global_limit = global_limit or self.global_limit
+        self.per_vm_limit = per_vm_limit or self.per_vm_limit
+        self._semaphores.clear()
+
+    @asynccontextmanager
+    async def acquire(self, vm_id: Optional[str]):
+        """
+        Acquire the per-VM slot for commands targeting a virtual machine, then the global slot.
+        Commands queued behind a busy virtual machine do not hold global slots while they wait.
+        :param vm_id: Virtual machine name or UUID the command is run against.
+        """
+        import asyncio  # deferred: asyncio is only needed by the async API
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = (asyncio.Semaphore(self.global_limit), WeakValueDictionary())
+        global_semaphore, vm_semaphores = self._semaphores[loop]
+
+        vm_semaphore = None
+        if vm_id is not None:
+            key = self._vm_key(vm_id)
+            vm_semaphore = vm_semaphores.get(key)
+            if vm_semaphore is None:
+                vm_semaphore = vm_semaphores[key] = asyncio.Semaphore(self.per_vm_limit)
+
+        async with vm_semaphore if vm_semaphore else nullcontext(), global_semaphore:
+            yield
+
+    @staticmethod
+    def _vm_key(vm_id: str) -> str:
+        """
+        Resolve a name to the UUID from the identity cache without spawning vboxmanage.
+        Names that are not cached yet are used as they are.
+        """
+        from .identity import IdentityCache  # deferred: identity imports this module
+        return IdentityCache().get_uuid(vm_id, refresh=False) or vm_id.strip('{}').lower()
+
+
+async_limits = AsyncLimits()
+
+
+async def _exec_async(command: str, stdout: int, stderr: int, timeout: float = None) -> tuple:
+    """
+    Execute a command with asyncio.create_subprocess_exec within the concurrency limits.
+    The process is killed if the timeout expires or the awaiting task is cancelled.
+    :param command: The command line to execute.
+    :param stdout: stdout redirection for the subprocess.
+    :param stderr: stderr redirection for the subprocess.
+    :param timeout: Timeout in seconds. None waits indefinitely.
+    :return: Tuple of (returncode, stdout bytes, stderr bytes).
+    """
+    import asyncio
+    _, vm_id = parse_command(command)
+    async with async_limits.acquire(vm_id):
+        start_time = time.perf_counter()
+        backend = _in_process_backend()
+        if backend is not None:
+            result = await asyncio.to_thread(backend.execute, command)
+            _finish_command(command, start_time, result.returncode, len(result.stdout) + len(result.stderr))
+            return _redirect_result(result, stdout, stderr)
+
+        process = await asyncio.create_subprocess_exec(*shlex.split(command), stdout=stdout, stderr=stderr)
+        out, err = b'', b''
+        try:
+            out, err = await asyncio.wait_for(process.communicate(), timeout)
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await asyncio.shield(process.wait())
+            raise
+        finally:
+            _finish_command(command, start_time, process.returncode, len(out or b'') + len(err or b''))
+    return process.returncode, out, err
+
+
+def _redirect_result(result: CompletedProcess, stdout: Optional[int], stderr: Optional[int]) -> tuple:
+    """
+    Apply subprocess-style redirection to the result of an in-process backend.
+    :return: Tuple of (returncode, stdout bytes, stderr bytes) like _exec_async.
+    """
+    out, err = result.stdout, result.stderr
+    if stderr == STDOUT:
+        out, err = out + err, ''
+    if stdout is None:
+        sys.stdout.write(out)
+    if stderr is None:
+        sys.stderr.write(err)
+    return result.returncode, out.encode() if stdout is not None else b'', err.encode() if stderr == PIPE else b''
+
+
 @singleton
 @dataclass(frozen=True)
 class Commands:
@@ -37,13 +422,179 @@ class Commands:
     registervm: str = f"{vboxmanage} registervm"
     movevm: str = f"{vboxmanage} movevm"
 
+    @staticmethod
+    def quote(value: str) -> str:
+        """
+        Quote a command line argument for the shell the commands run in: single quotes for POSIX shells,
+        double quotes with backslash-escaped quotes for cmd.exe, which passes them on to vboxmanage unchanged.
+        cmd.exe still expands %VAR% inside double quotes, so such values cannot be passed verbatim on Windows.
+        :param value: Argument value.
+        :return: Quoted argument.
+        """
+        if sys.platform != 'win32':
+            return shlex.quote(value)
+        escaped = re.sub(r'(\\*)"', r'\1\1\\"', value)
+        escaped = re.sub(r'(\\+)$', r'\1\1', escaped)
+        return f'"{escaped}"'
+
+    @staticmethod
+    def add_mutation_listener(callback: Callable[[str, Optional[str]], None]) -> None:
+        """
+        Register a callback that is invoked after every mutating vboxmanage command.
+        :param callback: Callable receiving the subcommand and the target virtual machine ID.
+        """
+        if callback not in _mutation_listeners:
+            _mutation_listeners.append(callback)
+
+    @staticmethod
+    def remove_mutation_listener(callback: Callable[[str, Optional[str]], None]) -> None:
+        if callback in _mutation_listeners:
+            _mutation_listeners.remove(callback)
+
+    @staticmethod
+    def add_hook(callback: Callable[[CommandRecord], None]) -> None:
+        """
+        Register an instrumentation callback that receives a CommandRecord for every spawned command.
+        :param callback: Callable receiving a CommandRecord.
+        """
+        add_hook(callback)
+
+    @staticmethod
+    def remove_hook(callback: Callable[[CommandRecord], None]) -> None:
+        remove_hook(callback)
+
+    @staticmethod
+    def metrics() -> CommandMetrics:
+        """
+        Get the process-wide registry of per-subcommand latency histograms and exit codes.
+        :return: CommandMetrics registry.
+        """
+        return metrics
+
+    @staticmethod
+    def trace() -> CommandTrace:
+        """
+        Capture the records of the commands spawned within a `with` block in the current context, see CommandTrace.
+        Usage: `with Commands().trace() as trace: vm.run()`, then `trace.by_subcommand()`.
+        :return: CommandTrace context manager.
+        """
+        return CommandTrace()
+
+    @staticmethod
+    def set_backend(backend) -> None:
+        """
+        Set the process-wide backend that executes the commands, see vboxwrapper.backends.
+        :param backend: Backend instance, e.g. MemoryBackend(). None restores the default CLI backend.
+        """
+        global _backend
+        _backend = backend
+
+    @staticmethod
+    def get_backend():
+        """
+        Get the active backend.
+        :return: Backend instance, a CliBackend unless another backend was set.
+        """
+        if _backend is None:
+            from .backends import CliBackend
+            return CliBackend()
+        return _backend
+
     @staticmethod
     def get_output(command: str) -> str:
-        return getoutput(command)
+        start_time = time.perf_counter()
+        backend = _in_process_backend()
+        if backend is not None:
+            result = backend.execute(command)
+            returncode, output = result.returncode, (result.stdout + result.stderr).removesuffix('\n')
+        else:
+            returncode, output = getstatusoutput(command)
+        _finish_command(command, start_time, returncode, len(output))
+        return output
 
     @staticmethod
     def call(command: str) -> int:
-        return call(command, shell=True)
+        start_time = time.perf_counter()
+        backend = _in_process_backend()
+        if backend is not None:
+            result = backend.execute(command)
+            sys.stdout.write(result.stdout)
+            sys.stderr.write(result.stderr)
+            returncode = result.returncode
+        else:
+            returncode = call(command, shell=True)
+        _finish_command(command, start_time, returncode, 0)
+        return returncode
+
+    @staticmethod
+    def stream(command: str, encoding: str = 'utf-8', errors: str = 'replace', timeout: float = None) -> CommandStream:
+        """
+        Execute a shell command and iterate over its stdout and stderr lines as they arrive.
+        Usage: `with Commands().stream(command) as output: for stream, line in output: ...`, then `output.returncode`.
+        :param command: The command to execute in the shell.
+        :param encoding: Encoding for the subprocess output. Defaults to 'utf-8'.
+        :param errors: Error handling for encoding issues. Defaults to 'replace'.
+        :param timeout: Timeout in seconds. When it expires, the command is terminated and the iteration
+        raises subprocess.TimeoutExpired. Defaults to None (no timeout).
+        :return: CommandStream yielding tuples of ('stdout' or 'stderr', line).
+        """
+        return _open_stream(command, encoding, errors, timeout)
+
+    @staticmethod
+    def set_async_limits(global_limit: int = None, per_vm_limit: int = None) -> None:
+        """
+        Configure concurrency limits for the asynchronous command methods.
+        :param global_limit: Maximum number of vboxmanage processes running at once.
+        :param per_vm_limit: Maximum number of vboxmanage processes running at once against one virtual machine.
+        """
+        async_limits.configure(global_limit=global_limit, per_vm_limit=per_vm_limit)
+
+    @staticmethod
+    async def get_output_async(command: str, timeout: float = None, encoding: str = 'utf-8') -> str:
+        """
+        Asynchronous counterpart of `get_output`. stderr is merged into the output.
+        :param command: The command to execute.
+        :param timeout: Timeout in seconds. Raises TimeoutError when exceeded.
+        :param encoding: Encoding for the subprocess output.
+        :return: Output of the command without the trailing newline.
+        """
+        _, out, _ = await _exec_async(command, stdout=PIPE, stderr=STDOUT, timeout=timeout)
+        output = out.decode(encoding, errors='replace')
+        return output[:-1] if output.endswith('\n') else output
+
+    @staticmethod
+    async def call_async(command: str, timeout: float = None) -> int:
+        """
+        Asynchronous counterpart of `call`. The output is not captured.
+        :param command: The command to execute.
+        :param timeout: Timeout in seconds. Raises TimeoutError when exceeded.
+        :return: Return code of the command.
+        """
+        returncode, _, _ = await _exec_async(command, stdout=None, stderr=None, timeout=timeout)
+        return returncode
+
+    @staticmethod
+    async def run_async(
+            command: str,
+            timeout: float = None,
+            encoding: str = 'utf-8',
+            errors: str = 'replace'
+    ) -> CompletedProcess:
+        """
+        Asynchronous counterpart of `run` that captures stdout and stderr without printing.
+        :param command: The command to execute.
+        :param timeout: Timeout in seconds. Raises TimeoutError when exceeded.
+        :param encoding: Encoding for the subprocess output. Defaults to 'utf-8'.
+        :param errors: Error handling for encoding issues. Defaults to 'replace'.
+        :return: A `CompletedProcess` object containing the command, return code, stdout, and stderr.
+        """
+        returncode, out, err = await _exec_async(command, stdout=PIPE, stderr=PIPE, timeout=timeout)
+        return CompletedProcess(
+            command,
+            returncode=returncode,
+            stdout=out.decode(encoding, errors=errors).strip(),
+            stderr=err.decode(encoding, errors=errors).strip()
+        )
 
     @staticmethod
     def run(
@@ -55,7 +606,9 @@ class Commands:
             stdout_color: str = None,
             stderr_color: str = 'red',
             encoding: str = 'utf-8',
-            errors: str = 'replace'
+            errors: str = 'replace',
+            capture_limit: int = None,
+            timeout: float = None
     ) -> CompletedProcess:
         """
         Executes a shell command and returns a `CompletedProcess` object containing the results.
@@ -69,47 +622,50 @@ class Commands:
         :param stderr_color: Color for the standard error text when printed (Rich markup). Defaults to 'red'.
         :param encoding: Encoding for the subprocess output. Defaults to 'utf-8'.
         :param errors: Error handling for encoding issues. Defaults to 'replace'.
+        :param capture_limit: If set, stdout and stderr are captured into `CapturedOutput` objects that keep at most
+        this many bytes each in memory and spill the rest to a temporary file. Defaults to None (capture to strings).
+        :param timeout: Timeout in seconds. When it expires, the command is terminated and
+        subprocess.TimeoutExpired is raised. Defaults to None (no timeout).
         :return: A `CompletedProcess` object containing the command, return code, stdout, and stderr.
+        With `capture_limit`, stdout and stderr are `CapturedOutput` objects that the caller should close.
         """
 
-        def tail_lines(lines: list):
-            """Keeps only the last `max_lines` from the given list of lines."""
-            return lines[-max_stdout_lines:]
-
-        with Popen(
-                command,
-                stdout=PIPE,
-                stderr=PIPE,
-                text=True,
-                shell=True,
-                encoding=encoding,
-                errors=errors
-        ) as process:
+        stdout_color = f"[{stdout_color}]" if stdout_color else ''
+        stderr_color = f"[{stderr_color}]" if stderr_color else ''
+        if capture_limit:
+            from .capture import CapturedOutput
+            _stdout = CapturedOutput(capture_limit, summary_lines=max_stdout_lines, encoding=encoding)
+            _stderr = CapturedOutput(capture_limit, summary_lines=max_stdout_lines, encoding=encoding)
+            keep = str.rstrip
+        else:
             _stdout = []
             _stderr = []
+            keep = str.strip
+        recent_lines = deque(maxlen=max_stdout_lines)
 
-            stdout_color = f"[{stdout_color}]" if stdout_color else ''
-            stderr_color = f"[{stderr_color}]" if stderr_color else ''
+        with _open_stream(command, encoding, errors, timeout) as output:
+            with console.status(f'{stdout_color}Exec command:{command}') if status_bar else nullcontext() as status:
+                for stream, line in output:
+                    if stream == CommandStream.STDERR:
+                        _stderr.append(keep(line))
+                        if stderr:
+                            print(f"{stderr_color}{line}")
+                        continue
 
-            with Console().status(f'{stdout_color}Exec command:{command}') if status_bar else nullcontext() as status:
-                for line in process.stdout:
-                    _stdout.append(line.strip())
+                    _stdout.append(keep(line))
                     if stdout:
                         if status_bar:
-                            recent_lines = "\n".join(tail_lines(_stdout))
-                            status.update(f'{stdout_color}{recent_lines}')
+                            recent_lines.append(line.strip())
+                            status.update(f'{stdout_color}' + "\n".join(recent_lines))
                         else:
-                            print(f"{stdout_color}{line}", end="")
-
-                for line in process.stderr:
-                    _stderr.append(line.strip())
-                    if stderr:
-                        print(f"{stderr_color}{line}", end="")
-
-            process.wait()
-            return CompletedProcess(
-                process.args,
-                returncode=process.returncode,
-                stdout="\n".join(_stdout).strip(),
-                stderr="\n".join(_stderr).strip()
-            )
+                            print(f"{stdout_color}{line}")
+
+        if capture_limit:
+            return CompletedProcess(output.args, returncode=output.returncode, stdout=_stdout, stderr=_stderr)
+
+        return CompletedProcess(
+            output.args,
+            returncode=output.returncode,
+            stdout="\n".join(_stdout).strip(),
+            stderr="\n".join(_stderr).strip()
+        )
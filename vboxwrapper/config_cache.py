@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+from pathlib import Path
+from threading import local
+from typing import Any
+
+from .commands import singleton
+
+
+def default_cache_dir() -> Path:
+    """
+    Get the per-user cache directory of the platform.
+    :return: Path to the directory, e.g. ~/.cache on Linux.
+    """
+    home = Path.home()
+    if sys.platform == 'darwin':
+        return home / 'Library' / 'Caches'
+    if sys.platform == 'win32':
+        return Path(os.environ.get('LOCALAPPDATA') or home / 'AppData' / 'Local')
+    return Path(os.environ.get('XDG_CACHE_HOME') or home / '.cache')
+
+
+@singleton
+class ConfigCache:
+    """
+    Process-wide cache of values parsed from .vbox files, kept in an SQLite database.
+    Values are stored per file and section (e.g. 'cpus', 'snapshot_tree') together with the size and
+    modification time of the file, and are only returned while both match, so a changed file is parsed again.
+    The cache is disabled until `persist` is called. The database runs in WAL mode, so any number of
+    processes can read it while one writes.
+    """
+    SCHEMA_VERSION = 2
+    BUSY_TIMEOUT = 5.0
+
+    def __init__(self):
+        self.path = None
+        self._local = local()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def persist(self, path: Path | str = None) -> None:
+        """
+        Enable the cache.
+        :param path: Path to the SQLite database (default: vboxwrapper/config-cache.sqlite3 in the user cache dir).
+        """
+        self.path = Path(path).expanduser() if path else default_cache_dir() / 'vboxwrapper' / 'config-cache.sqlite3'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = local()
+        self._connection()
+
+    def disable(self) -> None:
+        """
+        Stop using the cache. The database file is kept.
+        """
+        self.path = None
+        self._local = local()
+
+    def get(self, path: Path | str, section: str, key: tuple[int, int]) -> Any:
+        """
+        Get a cached value.
+        :param path: Path to the parsed file.
+        :param section: Name of the value, e.g. 'cpus'.
+        :param key: Tuple of (mtime_ns, size) of the file.
+        :return: Cached value.
+        :raises KeyError: If the value is not cached for this version of the file or the cache is disabled.
+        """
+        import sqlite3
+
+        connection = self._connection()
+        if connection is None:
+            raise KeyError(section)
+        try:
+            row = connection.execute(
+                'SELECT value FROM entries WHERE path = ? AND section = ? AND mtime_ns = ? AND size = ?',
+                (str(path), section, *key)
+            ).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            raise KeyError(section)
+        return json.loads(row[0])
+
+    def put(self, path: Path | str, section: str, key: tuple[int, int], value: Any) -> None:
+        """
+        Store a value, replacing the one cached for an older version of the file.
+        :param path: Path to the parsed file.
+        :param section: Name of the value.
+        :param key: Tuple of (mtime_ns, size) of the file.
+        :param value: JSON serializable value.
+        """
+        import sqlite3
+
+        connection = self._connection()
+        if connection is None:
+            return
+        try:
+            connection.execute(
+                'INSERT OR REPLACE INTO entries (path, section, mtime_ns, size, value) VALUES (?, ?, ?, ?, ?)',
+                (str(path), section, *key, json.dumps(value))
+            )
+        except sqlite3.Error:
+            pass
+
+    def clear(self, path: Path | str = None) -> None:
+        """
+        Drop cached values.
+        :param path: Path to the file whose values are dropped. None drops all values.
+        """
+        import sqlite3
+
+        connection = self._connection()
+        if connection is None:
+            return
+        try:
+            if path is None:
+                connection.execute('DELETE FROM entries')
+            else:
+                connection.execute('DELETE FROM entries WHERE path = ?', (str(path),))
+        except sqlite3.Error:
+            pass
+
+    def _connection(self):
+        """
+        Get the connection of the current thread, SQLite connections cannot be shared between threads.
+        :return: Connection or None if the cache is disabled or the database cannot be opened.
+        """
+        if self.path is None:
+            return None
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        import sqlite3
+
+        try:
+            connection = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                if connection.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+                    connection.execute('DROP TABLE IF EXISTS entries')
+                    connection.execute(
+                        'CREATE TABLE entries ('
+                        'path TEXT NOT NULL, section TEXT NOT NULL, mtime_ns INTEGER NOT NULL, '
+                        'size INTEGER NOT NULL, value TEXT NOT NULL, PRIMARY KEY (path, section))'
+                    )
+                    connection.execute(f'PRAGMA user_version={self.SCHEMA_VERSION}')
+        except sqlite3.Error:
+            return None
+        self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
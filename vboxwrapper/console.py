@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from threading import Lock
+
+
+class LazyConsole:
+    """
+    Proxy for rich.console.Console that imports rich and creates the console on first use.
+    Importing rich costs tens of milliseconds, which should not be paid by `import vboxwrapper`.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._console = None
+        self._lock = Lock()
+
+    def get(self):
+        """
+        Get the underlying rich Console, creating it if needed.
+        :return: rich.console.Console object.
+        """
+        if self._console is None:
+            with self._lock:
+                if self._console is None:
+                    from rich.console import Console
+                    self._console = Console(**self._kwargs)
+        return self._console
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+
+console = LazyConsole()
+
+
+def print(*objects, **kwargs) -> None:
+    """
+    Print rich markup to the shared console.
+    """
+    console.print(*objects, **kwargs)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+from subprocess import CompletedProcess
+from typing import Any, Callable
+
+from .commands import CommandStream
+from .console import print
+from .VirtualMachine import VirtualMachine, FileUtils
+from .VBox import Vbox
+from .vm_group import VMResult, parallel_map, result_keys
+
+
+class GuestFleet:
+    """
+    Class for running guest operations (commands, file copies, syncs) on many virtual machines in parallel.
+    Every virtual machine has its own FileUtils with its own credentials.
+    """
+
+    def __init__(
+            self,
+            targets: str | list[str | VirtualMachine | FileUtils],
+            username: str = None,
+            password: str = None,
+            os_type: str = None,
+            credentials: dict[str, tuple[str, str]] = None,
+            max_workers: int = 8,
+            vbox: Vbox = None
+    ):
+        """
+        :param targets: VirtualBox group name, or list of virtual machine names, UUIDs,
+        VirtualMachine objects or ready FileUtils objects.
+        :param username: Default guest username for targets without their own credentials.
+        :param password: Default guest password for targets without their own credentials.
+        :param os_type: Guest OS type passed to the created FileUtils objects (default: detected per VM).
+        :param credentials: Dictionary of virtual machine names and (username, password) tuples.
+        :param max_workers: Maximum number of virtual machines processed at once.
+        :param vbox: Vbox instance used to resolve the group name.
+        """
+        if isinstance(targets, str):
+            targets = (vbox or Vbox()).get_vm_uuids(targets)
+
+        credentials = credentials or {}
+        self.guests: list[FileUtils] = []
+        for target in targets:
+            if isinstance(target, FileUtils):
+                self.guests.append(target)
+                continue
+            vm = target if isinstance(target, VirtualMachine) else VirtualMachine(target)
+            _username, _password = credentials.get(vm.info.name, (username, password))
+            self.guests.append(FileUtils(vm, username=_username, password=_password, os_type=os_type))
+        self.max_workers = max_workers
+        result_key = result_keys([guest.vm for guest in self.guests])
+        self._result_key = lambda guest: result_key(guest.vm)
+
+    def __iter__(self):
+        return iter(self.guests)
+
+    def __len__(self) -> int:
+        return len(self.guests)
+
+    def map(self, func: Callable[[FileUtils], Any]) -> dict[str, VMResult]:
+        """
+        Apply the function to the FileUtils of every virtual machine on a bounded worker pool.
+        :param func: Callable receiving a FileUtils object.
+        :return: Dictionary of virtual machine names and their results, in fleet order.
+        Virtual machines sharing a name are keyed by UUID.
+        """
+        return parallel_map(self.guests, func, self._result_key, self.max_workers)
+
+    def run_cmd(
+            self,
+            command: str,
+            shell: str = None,
+            timeout: float = None,
+            stream: bool = True
+    ) -> dict[str, VMResult]:
+        """
+        Run a command on every virtual machine.
+        :param command: The command to run.
+        :param shell: Optional shell to use for running the command (default: the shell of the guest OS).
+        :param timeout: Per-VM timeout in seconds. A hung guest fails with subprocess.TimeoutExpired
+        and does not block the rest of the fleet.
+        :param stream: If True, print the output lines as they arrive, prefixed with the virtual machine name.
+        :return: Dictionary of virtual machine names and their results. The result of a VM is a `CompletedProcess`.
+        """
+        return self.map(lambda guest: self._run_cmd(guest, command, shell, timeout, stream))
+
+    def run_batch(self, commands: list[str], shell: str = None, timeout: float = None) -> dict[str, VMResult]:
+        """
+        Run several commands in one guest session on every virtual machine, see FileUtils.run_batch.
+        :param timeout: Per-VM timeout in seconds for the whole batch. A VM that exceeds it fails
+        with subprocess.TimeoutExpired.
+        :return: Dictionary of virtual machine names and their results. The result of a VM is a list of
+        `CompletedProcess` objects; the VM returncode is the first non-zero command return code.
+        """
+        return self.map(
+            lambda guest: _BatchResult(
+                guest.run_batch(commands, shell=shell, stdout=False, stderr=False, timeout=timeout)
+            )
+        )
+
+    def copy_to(self, local_path: str, remote_path: str, timeout: float = None) -> dict[str, VMResult]:
+        """
+        Copy a local path to every virtual machine.
+        :param local_path: Source path.
+        :param remote_path: Destination path in the guest.
+        :param timeout: Per-VM timeout in seconds.
+        """
+        return self.map(lambda guest: guest.copy_to(local_path, remote_path, timeout=timeout))
+
+    def copy_from(self, remote_path: str, local_path: str, timeout: float = None) -> dict[str, VMResult]:
+        """
+        Copy a guest path from every virtual machine, e.g. to collect logs.
+        :param remote_path: Source path in the guest.
+        :param local_path: Destination path. `{name}` is replaced with the result key of the virtual machine,
+        e.g. 'logs/{name}/syslog'.
+        :param timeout: Per-VM timeout in seconds.
+        """
+        return self.map(lambda guest: guest.copy_from(remote_path, local_path.format(name=self._result_key(guest)), timeout=timeout))
+
+    def sync_to(
+            self,
+            local_dir: str,
+            remote_dir: str,
+            pack: bool = None,
+            timeout: float = None
+    ) -> dict[str, VMResult]:
+        """
+        Sync a local directory to every virtual machine, see FileUtils.sync_to.
+        :param timeout: Timeout in seconds for each guest command. A VM that exceeds it fails
+        with subprocess.TimeoutExpired.
+        """
+        return self.map(lambda guest: guest.sync_to(local_dir, remote_dir, pack=pack, timeout=timeout))
+
+    @staticmethod
+    def summary(results: dict[str, VMResult]) -> None:
+        """
+        Print one line per virtual machine with the status, return code and duration, followed by the totals.
+        :param results: Results returned by a fleet operation.
+        """
+        for name, result in results.items():
+            status = '[green]OK[/]' if result.ok else '[red]FAILED[/]'
+            error = f" {type(result.error).__name__}: {result.error}" if result.error else ''
+            print(
+                f"{status} {name} returncode={result.returncode} "
+                f"duration={result.duration:.2f}s{error}"
+            )
+        failed = sum(1 for result in results.values() if not result.ok)
+        print(f"[cyan]|INFO| {len(results) - failed} succeeded, {failed} failed")
+
+    @staticmethod
+    def _run_cmd(guest: FileUtils, command: str, shell: str, timeout: float, stream: bool) -> CompletedProcess:
+        from rich.markup import escape
+
+        stdout, stderr = [], []
+        with guest.run_cmd_stream(command, shell=shell, timeout=timeout) as output:
+            for stream_name, line in output:
+                (stdout if stream_name == CommandStream.STDOUT else stderr).append(line.strip())
+                if stream:
+                    color = 'cyan' if stream_name == CommandStream.STDOUT else 'red'
+                    print(f"[{color}]{guest.vm.info.name}[/] | {escape(line)}")
+
+        return CompletedProcess(
+            output.args,
+            returncode=output.returncode,
+            stdout="\n".join(stdout).strip(),
+            stderr="\n".join(stderr).strip()
+        )
+
+
+class _BatchResult(list):
+    """
+    List of per-command results of a batch with the first non-zero return code as `returncode`.
+    """
+
+    @property
+    def returncode(self) -> int:
+        return next((result.returncode for result in self if result.returncode), 0)
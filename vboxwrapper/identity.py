@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import re
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, Optional
+
+from .commands import Commands, singleton
+
+
+@singleton
+class IdentityCache:
+    """
+    Process-wide, thread-safe cache of virtual machine names and UUIDs.
+    On a miss the whole cache is filled from a single `vboxmanage list vms` call, so resolving
+    any number of virtual machines costs at most one spawn per `refresh_interval`.
+    Entries are dropped when a virtual machine is renamed, registered, moved or unregistered
+    through vboxwrapper, and the cache can optionally be persisted between runs with `persist`.
+    """
+    _cmd = Commands()
+    _LIST_LINE = re.compile(r'^"(?P<name>.*)" \{(?P<uuid>[0-9a-fA-F-]+)\}$')
+    INVALIDATING_SUBCOMMANDS = ('modifyvm', 'registervm', 'unregistervm', 'movevm')
+
+    def __init__(self, refresh_interval: float = 1.0):
+        """
+        :param refresh_interval: Minimum time in seconds between two `list vms` calls caused by misses.
+        """
+        self.refresh_interval = refresh_interval
+        self.path: Optional[Path] = None
+        self._by_name: dict[str, str] = {}
+        self._by_uuid: dict[str, str] = {}
+        self._refresh_time = None
+        self._lock = Lock()
+        self._refresh_lock = Lock()
+        self._cmd.add_mutation_listener(self._on_mutation)
+
+    def __len__(self) -> int:
+        return len(self._by_uuid)
+
+    def get_uuid(self, name: str, refresh: bool = True) -> Optional[str]:
+        """
+        Get the UUID of a virtual machine by its name.
+        :param name: Name of the virtual machine.
+        :param refresh: If False, only the cached entries are looked at and vboxmanage is never spawned.
+        :return: UUID or None if no such virtual machine is registered or, without refresh, not cached.
+        """
+        if not refresh:
+            return self._by_name.get(name)
+        return self._lookup(self._by_name, name)
+
+    def get_name(self, uuid: str) -> Optional[str]:
+        """
+        Get the name of a virtual machine by its UUID.
+        :param uuid: UUID of the virtual machine.
+        :return: Name or None if no such virtual machine is registered.
+        """
+        return self._lookup(self._by_uuid, uuid.strip('{}').lower())
+
+    def add(self, name: str, uuid: str) -> None:
+        """
+        Remember a name and UUID pair, e.g. learned from showvminfo.
+        :param name: Name of the virtual machine.
+        :param uuid: UUID of the virtual machine.
+        """
+        if not name or not uuid:
+            return
+        with self._lock:
+            self._add(name, uuid.strip('{}').lower())
+
+    def update(self, pairs: Iterable[tuple[str, str]], complete: bool = False) -> None:
+        """
+        Remember many name and UUID pairs at once.
+        :param pairs: Iterable of (name, uuid) tuples.
+        :param complete: If True, the pairs are all registered virtual machines and replace the cache.
+        """
+        with self._lock:
+            before = dict(self._by_name)
+            if complete:
+                self._by_name.clear()
+                self._by_uuid.clear()
+                self._refresh_time = time.monotonic()
+            for name, uuid in pairs:
+                if name and uuid:
+                    self._add(name, uuid.strip('{}').lower())
+            changed = self._by_name != before
+        if changed:
+            self._save()
+        elif complete:
+            self._touch()
+
+    def refresh(self) -> None:
+        """
+        Fill the cache from `vboxmanage list vms`.
+        """
+        self.update(self.parse(self._cmd.get_output(self._cmd.list)), complete=True)
+
+    def invalidate(self, vm_id: str = None) -> None:
+        """
+        Drop cached entries, so the next lookup of them queries vboxmanage again.
+        :param vm_id: Name or UUID of the virtual machine to drop. None drops the whole cache.
+        """
+        with self._lock:
+            size = len(self._by_name)
+            if vm_id is None:
+                self._by_name.clear()
+                self._by_uuid.clear()
+            else:
+                uuid = self._by_name.get(vm_id) or vm_id.strip('{}').lower()
+                self._by_name.pop(self._by_uuid.pop(uuid, None), None)
+                self._by_name.pop(vm_id, None)
+            self._refresh_time = None
+            changed = len(self._by_name) != size
+        if changed:
+            self._save()
+
+    def persist(self, path: Path | str, max_age: float = 24 * 3600) -> None:
+        """
+        Keep the cache in a JSON file, so later runs start warm.
+        Entries of the file are loaded if it is younger than `max_age`; changes made outside of
+        vboxwrapper in the meantime are only noticed after an invalidation or `refresh()`.
+        :param path: Path to the JSON file.
+        :param max_age: Maximum age of the file in seconds for its entries to be loaded.
+        """
+        self.path = Path(path).expanduser()
+        try:
+            if time.time() - self.path.stat().st_mtime <= max_age:
+                self.update(json.loads(self.path.read_text()).items())
+                return
+        except (OSError, ValueError, AttributeError):
+            pass
+        self._save()
+
+    @classmethod
+    def parse(cls, output: str, include_inaccessible: bool = False) -> list[tuple[str, str]]:
+        """
+        Parse `vboxmanage list vms` output.
+        :param output: Lines in the form `"name" {uuid}`.
+        :param include_inaccessible: Whether to keep inaccessible virtual machines, listed as `"<inaccessible>"`.
+        :return: List of (name, uuid) tuples.
+        """
+        pairs = []
+        for line in output.splitlines():
+            match = cls._LIST_LINE.match(line.strip())
+            if match and (include_inaccessible or match.group('name') != '<inaccessible>'):
+                pairs.append((match.group('name'), match.group('uuid')))
+        return pairs
+
+    def _lookup(self, index: dict[str, str], key: str) -> Optional[str]:
+        value = index.get(key)
+        if value is not None:
+            return value
+
+        with self._refresh_lock:
+            value = index.get(key)
+            if value is None and not self._refreshed_recently():
+                self.refresh()
+                value = index.get(key)
+        return value
+
+    def _refreshed_recently(self) -> bool:
+        return self._refresh_time is not None and time.monotonic() - self._refresh_time < self.refresh_interval
+
+    def _add(self, name: str, uuid: str) -> None:
+        old_name, old_uuid = self._by_uuid.get(uuid), self._by_name.get(name)
+        if old_name is not None and old_name != name:
+            self._by_name.pop(old_name, None)
+        if old_uuid is not None and old_uuid != uuid:
+            self._by_uuid.pop(old_uuid, None)
+        self._by_name[name] = uuid
+        self._by_uuid[uuid] = name
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            data = json.dumps(self._by_name)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def _touch(self) -> None:
+        """
+        Mark the saved file as up to date after a refresh that found no changes, so `persist` keeps loading it.
+        """
+        if self.path is None:
+            return
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def _on_mutation(self, subcommand: str, vm_id: Optional[str]) -> None:
+        if subcommand not in self.INVALIDATING_SUBCOMMANDS:
+            return
+        if vm_id is None:
+            with self._lock:
+                self._refresh_time = None
+        else:
+            self.invalidate(vm_id)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class CommandRecord:
+    """
+    Measurements of a single spawned command.
+    """
+    command: str
+    subcommand: Optional[str]
+    vm_id: Optional[str]
+    duration: float
+    returncode: Optional[int]
+    output_size: int
+
+
+@dataclass
+class Histogram:
+    """
+    Fixed-bucket latency histogram in seconds.
+    """
+    BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(Histogram.BOUNDS) + 1))
+    count: int = 0
+    total: float = 0.0
+    min: float = float('inf')
+    max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket that contains it.
+        :param q: Quantile between 0 and 1.
+        :return: Estimated value in seconds.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.BOUNDS[index], self.max) if index < len(self.BOUNDS) else self.max
+        return self.max
+
+
+class CommandMetrics:
+    """
+    Registry of per-subcommand latency histograms, exit codes and output sizes.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.histograms: dict[str, Histogram] = {}
+        self.exit_codes: dict[str, Counter] = {}
+        self.output_bytes: Counter = Counter()
+
+    def observe(self, record: CommandRecord) -> None:
+        key = record.subcommand or 'other'
+        with self._lock:
+            self.histograms.setdefault(key, Histogram()).observe(record.duration)
+            self.exit_codes.setdefault(key, Counter())[record.returncode] += 1
+            self.output_bytes[key] += record.output_size
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.exit_codes.clear()
+            self.output_bytes.clear()
+
+    def summary(self) -> dict[str, dict]:
+        """
+        Get a snapshot of the collected metrics.
+        :return: Dictionary of subcommands and their count, total/mean/p50/p95/max time, exit codes and output size.
+        """
+        with self._lock:
+            return {
+                key: {
+                    'count': histogram.count,
+                    'total': histogram.total,
+                    'mean': histogram.mean,
+                    'p50': histogram.quantile(0.5),
+                    'p95': histogram.quantile(0.95),
+                    'max': histogram.max,
+                    'exit_codes': dict(self.exit_codes[key]),
+                    'output_bytes': self.output_bytes[key],
+                }
+                for key, histogram in self.histograms.items()
+            }
+
+
+class CommandTrace:
+    """
+    Collects the records of the commands spawned while the trace is active.
+    The trace is bound to the current context: it sees the commands of this thread or asyncio task,
+    of tasks and `asyncio.to_thread` calls started from it and of the worker threads of vboxwrapper's
+    parallel operations, but not those of unrelated threads running at the same time.
+    Usage: `with Commands().trace() as trace: vm.run()`
+    """
+
+    def __init__(self):
+        self.records: list[CommandRecord] = []
+        self._token = None
+
+    def __enter__(self) -> 'CommandTrace':
+        self._token = _active_traces.set((*_active_traces.get(), self))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        _active_traces.reset(self._token)
+        self._token = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    @property
+    def total_time(self) -> float:
+        return sum(record.duration for record in self.records)
+
+    def count(self, subcommand: str = None) -> int:
+        """
+        Count traced spawns.
+        :param subcommand: If given, count only spawns of this vboxmanage subcommand.
+        :return: Number of spawns.
+        """
+        if subcommand is None:
+            return len(self.records)
+        return sum(1 for record in self.records if record.subcommand == subcommand)
+
+    def by_subcommand(self) -> Counter:
+        return Counter(record.subcommand or 'other' for record in self.records)
+
+
+metrics = CommandMetrics()
+_hooks: list[Callable[[CommandRecord], None]] = [metrics.observe]
+_hooks_lock = Lock()
+_active_traces: ContextVar[tuple[CommandTrace, ...]] = ContextVar('vboxwrapper_active_traces', default=())
+
+
+def add_hook(callback: Callable[[CommandRecord], None]) -> None:
+    """
+    Register a callback that receives a CommandRecord for every spawned command.
+    :param callback: Callable receiving a CommandRecord.
+    """
+    global _hooks
+    with _hooks_lock:
+        _hooks = [*_hooks, callback]
+
+
+def remove_hook(callback: Callable[[CommandRecord], None]) -> None:
+    global _hooks
+    with _hooks_lock:
+        _hooks = [hook for hook in _hooks if hook != callback]
+
+
+def emit(record: CommandRecord) -> None:
+    """
+    Pass a record to the active traces and the hooks. A failing hook is logged and does not affect
+    the command or the other hooks.
+    """
+    for trace in _active_traces.get():
+        trace.records.append(record)
+    for hook in _hooks:
+        try:
+            hook(record)
+        except Exception:
+            import logging  # deferred: only needed when a hook fails
+            logging.getLogger(__name__).exception("Instrumentation hook %r failed", hook)
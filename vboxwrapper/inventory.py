@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import time
+from dataclasses import dataclass
+from os.path import basename
+from threading import Lock
+from typing import Optional
+from weakref import WeakSet
+
+from .commands import Commands
+from .identity import IdentityCache
+
+
+@dataclass(frozen=True)
+class VMRecord:
+    """
+    Summary of a registered virtual machine as reported by `vboxmanage list -l vms`.
+    """
+    name: str
+    uuid: str
+    groups: tuple[str, ...] = ()
+    state: Optional[str] = None
+    config_file: Optional[str] = None
+    os_type: Optional[str] = None
+
+    @property
+    def group_name(self) -> Optional[str]:
+        """
+        Group name in the same format as `Info.get_group_name`.
+        :return: Group name of the virtual machine.
+        """
+        return ','.join(self.groups).replace('/', '') if self.groups else None
+
+    @property
+    def is_inaccessible(self) -> bool:
+        return self.state == Inventory.INACCESSIBLE
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.state) and self.state.lower().startswith('running')
+
+    @property
+    def is_powered_off(self) -> bool:
+        """
+        Check if the virtual machine is in a state in which its .vbox file holds the current settings.
+        :return: True for powered off, aborted and saved virtual machines.
+        """
+        return bool(self.state) and self.state.lower().startswith(('powered off', 'aborted', 'saved'))
+
+    def in_group(self, group_name: str) -> bool:
+        """
+        Check if the virtual machine belongs to the group.
+        :param group_name: Group name as listed by `Vbox.get_group_list`.
+        :return: True if one of the virtual machine groups has this name.
+        """
+        return any(basename(group) == group_name for group in self.groups)
+
+
+class Inventory:
+    """
+    Fleet inventory of all registered virtual machines built from a single `vboxmanage list -l vms` call.
+    """
+    _cmd = Commands()
+    _FIELDS = {
+        'Name': 'name',
+        'UUID': 'uuid',
+        'Groups': 'groups',
+        'State': 'state',
+        'Config file': 'config_file',
+        'Guest OS': 'os_type',
+    }
+    INACCESSIBLE = 'inaccessible'
+    INACCESSIBLE_NAME = '<inaccessible>'
+    # `list -l vms` prints inaccessible machines as `Name: <inaccessible!>` without a State line.
+    _INACCESSIBLE_NAMES = ('<inaccessible!>', '<inaccessible>')
+    _instances = WeakSet()
+    _instances_lock = Lock()
+
+    def __init__(self, ttl: float = 1.0):
+        """
+        :param ttl: Time in seconds for which the parsed inventory is reused. 0 disables caching.
+        """
+        self.ttl = ttl
+        self.__records = None
+        self.__by_id = {}
+        self.__time = 0.0
+        with self._instances_lock:
+            self._instances.add(self)
+
+    @property
+    def is_fresh(self) -> bool:
+        """
+        Check whether the records are loaded and younger than `ttl`, so reading them queries nothing.
+        """
+        return self.__records is not None and time.monotonic() - self.__time < self.ttl
+
+    @property
+    def records(self) -> list[VMRecord]:
+        """
+        Get the records of all registered virtual machines.
+        :return: List of virtual machine records in `vboxmanage list` order.
+        """
+        if not self.is_fresh:
+            self.refresh()
+        return self.__records
+
+    def refresh(self) -> None:
+        """
+        Load the current inventory.
+        """
+        records = self._load()
+        IdentityCache().update(
+            ((record.name, record.uuid) for record in records if not record.is_inaccessible),
+            complete=True
+        )
+        by_id = {}
+        for record in records:
+            if not record.is_inaccessible:
+                by_id.setdefault(record.name, record)
+            by_id[record.uuid] = record
+        self.__records, self.__by_id, self.__time = records, by_id, time.monotonic()
+
+    def invalidate(self) -> None:
+        self.__records = None
+
+    def get(self, vm_id: str) -> Optional[VMRecord]:
+        """
+        Find a virtual machine record by name or UUID.
+        :param vm_id: Virtual machine ID (name or uuid).
+        :return: Virtual machine record or None if not registered.
+        """
+        if not self.is_fresh:
+            self.refresh()
+        return self.__by_id.get(vm_id)
+
+    def filter_group(self, group_name: str) -> list[VMRecord]:
+        """
+        Get the records of virtual machines in the group.
+        :param group_name: Group name.
+        :return: List of virtual machine records.
+        """
+        return [record for record in self.records if record.in_group(group_name)]
+
+    def group_names(self) -> set[str]:
+        """
+        Get the names of all groups that contain at least one virtual machine.
+        :return: Set of group names.
+        """
+        return {basename(group) for record in self.records for group in record.groups}
+
+    @classmethod
+    def parse(cls, output: str) -> list[VMRecord]:
+        """
+        Parse `vboxmanage list -l vms` output.
+        Every `Name:` line at the start of a line opens a new candidate record. A candidate becomes
+        a record once it receives a UUID, so nested `Name:` lines (shared folders and similar
+        sections) never produce records of their own. Inaccessible virtual machines get the name
+        '<inaccessible>' and the state 'inaccessible', like the records of a Registry.
+        :param output: Output of the `vboxmanage list -l vms` command.
+        :return: List of virtual machine records.
+        """
+        records = []
+        candidate = None
+
+        def commit():
+            if candidate and candidate.get('uuid') and candidate.get('name') is not None:
+                if candidate['name'] in cls._INACCESSIBLE_NAMES:
+                    candidate.update(name=cls.INACCESSIBLE_NAME, state=cls.INACCESSIBLE)
+                records.append(VMRecord(**candidate))
+
+        for line in output.splitlines():
+            key, separator, value = line.partition(':')
+            field = cls._FIELDS.get(key) if separator else None
+            if field is None:
+                continue
+
+            value = value.strip()
+            if field == 'name':
+                commit()
+                candidate = {'name': value}
+            elif candidate is None or field in candidate:
+                continue
+            elif field == 'groups':
+                candidate['groups'] = tuple(group.strip() for group in value.split(',') if group.strip())
+            elif field == 'state':
+                candidate['state'] = value.partition(' (since')[0].strip()
+            else:
+                candidate[field] = value
+
+        commit()
+        return records
+
+    def _load(self) -> list[VMRecord]:
+        """
+        Query vboxmanage for the records of all registered virtual machines.
+        """
+        return self.parse(self._cmd.get_output(f'{self._cmd.vboxmanage} list -l vms'))
+
+    @classmethod
+    def _on_mutation(cls, subcommand: str, vm_id: Optional[str]) -> None:
+        with cls._instances_lock:
+            instances = list(cls._instances)
+        for inventory in instances:
+            inventory.invalidate()
+
+
+Inventory._cmd.add_mutation_listener(Inventory._on_mutation)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass, field
+from os.path import dirname, isfile, join
+from typing import Optional
+
+from .commands import Commands
+from .console import print
+from .identity import IdentityCache
+from .inventory import VMRecord
+from .VirtualMachine.info import ConfigEditor, ConfigParser
+from .VBox import Vbox
+from .vm_group import VMResult, parallel_map
+
+
+@dataclass
+class MediaCleanupReport:
+    """
+    Outcome of the DVD image cleanup of one .vbox file.
+    `status` is 'removed', 'would remove' (dry run) or 'skipped', `reason` explains skipped files.
+    """
+    name: str
+    config_file: Optional[str]
+    status: str
+    reason: str = ''
+    images: list[dict] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return self.status == MediaCleanup.REMOVED
+
+
+class MediaCleanup:
+    """
+    Class for removing DVD images from the media registry of many virtual machines at once.
+    Config paths and power states come from a single inventory query, files without DVD images
+    and virtual machines that are not powered off are skipped, and the remaining .vbox files are
+    edited in parallel. Saved virtual machines are skipped too unless `include_saved` is set, because
+    their saved state may still reference the images. A dry run reports what would be removed without
+    touching any file. Results are keyed by the virtual machine UUID, so inaccessible machines and
+    duplicate names do not overwrite each other.
+    """
+    _cmd = Commands()
+    REMOVED = 'removed'
+    WOULD_REMOVE = 'would remove'
+    SKIPPED = 'skipped'
+
+    def __init__(
+            self,
+            group_name: str = None,
+            missing_only: bool = False,
+            backup: bool = True,
+            max_workers: int = 8,
+            include_saved: bool = False,
+            vbox: Vbox = None
+    ):
+        """
+        :param group_name: VirtualBox group name. None cleans up all registered virtual machines.
+        :param missing_only: Remove only images whose ISO file no longer exists.
+        :param backup: Whether to keep the original .vbox file as .bak.
+        :param max_workers: Maximum number of files processed at once.
+        :param include_saved: Whether to also edit the .vbox files of saved virtual machines.
+        :param vbox: Vbox instance providing the inventory, e.g. Vbox(inventory=Registry()).
+        """
+        self.group_name = group_name
+        self.missing_only = missing_only
+        self.backup = backup
+        self.max_workers = max_workers
+        self.include_saved = include_saved
+        self.vbox = vbox or Vbox()
+
+    def plan(self) -> dict[str, VMResult]:
+        """
+        Report what `run` would remove without changing any file.
+        :return: Dictionary of virtual machine UUIDs and results with a MediaCleanupReport.
+        """
+        return self.run(dry_run=True)
+
+    def run(self, dry_run: bool = False) -> dict[str, VMResult]:
+        """
+        Remove the DVD images from the .vbox files of the selected virtual machines.
+        :param dry_run: Only report the images that would be removed.
+        :return: Dictionary of virtual machine UUIDs and results with a MediaCleanupReport, in inventory order.
+        """
+        inventory = self.vbox.inventory
+        inventory.invalidate()
+        if self.group_name:
+            records = self.vbox.get_group_records(self.group_name)
+        else:
+            records = inventory.records
+
+        running = self._running_uuids(records)
+        return parallel_map(
+            records,
+            lambda record: self._clean(record, record.uuid in running, dry_run),
+            lambda record: record.uuid,
+            self.max_workers
+        )
+
+    @staticmethod
+    def summary(results: dict[str, VMResult]) -> None:
+        """
+        Print one line per .vbox file with its status and images, followed by the totals.
+        :param results: Results returned by `run` or `plan`.
+        """
+        counts = {}
+        for result in results.values():
+            report = result.result
+            if result.error:
+                status, details = '[red]FAILED[/]', f"{type(result.error).__name__}: {result.error}"
+            elif report.status == MediaCleanup.SKIPPED:
+                status, details = '[yellow]SKIPPED[/]', report.reason
+            else:
+                status = '[green]REMOVED[/]' if report.changed else '[cyan]WOULD REMOVE[/]'
+                details = ', '.join(image['location'] or image['uuid'] for image in report.images)
+            key = 'failed' if result.error else report.status
+            counts[key] = counts.get(key, 0) + 1
+            print(f"{status} {report.name if report else result.name} {details}")
+        print("[cyan]|INFO| " + ', '.join(f"{count} {status}" for status, count in counts.items()))
+
+    def _clean(self, record: VMRecord, running: bool, dry_run: bool) -> MediaCleanupReport:
+        config_file = record.config_file
+        if record.is_inaccessible or not config_file or not isfile(config_file):
+            return MediaCleanupReport(record.name, config_file, self.SKIPPED, 'inaccessible')
+        if running or record.state and not record.is_powered_off:
+            return MediaCleanupReport(record.name, config_file, self.SKIPPED, f"state: {record.state or 'running'}")
+
+        parser = ConfigParser(config_file)
+        if not self.include_saved and self._is_saved(record, parser):
+            return MediaCleanupReport(record.name, config_file, self.SKIPPED, 'state: saved')
+
+        images = parser.get_dvd_images()
+        if self.missing_only:
+            images = [image for image in images if not self._image_exists(image, config_file)]
+        if not images:
+            return MediaCleanupReport(record.name, config_file, self.SKIPPED, 'nothing to remove', images)
+        if dry_run:
+            return MediaCleanupReport(record.name, config_file, self.WOULD_REMOVE, images=images)
+
+        editor = ConfigEditor(config_file)
+        if self.missing_only:
+            for image in images:
+                editor.remove_media('DVDImages', uuid=image['uuid'])
+        else:
+            editor.remove_media('DVDImages')
+        editor.apply(backup=self.backup)
+        return MediaCleanupReport(record.name, config_file, self.REMOVED, images=images)
+
+    def _running_uuids(self, records: list[VMRecord]) -> set[str]:
+        """
+        Get the UUIDs of running virtual machines with one `list runningvms` call.
+        The call is made only if the inventory does not report the power state, e.g. with a Registry.
+        """
+        if all(record.state is not None for record in records):
+            return set()
+        output = self._cmd.get_output(f'{self._cmd.vboxmanage} list runningvms')
+        return {uuid.strip('{}') for _, uuid in IdentityCache().parse(output)}
+
+    @staticmethod
+    def _is_saved(record: VMRecord, parser: ConfigParser) -> bool:
+        """
+        Check the inventory state or, if it is unknown, the stateFile attribute the .vbox file has while saved.
+        """
+        if record.state:
+            return record.state.lower().startswith('saved')
+        machine = parser.machine
+        return machine is not None and bool(machine.get('stateFile'))
+
+    @staticmethod
+    def _image_exists(image: dict, config_file: str) -> bool:
+        location = image.get('location', '')
+        return bool(location) and isfile(join(dirname(config_file), location))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+from .config_cache import ConfigCache
+from .inventory import Inventory, VMRecord
+
+
+def default_vbox_home() -> Path:
+    """
+    Get the VirtualBox user home directory that holds VirtualBox.xml.
+    `VBOX_USER_HOME` takes precedence, otherwise the platform default is used.
+    :return: Path to the directory.
+    """
+    if os.environ.get('VBOX_USER_HOME'):
+        return Path(os.environ['VBOX_USER_HOME'])
+
+    home = Path.home()
+    if sys.platform == 'darwin':
+        return home / 'Library' / 'VirtualBox'
+    if sys.platform == 'win32':
+        return home / '.VirtualBox'
+
+    legacy = home / '.VirtualBox'
+    if (legacy / 'VirtualBox.xml').is_file():
+        return legacy
+    return Path(os.environ.get('XDG_CONFIG_HOME') or home / '.config') / 'VirtualBox'
+
+
+class Registry(Inventory):
+    """
+    Inventory of all registered virtual machines read from the MachineRegistry of VirtualBox.xml
+    and the .vbox file of every machine, without spawning vboxmanage.
+    Files are re-parsed only when their size or modification time changes. With the persistent
+    `ConfigCache` enabled, this also holds across processes: a cold start costs one stat per file.
+    The power state is not stored in these files, so `state` of the records is None,
+    or 'inaccessible' if the .vbox file cannot be read. `os_type` is the OS type ID, e.g. 'Ubuntu_64'.
+    """
+
+    def __init__(self, vbox_home: Path | str = None, ttl: float = 1.0):
+        """
+        :param vbox_home: VirtualBox user home directory (default: see default_vbox_home).
+        :param ttl: Time in seconds for which the files are not checked for changes. 0 checks on every lookup.
+        """
+        super().__init__(ttl=ttl)
+        self.vbox_home = Path(vbox_home) if vbox_home else default_vbox_home()
+        self.path = self.vbox_home / 'VirtualBox.xml'
+        self._entries_key = None
+        self._entries: list[tuple[str, str]] = []
+        self._machines: dict[str, tuple[tuple[int, int], VMRecord]] = {}
+
+    def _load(self) -> list[VMRecord]:
+        entries = self._machine_entries()
+        machines = {}
+        for uuid, config_file in entries:
+            machines[config_file] = self._machine(uuid, config_file)
+        self._machines = machines
+        return [record for _, record in machines.values()]
+
+    def _machine_entries(self) -> list[tuple[str, str]]:
+        """
+        Get the MachineRegistry entries of VirtualBox.xml, re-parsing the file only if it changed.
+        :return: List of (uuid, absolute .vbox path) tuples in registry order.
+        """
+        key = self._file_key(self.path)
+        if key is None:
+            self._entries_key, self._entries = None, []
+        elif key != self._entries_key:
+            try:
+                self._entries = [tuple(entry) for entry in ConfigCache().get(self.path, 'machine_entries', key)]
+            except KeyError:
+                self._entries = [
+                    (attrib.get('uuid', '').strip('{}'), str(self.vbox_home / attrib.get('src', '')))
+                    for _, attrib in self._iter_elements(self.path, 'MachineEntry')
+                ]
+                ConfigCache().put(self.path, 'machine_entries', key, self._entries)
+            self._entries_key = key
+        return self._entries
+
+    def _machine(self, uuid: str, config_file: str) -> tuple[tuple[int, int], VMRecord]:
+        """
+        Get the record of one machine, re-parsing its .vbox file only if it changed.
+        :param uuid: UUID from the machine registry.
+        :param config_file: Path to the .vbox file.
+        :return: Tuple of the file key and the record.
+        """
+        key = self._file_key(Path(config_file))
+        cached = self._machines.get(config_file)
+        if cached and cached[0] == key and cached[1].uuid == uuid:
+            return cached
+
+        record = self._cached_machine(uuid, config_file, key) if key else None
+        return key, record or VMRecord(
+            name=self.INACCESSIBLE_NAME, uuid=uuid, state=self.INACCESSIBLE, config_file=config_file
+        )
+
+    @classmethod
+    def _cached_machine(cls, uuid: str, config_file: str, key: tuple[int, int]) -> Optional[VMRecord]:
+        """
+        Get the record of a machine from the persistent cache or parse it from the .vbox file.
+        """
+        cache = ConfigCache()
+        try:
+            name, machine_uuid, groups, os_type = cache.get(config_file, 'machine_record', key)
+            return VMRecord(
+                name=name, uuid=machine_uuid, groups=tuple(groups), config_file=config_file, os_type=os_type
+            )
+        except KeyError:
+            pass
+
+        record = cls._parse_machine(uuid, config_file)
+        if record is not None:
+            cache.put(config_file, 'machine_record', key, [record.name, record.uuid, record.groups, record.os_type])
+        return record
+
+    @classmethod
+    def _parse_machine(cls, uuid: str, config_file: str) -> Optional[VMRecord]:
+        """
+        Read the name, OS type and groups of a machine from its .vbox file.
+        :return: Virtual machine record or None if the file is not a valid configuration.
+        """
+        machine, groups = None, []
+        try:
+            for tag, attrib in cls._iter_elements(Path(config_file), 'Machine', 'Group'):
+                if tag == 'Machine':
+                    machine = attrib
+                else:
+                    groups.append(attrib.get('name', ''))
+        except SyntaxError:
+            return None
+
+        if machine is None:
+            return None
+        return VMRecord(
+            name=machine.get('name', ''),
+            uuid=machine.get('uuid', uuid).strip('{}'),
+            groups=tuple(groups) or ('/',),
+            config_file=config_file,
+            os_type=machine.get('OSType')
+        )
+
+    @staticmethod
+    def _iter_elements(path: Path, *tags: str):
+        """
+        Iterate over the attributes of XML elements. Finished elements are cleared,
+        so memory does not grow with the size of the file, e.g. with a deep snapshot tree.
+        :param path: XML file.
+        :param tags: Local names of the elements to yield, without namespace.
+        :return: Generator of (tag, attributes) tuples in document order.
+        """
+        import xml.etree.ElementTree as ET
+
+        for event, element in ET.iterparse(path, events=('start', 'end')):
+            if event == 'end':
+                element.clear()
+                continue
+            tag = element.tag.rpartition('}')[2]
+            if tag in tags:
+                yield tag, dict(element.attrib)
+
+    @staticmethod
+    def _file_key(path: Path) -> Optional[tuple[int, int]]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
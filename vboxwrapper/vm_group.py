@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TypeVar
+
+from .VirtualMachine import VirtualMachine
+from .VBox import Vbox
+
+T = TypeVar('T')
+
+
+@dataclass
+class VMResult:
+    """
+    Outcome of an operation on a single virtual machine of a group.
+    """
+    name: str
+    result: Any = None
+    error: Optional[BaseException] = None
+    duration: float = 0.0
+    returncode: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.returncode in (None, 0)
+
+
+def parallel_map(
+        items: list[T],
+        func: Callable[[T], Any],
+        name: Callable[[T], str],
+        max_workers: int = 8
+) -> dict[str, VMResult]:
+    """
+    Apply the function to every item on a bounded worker pool.
+    Errors are collected per item and do not abort the rest of the batch.
+    If the function returns an object with a `returncode` attribute, it is copied to the VMResult.
+    :param items: Items to process, e.g. VirtualMachine or FileUtils objects.
+    :param func: Callable receiving an item.
+    :param name: Callable returning the result key of an item.
+    :param max_workers: Maximum number of items processed at once.
+    :return: Dictionary of item names and their results, in item order.
+    """
+    def call(item: T) -> VMResult:
+        start_time = time.perf_counter()
+        try:
+            result = func(item)
+            return VMResult(
+                name(item),
+                result=result,
+                duration=time.perf_counter() - start_time,
+                returncode=getattr(result, 'returncode', None)
+            )
+        except Exception as e:
+            return VMResult(name(item), error=e, duration=time.perf_counter() - start_time)
+
+    if not items:
+        return {}
+
+    # Every item runs in a copy of the caller's context, so an active Commands().trace() sees its commands.
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(copy_context().run, call, item) for item in items]
+        return {result.name: result for result in (future.result() for future in futures)}
+
+
+def result_keys(vms: list[VirtualMachine]) -> Callable[[VirtualMachine], str]:
+    """
+    Build the function that names the results of a batch: the virtual machine name, or the UUID
+    for virtual machines whose name is shared by another one, so no result is overwritten.
+    :param vms: Virtual machines of the batch.
+    :return: Callable returning the result key of a virtual machine.
+    """
+    names = [vm.info.name for vm in vms]
+    duplicates = {name for name in names if names.count(name) > 1}
+    return lambda vm: vm.info.uuid if vm.info.name in duplicates else vm.info.name
+
+
+class VMGroup:
+    """
+    Class for running operations on many virtual machines in parallel.
+    """
+
+    def __init__(self, vms: str | list[str | VirtualMachine], max_workers: int = 8, vbox: Vbox = None):
+        """
+        :param vms: VirtualBox group name, or list of virtual machine names, UUIDs or VirtualMachine objects.
+        Members of a group are addressed by UUID, so virtual machines with the same name stay distinct.
+        :param max_workers: Maximum number of virtual machines processed at once.
+        :param vbox: Vbox instance used to resolve the group name.
+        """
+        if isinstance(vms, str):
+            vms = (vbox or Vbox()).get_vm_uuids(vms)
+        self.vms = [vm if isinstance(vm, VirtualMachine) else VirtualMachine(vm) for vm in vms]
+        self.max_workers = max_workers
+        self._result_key = result_keys(self.vms)
+
+    def __iter__(self):
+        return iter(self.vms)
+
+    def __len__(self) -> int:
+        return len(self.vms)
+
+    def map(self, func: Callable[[VirtualMachine], Any]) -> dict[str, VMResult]:
+        """
+        Apply the function to every virtual machine of the group on a bounded worker pool.
+        Errors are collected per virtual machine and do not abort the rest of the batch.
+        :param func: Callable receiving a VirtualMachine.
+        :return: Dictionary of virtual machine names and their results, in group order.
+        Virtual machines sharing a name are keyed by UUID.
+        """
+        return parallel_map(self.vms, func, self._result_key, self.max_workers)
+
+    def run(self, headless: bool = False) -> dict[str, VMResult]:
+        return self._apply(lambda vm: vm.run(headless=headless))
+
+    def stop(self, wait_until_shutdown: bool = True) -> dict[str, VMResult]:
+        return self._apply(lambda vm: vm.stop(wait_until_shutdown=wait_until_shutdown))
+
+    def shutdown(self) -> dict[str, VMResult]:
+        return self._apply(lambda vm: vm.shutdown())
+
+    def restore_snapshot(self, name: str = None) -> dict[str, VMResult]:
+        return self._apply(lambda vm: vm.snapshot.restore(name))
+
+    def take_snapshot(self, name: str) -> dict[str, VMResult]:
+        return self._apply(lambda vm: vm.snapshot.take(name))
+
+    def set_cpus(self, num: int) -> dict[str, VMResult]:
+        return self._apply(lambda vm: vm.set_cpus(num))
+
+    def wait_network_up(self, timeout: int = 300) -> dict[str, VMResult]:
+        return self.map(lambda vm: vm.network.wait_up(timeout=timeout))
+
+    def _apply(self, operation: Callable[[VirtualMachine], int]) -> dict[str, VMResult]:
+        """
+        Apply an operation that returns the vboxmanage return code, so a non-zero code marks the result as failed.
+        """
+        results = self.map(operation)
+        for result in results.values():
+            if result.error is None:
+                result.returncode = result.result
+        return results
+
+    @staticmethod
+    def failed(results: dict[str, VMResult]) -> dict[str, VMResult]:
+        """
+        Select the failed results of a group operation.
+        :param results: Results returned by a group operation.
+        :return: Dictionary of failed virtual machine names and their results.
+        """
+        return {name: result for name, result in results.items() if not result.ok}